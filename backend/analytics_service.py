@@ -6,37 +6,83 @@ from typing import List, Dict
 from collections import Counter
 import re
 
+DAY_FORMAT = "%Y-%m-%d"
+# Longest preview any dashboard shows
+PREVIEW_MAX_CHARS = 200
+
+
+def _preview(text: str, limit: int) -> str:
+    """Text cut to limit chars; the pipelines return limit + 1 so overflow is detectable"""
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def _head(field: str, limit: int) -> Dict:
+    """Server-side prefix of a string field, one char longer than the preview"""
+    return {"$substrCP": [{"$ifNull": [field, ""]}, 0, limit + 1]}
+
+
+def _bot_messages_pipeline(mentor_id: str) -> List[Dict]:
+    """Stages yielding the mentor's bot messages (index: mentor_id, sender_type, sent_at)"""
+    return [
+        {"$match": {"mentor_id": mentor_id, "sender_type": "MENTOR_BOT"}},
+        # Previews and counts only, never full content/citations
+        {"$project": {
+            "conversation_id": 1,
+            "sent_at": 1,
+            "feedback": 1,
+            "content": _head("$content", PREVIEW_MAX_CHARS),
+            "citations_count": {"$size": {"$ifNull": ["$citations", []]}},
+        }},
+    ]
+
+
 async def get_queries_analytics(db, mentor_id: str) -> Dict:
     """Get detailed analytics for queries/consultations"""
     
-    # Get all conversations for this mentor
-    conversations = await db.conversations.find(
-        {"mentor_id": mentor_id}
-    ).to_list(1000)
-    
-    conversation_ids = [c["_id"] for c in conversations]
-    
-    # Get all bot messages (responses)
-    messages = await db.messages.find({
-        "conversation_id": {"$in": conversation_ids},
-        "sender_type": "MENTOR_BOT"
-    }).to_list(10000)
-    
-    # Calculate daily queries for last 30 days
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    daily_queries = {}
     
-    for msg in messages:
-        msg_date = msg["sent_at"].date()
-        if msg["sent_at"] >= thirty_days_ago:
-            date_str = msg_date.strftime("%Y-%m-%d")
-            daily_queries[date_str] = daily_queries.get(date_str, 0) + 1
+    # Only the aggregated numbers and ten short previews leave the database
+    pipeline = _bot_messages_pipeline(mentor_id) + [
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "daily": [
+                {"$match": {"sent_at": {"$gte": thirty_days_ago}}},
+                {"$group": {"_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$sent_at"}}, "count": {"$sum": 1}}},
+            ],
+            "hourly": [
+                {"$group": {"_id": {"$hour": "$sent_at"}, "count": {"$sum": 1}}},
+            ],
+            "recent": [
+                {"$sort": {"sent_at": -1}},
+                {"$limit": 10},
+                # The user question is the message just before the response
+                {"$lookup": {
+                    "from": "messages",
+                    "let": {"cid": "$conversation_id", "sent": "$sent_at"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$and": [
+                            {"$eq": ["$conversation_id", "$$cid"]},
+                            {"$lt": ["$sent_at", "$$sent"]},
+                        ]}}},
+                        {"$sort": {"sent_at": -1}},
+                        {"$limit": 1},
+                        {"$project": {"_id": 0, "content": _head("$content", 100)}},
+                    ],
+                    "as": "question",
+                }},
+                {"$project": {"_id": 0, "sent_at": 1, "content": 1, "question": 1}},
+            ],
+        }},
+    ]
+    result = (await db.messages.aggregate(pipeline).to_list(1))[0]
+    
+    daily_queries = {row["_id"]: row["count"] for row in result["daily"]}
     
     # Fill missing dates with 0
     current_date = thirty_days_ago.date()
     end_date = datetime.utcnow().date()
     while current_date <= end_date:
-        date_str = current_date.strftime("%Y-%m-%d")
+        date_str = current_date.strftime(DAY_FORMAT)
         if date_str not in daily_queries:
             daily_queries[date_str] = 0
         current_date += timedelta(days=1)
@@ -46,38 +92,30 @@ async def get_queries_analytics(db, mentor_id: str) -> Dict:
     
     # Get hourly distribution
     hourly_distribution = [0] * 24
-    for msg in messages:
-        hour = msg["sent_at"].hour
-        hourly_distribution[hour] += 1
+    for row in result["hourly"]:
+        hourly_distribution[row["_id"]] = row["count"]
     
     # Get recent queries with preview
-    recent_queries = []
-    recent_messages = sorted(messages, key=lambda x: x["sent_at"], reverse=True)[:10]
-    
-    for msg in recent_messages:
-        # Find the corresponding user question
-        conv_messages = await db.messages.find({
-            "conversation_id": msg["conversation_id"],
-            "sent_at": {"$lt": msg["sent_at"]}
-        }).sort("sent_at", -1).limit(1).to_list(1)
-        
-        if conv_messages:
-            recent_queries.append({
-                "date": msg["sent_at"].isoformat(),
-                "question": conv_messages[0]["content"][:100] + "..." if len(conv_messages[0]["content"]) > 100 else conv_messages[0]["content"],
-                "response_preview": msg["content"][:100] + "..." if len(msg["content"]) > 100 else msg["content"]
-            })
+    recent_queries = [
+        {
+            "date": msg["sent_at"].isoformat(),
+            "question": _preview(msg["question"][0]["content"], 100),
+            "response_preview": _preview(msg["content"], 100)
+        }
+        for msg in result["recent"]
+        if msg["question"]
+    ]
     
     # Calculate growth rate
-    last_week = sum(daily_queries.get((datetime.utcnow().date() - timedelta(days=i)).strftime("%Y-%m-%d"), 0) for i in range(7))
-    previous_week = sum(daily_queries.get((datetime.utcnow().date() - timedelta(days=i)).strftime("%Y-%m-%d"), 0) for i in range(7, 14))
+    last_week = sum(daily_queries.get((datetime.utcnow().date() - timedelta(days=i)).strftime(DAY_FORMAT), 0) for i in range(7))
+    previous_week = sum(daily_queries.get((datetime.utcnow().date() - timedelta(days=i)).strftime(DAY_FORMAT), 0) for i in range(7, 14))
     
     growth_rate = 0
     if previous_week > 0:
         growth_rate = ((last_week - previous_week) / previous_week) * 100
     
     return {
-        "total_queries": len(messages),
+        "total_queries": result["total"][0]["count"] if result["total"] else 0,
         "daily_data": [{"date": date, "count": count} for date, count in sorted_daily],
         "hourly_distribution": hourly_distribution,
         "recent_queries": recent_queries,
@@ -89,62 +127,55 @@ async def get_queries_analytics(db, mentor_id: str) -> Dict:
 async def get_ratings_analytics(db, mentor_id: str) -> Dict:
     """Get detailed analytics for ratings/feedback"""
     
-    # Get all conversations for this mentor
-    conversations = await db.conversations.find(
-        {"mentor_id": mentor_id}
-    ).to_list(1000)
-    
-    conversation_ids = [c["_id"] for c in conversations]
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     
-    # Get all bot messages with feedback
-    messages = await db.messages.find({
-        "conversation_id": {"$in": conversation_ids},
-        "sender_type": "MENTOR_BOT"
-    }).to_list(10000)
+    pipeline = _bot_messages_pipeline(mentor_id) + [
+        {"$facet": {
+            "feedback": [
+                {"$group": {"_id": {"$ifNull": ["$feedback", "NONE"]}, "count": {"$sum": 1}}},
+            ],
+            "daily": [
+                {"$match": {"sent_at": {"$gte": thirty_days_ago}, "feedback": {"$in": ["LIKE", "DISLIKE"]}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$sent_at"}},
+                    "likes": {"$sum": {"$cond": [{"$eq": ["$feedback", "LIKE"]}, 1, 0]}},
+                    "dislikes": {"$sum": {"$cond": [{"$eq": ["$feedback", "DISLIKE"]}, 1, 0]}},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "best": [
+                {"$match": {"feedback": "LIKE"}},
+                {"$sort": {"sent_at": -1}},
+                {"$limit": 10},
+                {"$project": {"_id": 0, "sent_at": 1, "content": 1, "citations_count": 1}},
+            ],
+        }},
+    ]
+    result = (await db.messages.aggregate(pipeline).to_list(1))[0]
     
     # Calculate feedback distribution
     feedback_counts = {"LIKE": 0, "DISLIKE": 0, "NONE": 0}
-    daily_ratings = {}
-    best_responses = []
-    
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    for msg in messages:
-        feedback = msg.get("feedback", "NONE")
-        feedback_counts[feedback] += 1
-        
-        # Daily ratings
-        if msg["sent_at"] >= thirty_days_ago:
-            date_str = msg["sent_at"].date().strftime("%Y-%m-%d")
-            if date_str not in daily_ratings:
-                daily_ratings[date_str] = {"likes": 0, "dislikes": 0}
-            
-            if feedback == "LIKE":
-                daily_ratings[date_str]["likes"] += 1
-            elif feedback == "DISLIKE":
-                daily_ratings[date_str]["dislikes"] += 1
-        
-        # Best responses (with LIKE feedback)
-        if feedback == "LIKE":
-            best_responses.append({
-                "content": msg["content"][:200] + "..." if len(msg["content"]) > 200 else msg["content"],
-                "date": msg["sent_at"].isoformat(),
-                "citations_count": len(msg.get("citations", []))
-            })
-    
-    # Sort best responses by date (most recent first)
-    best_responses.sort(key=lambda x: x["date"], reverse=True)
-    best_responses = best_responses[:10]
+    for row in result["feedback"]:
+        feedback_counts[row["_id"]] = row["count"]
+    
+    # Best responses (with LIKE feedback), most recent first
+    best_responses = [
+        {
+            "content": _preview(msg["content"], 200),
+            "date": msg["sent_at"].isoformat(),
+            "citations_count": msg["citations_count"]
+        }
+        for msg in result["best"]
+    ]
     
     # Calculate average rating over time
-    sorted_daily = sorted(daily_ratings.items())
     rating_timeline = []
     
-    for date, counts in sorted_daily:
-        total = counts["likes"] + counts["dislikes"]
+    for row in result["daily"]:
+        total = row["likes"] + row["dislikes"]
         if total > 0:
-            avg_rating = (counts["likes"] / total) * 5.0
-            rating_timeline.append({"date": date, "rating": round(avg_rating, 2)})
+            avg_rating = (row["likes"] / total) * 5.0
+            rating_timeline.append({"date": row["_id"], "rating": round(avg_rating, 2)})
     
     # Calculate percentages
     total_feedback = feedback_counts["LIKE"] + feedback_counts["DISLIKE"]
@@ -0,0 +1,262 @@
+"""
+Approximate nearest-neighbour backends for the resident vector index.
+
+Both backends work on an L2-normalized float32 matrix owned by
+MentorVectorIndex and return (row_indices, scores) best first:
+- ExactSearch: brute-force matrix-vector product (always correct)
+- IVFSearch: inverted-file index over spherical k-means centroids; only the
+  n_probe closest lists are scored, so latency grows sub-linearly
+- QuantizedSearch: first pass over int8 or sign-bit codes of the matrix,
+  then exact float re-ranking of the best candidates
+"""
+
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# "ivf" enables IVF for large mentor libraries, "exact" forces brute force
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "ivf")
+# Below this many chunks brute force is already fast and exact
+IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", "20000"))
+# Lists probed per query; 0 means derive from the number of lists
+IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "0"))
+
+# First-pass representation for brute-force search: "none", "int8" or "binary"
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+# Candidates re-ranked with exact float scores, as a multiple of top_k
+QUANT_RERANK_FACTOR = int(os.getenv("VECTOR_QUANTIZATION_RERANK", "20"))
+QUANT_MIN_ROWS = int(os.getenv("VECTOR_QUANTIZATION_MIN_ROWS", "5000"))
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLES_PER_LIST = 64
+ASSIGN_BATCH_SIZE = 8192
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if k >= scores.shape[0]:
+        return np.argsort(scores)[::-1]
+    part = np.argpartition(scores, -k)[-k:]
+    return part[np.argsort(scores[part])[::-1]]
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise _top_k for a (queries, documents) score matrix"""
+    if k < scores.shape[1]:
+        part = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, part, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows are left untouched)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def cosine_top_k(query: np.ndarray, documents: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """One-off cosine top-k over unnormalized vectors (no resident index)"""
+    docs = normalize_rows(np.array(documents, dtype=np.float32))
+    query = np.asarray(query, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    scores = docs @ (query / norm if norm else query)
+    top = _top_k(scores, k)
+    return top, scores[top]
+
+
+class _SearchEach:
+    """search_many fallback for backends without a batched kernel"""
+
+    def search_many(self, matrix: np.ndarray, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return [self.search(matrix, query, k) for query in queries]
+
+
+class ExactSearch:
+    """Brute-force cosine search over the full matrix"""
+
+    name = "exact"
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = matrix @ query
+        top = _top_k(scores, k)
+        return top, scores[top]
+
+    def search_many(self, matrix: np.ndarray, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Score several normalized queries with one matrix-matrix product"""
+        scores = queries @ matrix.T
+        top = _top_k_rows(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        return list(zip(top, top_scores))
+
+
+class IVFSearch(_SearchEach):
+    """Inverted-file index: rows are bucketed by their nearest centroid"""
+
+    name = "ivf"
+
+    def __init__(self, centroids: np.ndarray, n_probe: Optional[int] = None):
+        self.centroids = centroids
+        self.n_lists = centroids.shape[0]
+        self.n_probe = n_probe or IVF_NPROBE or max(8, self.n_lists // 8)
+        self._lists: List[List[np.ndarray]] = [[] for _ in range(self.n_lists)]
+        self._packed: Optional[List[np.ndarray]] = None
+        self.n_rows = 0
+        self.trained_rows = 0
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, n_lists: Optional[int] = None, seed: int = 0) -> "IVFSearch":
+        """Spherical k-means on a sample of rows, then assign every row"""
+        n = matrix.shape[0]
+        n_lists = n_lists or max(1, int(4 * math.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, n_lists * KMEANS_SAMPLES_PER_LIST)
+        sample = matrix[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            used, starts = np.unique(assign[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[used] = np.add.reduceat(sample[order], starts)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists with random sample rows
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        ivf = cls(centroids.astype(np.float32))
+        ivf.trained_rows = n
+        ivf.add_rows(matrix, 0)
+        return ivf
+
+    def add_rows(self, matrix: np.ndarray, start: int) -> None:
+        """Assign rows matrix[start:] to their nearest list"""
+        for offset in range(start, matrix.shape[0], ASSIGN_BATCH_SIZE):
+            block = matrix[offset:offset + ASSIGN_BATCH_SIZE]
+            assign = np.argmax(block @ self.centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.n_lists + 1))
+            for list_id in range(self.n_lists):
+                lo, hi = bounds[list_id], bounds[list_id + 1]
+                if hi > lo:
+                    self._lists[list_id].append(order[lo:hi] + offset)
+        self.n_rows = matrix.shape[0]
+        self._packed = None
+
+    def _pack(self) -> List[np.ndarray]:
+        if self._packed is None:
+            self._packed = [
+                np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+                for parts in self._lists
+            ]
+            self._lists = [[p] if p.size else [] for p in self._packed]
+        return self._packed
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        lists = self._pack()
+        probe = _top_k(self.centroids @ query, min(self.n_probe, self.n_lists))
+        candidates = np.concatenate([lists[i] for i in probe])
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        scores = matrix[candidates] @ query
+        top = _top_k(scores, k)
+        return candidates[top], scores[top]
+
+
+class Int8Codes:
+    """Per-dimension symmetric scalar quantization to int8 (4x smaller than float32)"""
+
+    name = "int8"
+    BLOCK_ROWS = 4096
+
+    def __init__(self, matrix: np.ndarray):
+        scale = np.abs(matrix).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+        self.codes = self.encode(matrix)
+
+    def encode(self, rows: np.ndarray) -> np.ndarray:
+        # Rows added after training may exceed the fitted range; clip them
+        return np.clip(np.rint(rows / self.scale), -127, 127).astype(np.int8)
+
+    def append(self, rows: np.ndarray) -> None:
+        self.codes = np.concatenate([self.codes, self.encode(rows)])
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        # codes * scale ~ rows, so fold the scale into the query once
+        weighted = (query * self.scale).astype(np.float32)
+        out = np.empty(self.codes.shape[0], dtype=np.float32)
+        block = np.empty((min(self.BLOCK_ROWS, self.codes.shape[0]), self.codes.shape[1]), dtype=np.float32)
+        # Widen block by block: a mixed int8/float32 product would copy the whole matrix
+        for start in range(0, self.codes.shape[0], self.BLOCK_ROWS):
+            codes = self.codes[start:start + self.BLOCK_ROWS]
+            widened = block[:codes.shape[0]]
+            np.copyto(widened, codes, casting="unsafe")
+            out[start:start + codes.shape[0]] = widened @ weighted
+        return out
+
+
+class BinaryCodes:
+    """Sign bits packed into 64-bit words (32x smaller than float32), scored by Hamming distance"""
+
+    name = "binary"
+
+    def __init__(self, matrix: np.ndarray):
+        self.dim = matrix.shape[1]
+        self.codes = self.encode(matrix)
+
+    def encode(self, rows: np.ndarray) -> np.ndarray:
+        bits = np.packbits(rows > 0, axis=1)
+        pad = -bits.shape[1] % 8
+        if pad:
+            bits = np.pad(bits, ((0, 0), (0, pad)))
+        return np.ascontiguousarray(bits).view(np.uint64)
+
+    def append(self, rows: np.ndarray) -> None:
+        self.codes = np.concatenate([self.codes, self.encode(rows)])
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        distance = np.bitwise_count(self.codes ^ self.encode(query[None, :])).sum(axis=1, dtype=np.int32)
+        # Higher is better, like cosine
+        return (self.dim - 2 * distance).astype(np.float32)
+
+
+_CODECS = {"int8": Int8Codes, "binary": BinaryCodes}
+
+
+class QuantizedSearch(_SearchEach):
+    """Score quantized codes, then re-rank the best candidates with the float matrix"""
+
+    def __init__(self, matrix: np.ndarray, mode: Optional[str] = None, rerank_factor: Optional[int] = None):
+        self.codec = _CODECS[mode or VECTOR_QUANTIZATION](matrix)
+        self.name = f"{self.codec.name}+rerank"
+        self.rerank_factor = rerank_factor or QUANT_RERANK_FACTOR
+        self.n_rows = matrix.shape[0]
+
+    def add_rows(self, matrix: np.ndarray, start: int) -> None:
+        """Encode rows matrix[start:]"""
+        if start < matrix.shape[0]:
+            self.codec.append(matrix[start:])
+        self.n_rows = matrix.shape[0]
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        candidates = _top_k(self.codec.scores(query), k * self.rerank_factor)
+        scores = matrix[candidates] @ query
+        top = _top_k(scores, k)
+        return candidates[top], scores[top]
+
+
+def wants_quantization(n_rows: int) -> bool:
+    """Whether brute-force search over n_rows should use a quantized first pass"""
+    return VECTOR_QUANTIZATION in _CODECS and n_rows >= QUANT_MIN_ROWS
+
+
+def wants_ivf(n_rows: int) -> bool:
+    """Whether a matrix of n_rows should be served by an IVF index"""
+    return VECTOR_INDEX_BACKEND == "ivf" and n_rows >= IVF_MIN_ROWS
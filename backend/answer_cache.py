@@ -0,0 +1,150 @@
+"""
+Per-mentor semantic answer cache for /chat.
+
+A new question whose embedding is within ANSWER_CACHE_THRESHOLD cosine
+similarity of a previously answered question for the same mentor reuses that
+answer and its citations instead of running retrieval and an LLM generation.
+
+Entries are stored in the answer_cache collection (shared by every worker)
+and tagged with the mentor's content_version and profile_version, so any
+change to the mentor's chunks or approved bot profile makes them unreachable.
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# Most recent entries kept per mentor and version pair
+ANSWER_CACHE_MAX_PER_MENTOR = int(os.getenv("ANSWER_CACHE_MAX_PER_MENTOR", "500"))
+# How often a worker re-reads entries written by other workers
+ANSWER_CACHE_REFRESH_SECONDS = float(os.getenv("ANSWER_CACHE_REFRESH_SECONDS", "60"))
+
+
+def mentor_versions(mentor: Dict) -> Tuple[int, int]:
+    """(content_version, profile_version) that cached answers must match"""
+    return mentor.get("content_version", 0), mentor.get("profile_version", 0)
+
+
+class _MentorAnswers:
+    """Normalized question matrix plus the cached answers for one mentor"""
+
+    def __init__(self, versions: Tuple[int, int]):
+        self.versions = versions
+        self.loaded_at = time.monotonic()
+        self.matrix: Optional[np.ndarray] = None
+        self.answers: List[Dict] = []
+
+    def add(self, embedding: List[float], answer: Dict) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0 or (self.matrix is not None and vector.shape[0] != self.matrix.shape[1]):
+            return
+        row = (vector / norm)[None, :]
+        self.matrix = row if self.matrix is None else np.concatenate([self.matrix, row])
+        self.answers.append(answer)
+        if len(self.answers) > ANSWER_CACHE_MAX_PER_MENTOR:
+            self.matrix = self.matrix[-ANSWER_CACHE_MAX_PER_MENTOR:]
+            self.answers = self.answers[-ANSWER_CACHE_MAX_PER_MENTOR:]
+
+    def best(self, embedding: List[float]) -> Tuple[Optional[Dict], float]:
+        if self.matrix is None:
+            return None, 0.0
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self.matrix.shape[1]:
+            return None, 0.0
+        scores = self.matrix @ (query / norm)
+        i = int(np.argmax(scores))
+        return self.answers[i], float(scores[i])
+
+
+class AnswerCache:
+    """Semantic cache of RAG answers keyed by mentor and content/profile version"""
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, enabled: bool = ANSWER_CACHE_ENABLED):
+        self.threshold = threshold
+        self.enabled = enabled
+        self._mentors: Dict[str, _MentorAnswers] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def _entries(self, db, mentor_id: str, versions: Tuple[int, int]) -> _MentorAnswers:
+        entries = self._mentors.get(mentor_id)
+        if (
+            entries is not None
+            and entries.versions == versions
+            and time.monotonic() - entries.loaded_at < ANSWER_CACHE_REFRESH_SECONDS
+        ):
+            return entries
+        content_version, profile_version = versions
+        entries = _MentorAnswers(versions)
+        docs = await db.answer_cache.find(
+            {"mentor_id": mentor_id, "content_version": content_version, "profile_version": profile_version},
+            {"question_embedding": 1, "response": 1, "citations": 1},
+        ).sort("created_at", -1).limit(ANSWER_CACHE_MAX_PER_MENTOR).to_list(None)
+        for doc in reversed(docs):
+            entries.add(doc["question_embedding"], {"response": doc["response"], "citations": doc["citations"]})
+        self._mentors[mentor_id] = entries
+        return entries
+
+    async def lookup(self, db, mentor: Dict, question_embedding: List[float]) -> Optional[Dict]:
+        """Return {"response", "citations"} of a close enough cached question, if any"""
+        if not self.enabled:
+            return None
+        try:
+            entries = await self._entries(db, mentor["_id"], mentor_versions(mentor))
+            answer, score = entries.best(question_embedding)
+        except Exception as e:
+            print(f"Answer cache lookup failed for mentor {mentor['_id']}: {e}")
+            return None
+        if answer is not None and score >= self.threshold:
+            self.hits += 1
+            return answer
+        self.misses += 1
+        return None
+
+    async def store(
+        self,
+        db,
+        mentor: Dict,
+        question: str,
+        question_embedding: List[float],
+        response: str,
+        citations: List[Dict],
+    ) -> None:
+        """Cache a validated answer (raw response text, with [source_N] markers)"""
+        if not self.enabled:
+            return
+        content_version, profile_version = versions = mentor_versions(mentor)
+        try:
+            await db.answer_cache.insert_one({
+                "_id": str(uuid.uuid4()),
+                "mentor_id": mentor["_id"],
+                "content_version": content_version,
+                "profile_version": profile_version,
+                "question": question,
+                "question_embedding": question_embedding,
+                "response": response,
+                "citations": citations,
+                "created_at": datetime.utcnow(),
+            })
+        except Exception as e:
+            print(f"Answer cache write failed for mentor {mentor['_id']}: {e}")
+            return
+        entries = self._mentors.get(mentor["_id"])
+        if entries is not None and entries.versions == versions:
+            entries.add(question_embedding, {"response": response, "citations": citations})
+
+    async def invalidate(self, db, mentor_id: str) -> None:
+        """Drop every cached answer for mentor_id (content or profile changed)"""
+        self._mentors.pop(mentor_id, None)
+        try:
+            await db.answer_cache.delete_many({"mentor_id": mentor_id})
+        except Exception as e:
+            print(f"Answer cache invalidation failed for mentor {mentor_id}: {e}")
@@ -1,3 +1,7 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -9,6 +13,12 @@ import os
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_stats = {"queued": 0, "running": 0, "completed": 0, "max_wait_ms": 0.0}
+_hash_stats_lock = threading.Lock()
+
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET", "medmentor-secret-key-change-in-production-2025")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -24,6 +34,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+async def _run_in_hash_pool(fn, *args):
+    """Run a bcrypt call in the bounded hash pool, tracking queue depth and wait time"""
+    submitted = time.perf_counter()
+    with _hash_stats_lock:
+        _hash_stats["queued"] += 1
+
+    def task():
+        wait_ms = (time.perf_counter() - submitted) * 1000
+        with _hash_stats_lock:
+            _hash_stats["max_wait_ms"] = max(_hash_stats["max_wait_ms"], wait_ms)
+            _hash_stats["queued"] -= 1
+            _hash_stats["running"] += 1
+        try:
+            return fn(*args)
+        finally:
+            with _hash_stats_lock:
+                _hash_stats["running"] -= 1
+                _hash_stats["completed"] += 1
+
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, task)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password without blocking the event loop"""
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password without blocking the event loop"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+def password_hash_stats() -> dict:
+    """Snapshot of the password hash pool (queued = waiting for a worker)"""
+    with _hash_stats_lock:
+        return {"workers": PASSWORD_HASH_WORKERS, **_hash_stats}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,141 @@
+"""
+Declarative MongoDB index registry.
+
+INDEXES lists, per collection, every index the API's queries rely on. At
+startup ensure_indexes() reconciles it with the database: missing indexes
+are created (matched by key pattern, so an equivalent index created by hand
+under another name counts as present) and indexes that are not in the
+registry are reported together with their $indexStats access counts, but
+never dropped automatically.
+
+Add an entry here next to any new query shape; tests/test_db_indexes.py
+checks with explain() that the hot queries are index scans.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from embedding_cache import EMBEDDING_CACHE_TTL_DAYS
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "mentors": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "mentor_content": [
+        # Content listings and analytics, newest first
+        IndexModel([("mentor_id", ASCENDING), ("uploaded_at", DESCENDING)], name="mentor_uploaded"),
+    ],
+    "content_chunks": [
+        # Vector index (re)loads and snapshot catch-up
+        IndexModel([("mentor_id", ASCENDING), ("created_at", ASCENDING)], name="mentor_created"),
+        IndexModel([("mentor_id", ASCENDING), ("embedded_at", ASCENDING)], name="mentor_embedded", sparse=True),
+        # Deleting / counting a content's chunks
+        IndexModel([("content_id", ASCENDING)], name="content"),
+    ],
+    "conversations": [
+        # Conversation list, most recently active first (_id breaks ties for cursor pagination)
+        IndexModel(
+            [("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_updated_id",
+        ),
+        IndexModel([("mentor_id", ASCENDING), ("user_id", ASCENDING)], name="mentor_user"),
+    ],
+    "messages": [
+        # A conversation's transcript and the question before an answer
+        IndexModel([("conversation_id", ASCENDING), ("sent_at", ASCENDING)], name="conversation_sent"),
+        # Mentor stats and analytics (mentor_id is denormalized onto messages)
+        IndexModel(
+            [("mentor_id", ASCENDING), ("sender_type", ASCENDING), ("sent_at", DESCENDING)],
+            name="mentor_sender_sent",
+        ),
+        IndexModel([("user_id", ASCENDING), ("sent_at", DESCENDING)], name="user_sent"),
+    ],
+    "feedback_logs": [
+        IndexModel([("mentor_id", ASCENDING), ("feedback_at", DESCENDING)], name="mentor_feedback_at"),
+    ],
+    "answer_cache": [
+        IndexModel(
+            [
+                ("mentor_id", ASCENDING),
+                ("content_version", ASCENDING),
+                ("profile_version", ASCENDING),
+                ("created_at", DESCENDING),
+            ],
+            name="mentor_versions_created",
+        ),
+    ],
+    "ai_insights_cache": [
+        IndexModel([("mentor_id", ASCENDING)], name="mentor"),
+    ],
+    "embedding_cache": [
+        # TTL: entries unused for EMBEDDING_CACHE_TTL_DAYS are removed by the server
+        # (indexes are matched by key, so changing the TTL later needs a collMod)
+        IndexModel(
+            [("last_used", ASCENDING)],
+            name="last_used_ttl",
+            expireAfterSeconds=int(EMBEDDING_CACHE_TTL_DAYS * 86400),
+        ),
+    ],
+    "ingestion_jobs": [
+        # Workers claiming queued jobs or expired leases
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease"),
+    ],
+}
+
+
+def _key(spec) -> tuple:
+    """Comparable key pattern from an IndexModel document or list_indexes entry"""
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in spec.items())
+
+
+async def _access_counts(collection) -> Dict[str, int]:
+    """index name -> operations since the server started ($indexStats)"""
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+    except OperationFailure:
+        # Not permitted for this user / not supported by the deployment
+        return {}
+    return {s["name"]: s["accesses"]["ops"] for s in stats}
+
+
+async def ensure_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, List[Dict]]:
+    """
+    Create missing registry indexes and report the rest
+    Returns: {"created": [...], "failed": [...], "extra": [...], "unused": [...]}
+    where every entry is {"collection", "name", ...}
+    """
+    report = {"created": [], "failed": [], "extra": [], "unused": []}
+    for name in collections if collections is not None else INDEXES:
+        collection = db[name]
+        existing = {_key(ix["key"]): ix["name"] async for ix in collection.list_indexes()}
+        wanted = {_key(model.document["key"]): model for model in INDEXES.get(name, [])}
+
+        for key, model in wanted.items():
+            if key in existing:
+                continue
+            try:
+                created = await collection.create_indexes([model])
+                report["created"].append({"collection": name, "name": created[0]})
+            except OperationFailure as e:
+                # e.g. duplicates blocking a unique index; queries still work, just slower
+                report["failed"].append({"collection": name, "name": model.document["name"], "error": str(e)})
+
+        accesses = await _access_counts(collection)
+        for key, index_name in existing.items():
+            if index_name == "_id_":
+                continue
+            ops = accesses.get(index_name)
+            if key not in wanted:
+                report["extra"].append({"collection": name, "name": index_name, "ops": ops})
+            elif ops == 0:
+                report["unused"].append({"collection": name, "name": index_name})
+    return report
@@ -1,12 +1,12 @@
 """
 Shared dependencies for all routers.
-Provides database connections, GridFS, and logger.
+Provides database connections, GridFS (sync and async), and logger.
 """
 import os
 import logging
 import gridfs
 from pathlib import Path
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
@@ -16,7 +16,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 db_name = os.environ['DB_NAME']
 
-# Sync client (for GridFS) - always safe to create at import time
+# Sync client (legacy GridFS access from scripts) - always safe to create at import time
 sync_client = MongoClient(mongo_url)
 sync_db = sync_client[db_name]
 fs = gridfs.GridFS(sync_db)
@@ -24,6 +24,8 @@ fs = gridfs.GridFS(sync_db)
 # Async Motor client - lazy initialization to avoid event-loop conflicts with pytest
 _motor_client = None
 _motor_db = None
+_fs_bucket = None
+_fs_bucket_db = None
 
 
 def _get_motor_db():
@@ -57,12 +59,23 @@ def get_fs():
     return fs
 
 
+def get_fs_bucket() -> AsyncIOMotorGridFSBucket:
+    """Async GridFS bucket on the live Motor database (same "fs" collections as `fs`)."""
+    global _fs_bucket, _fs_bucket_db
+    motor_db = _get_motor_db()
+    if _fs_bucket is None or _fs_bucket_db is not motor_db:
+        _fs_bucket = AsyncIOMotorGridFSBucket(motor_db)
+        _fs_bucket_db = motor_db
+    return _fs_bucket
+
+
 def close_db():
-    global _motor_client, _motor_db
+    global _motor_client, _motor_db, _fs_bucket
     if _motor_client:
         _motor_client.close()
         _motor_client = None
         _motor_db = None
+        _fs_bucket = None
 
 
 # Logger
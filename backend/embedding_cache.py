@@ -0,0 +1,139 @@
+"""
+Content-addressed embedding cache.
+
+Entries are keyed by sha256(embedding model + normalized text) and kept in
+two tiers:
+- an in-process LRU of float32 vectors, bounded by their total size
+  (EMBEDDING_CACHE_MAX_MB) whatever the embedding dimension
+- the embedding_cache MongoDB collection, shared by every worker and script;
+  a TTL index on last_used drops entries unused for EMBEDDING_CACHE_TTL_DAYS
+  (last_used is refreshed at most once a day per entry, on a Mongo-tier hit)
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+from pymongo import UpdateOne
+
+from embedding_codec import decode_embedding, embedding_fields
+
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "32"))
+EMBEDDING_CACHE_TTL_DAYS = float(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "90"))
+# Hits refresh last_used only when it is older than this (avoids a write per lookup)
+_LAST_USED_REFRESH = timedelta(days=1)
+# Set to "false" to keep only the in-process tier
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, trimmed, whitespace collapsed"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + MongoDB) cache of embeddings keyed by cache_key()"""
+
+    def __init__(
+        self,
+        db=None,
+        max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+        persist: bool = EMBEDDING_CACHE_PERSIST,
+    ):
+        self._db = db
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lru_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from dependencies import get_db
+            return get_db()
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._lru_bytes -= old.nbytes
+        self._lru[key] = vector
+        self._lru_bytes += vector.nbytes
+        while self._lru_bytes > self.max_bytes and self._lru:
+            _, evicted = self._lru.popitem(last=False)
+            self._lru_bytes -= evicted.nbytes
+
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings for whichever keys are present"""
+        found = {}
+        missing = []
+        for key in keys:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                found[key] = vector.tolist()
+            else:
+                missing.append(key)
+
+        if missing and self.persist:
+            try:
+                stale = []
+                refresh_before = datetime.utcnow() - _LAST_USED_REFRESH
+                async for doc in self.db.embedding_cache.find(
+                    {"_id": {"$in": missing}}, {"embedding": 1, "last_used": 1}
+                ):
+                    vector = decode_embedding(doc["embedding"])
+                    if vector is None:
+                        continue
+                    self._remember(doc["_id"], vector)
+                    found[doc["_id"]] = vector.tolist()
+                    if doc.get("last_used", datetime.min) < refresh_before:
+                        stale.append(doc["_id"])
+                if stale:
+                    # Keeps entries that are still in use ahead of the TTL index
+                    await self.db.embedding_cache.update_many(
+                        {"_id": {"$in": stale}}, {"$set": {"last_used": datetime.utcnow()}}
+                    )
+            except Exception as e:
+                print(f"Embedding cache lookup failed: {e}")
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, embeddings: Dict[str, List[float]], model: str) -> None:
+        """Store freshly generated embeddings in both tiers"""
+        if not embeddings:
+            return
+        for key, embedding in embeddings.items():
+            self._remember(key, np.asarray(embedding, dtype=np.float32))
+
+        if self.persist:
+            now = datetime.utcnow()
+            try:
+                await self.db.embedding_cache.bulk_write(
+                    [
+                        UpdateOne(
+                            {"_id": key},
+                            {"$setOnInsert": {
+                                **embedding_fields(embedding), "model": model, "created_at": now, "last_used": now,
+                            }},
+                            upsert=True,
+                        )
+                        for key, embedding in embeddings.items()
+                    ],
+                    ordered=False,
+                )
+            except Exception as e:
+                print(f"Embedding cache write failed: {e}")
@@ -0,0 +1,58 @@
+"""
+Compact storage format for embeddings.
+
+Embeddings are stored as BSON Binary holding the vector as little-endian
+float32 (4 bytes per dimension, versus ~9+ bytes per element for a BSON
+array of doubles). Readers decode with np.frombuffer, which wraps the bytes
+returned by the driver without building a Python list of floats.
+
+Documents written before the packed format keep their float arrays;
+decode_embedding accepts both so reads work during and after migration
+(scripts/migrate_embeddings.py --pack).
+"""
+
+import os
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+from bson.binary import Binary
+
+EMBEDDING_DTYPE = np.dtype("<f4")
+# "binary" (packed float32) or "array" (legacy list of floats)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "binary").lower()
+
+EmbeddingValue = Union[bytes, Sequence[float], np.ndarray]
+
+
+def pack_embedding(embedding: EmbeddingValue) -> Binary:
+    """Encode a vector as BSON Binary little-endian float32"""
+    if isinstance(embedding, bytes):
+        return Binary(embedding)
+    return Binary(np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes())
+
+
+def decode_embedding(value: Optional[EmbeddingValue]) -> Optional[np.ndarray]:
+    """Read a stored embedding (packed or legacy array) as a float32 vector"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        if not value or len(value) % EMBEDDING_DTYPE.itemsize:
+            return None
+        # Read-only view over the driver's buffer; copy before mutating
+        return np.frombuffer(value, dtype=EMBEDDING_DTYPE)
+    if len(value) == 0:
+        return None
+    return np.asarray(value, dtype=np.float32)
+
+
+def embedding_fields(embedding: EmbeddingValue, model: Optional[str] = None) -> Dict:
+    """Fields to $set on a chunk document: embedding plus dim / model metadata"""
+    if EMBEDDING_STORAGE == "array":
+        vector = embedding.tolist() if isinstance(embedding, np.ndarray) else list(embedding)
+        fields = {"embedding": vector, "embedding_dim": len(vector)}
+    else:
+        packed = pack_embedding(embedding)
+        fields = {"embedding": packed, "embedding_dim": len(packed) // EMBEDDING_DTYPE.itemsize}
+    if model:
+        fields["embedding_model"] = model
+    return fields
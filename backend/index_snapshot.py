@@ -0,0 +1,153 @@
+"""
+Warm-start snapshots of the resident vector indexes.
+
+With VECTOR_INDEX_SNAPSHOT_DIR set, each mentor's index is saved as a
+normalized float32 matrix (<mentor_id>.<token>.npy) plus a manifest
+(<mentor_id>.json) holding the chunk metadata, the content_version it was
+built at and a watermark (when the Mongo read behind it started).
+
+Workers open the matrix with np.load(mmap_mode="r"), so every uvicorn
+worker on a host shares the same read-only pages through the OS page cache
+instead of pulling content_chunks and holding a private copy. Chunks
+written after the watermark are caught up from Mongo on load.
+
+Only the embeddings are shared. The manifest carries every chunk's text and
+metadata as JSON, and each worker parses it into its own objects: the text
+is needed in process anyway, by the BM25 index built on load and as the
+context returned with search hits. A mentor's manifest is therefore about
+as large as its chunk text, and that text is held once per worker. Reading
+the text from Mongo by chunk_id on demand would drop it from the manifest,
+but it would add a round trip to every search and leave hybrid search
+without its lexical index.
+
+Files are written under temporary names and renamed into place; the
+manifest is replaced last and names its matrix file, so a reader never
+pairs a manifest with a half-written or foreign matrix. Saves of the same
+mentor are serialized with a file lock, and each save removes every matrix
+the new manifest does not name.
+"""
+
+import fcntl
+import json
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+VECTOR_INDEX_SNAPSHOT_DIR = os.getenv("VECTOR_INDEX_SNAPSHOT_DIR", "")
+# Chunks this much older than the watermark are re-read on catch-up (clock skew between servers)
+SNAPSHOT_CATCHUP_SLACK_SECONDS = float(os.getenv("VECTOR_INDEX_SNAPSHOT_SLACK_SECONDS", "300"))
+# A worker re-saves the snapshot after catching up at least this many rows
+SNAPSHOT_RESAVE_ROWS = int(os.getenv("VECTOR_INDEX_SNAPSHOT_RESAVE_ROWS", "1000"))
+
+SNAPSHOT_FORMAT = 1
+
+
+def _stem(mentor_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", mentor_id)
+
+
+def _manifest_path(directory: str, mentor_id: str) -> str:
+    return os.path.join(directory, f"{_stem(mentor_id)}.json")
+
+
+def _matrix_files(directory: str, mentor_id: str) -> List[str]:
+    pattern = re.compile(re.escape(_stem(mentor_id)) + r"\.[0-9a-f]{12}\.npy")
+    return [name for name in os.listdir(directory) if pattern.fullmatch(name)]
+
+
+def _read_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_snapshot(
+    directory: str,
+    mentor_id: str,
+    version: int,
+    watermark: datetime,
+    matrix: np.ndarray,
+    chunks: List[Dict],
+) -> str:
+    """Write matrix + manifest atomically. Returns the matrix file path."""
+    os.makedirs(directory, exist_ok=True)
+    # Another worker may be saving the same mentor after a concurrent cold start
+    with open(os.path.join(directory, f"{_stem(mentor_id)}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return _save_locked(directory, mentor_id, version, watermark, matrix, chunks)
+
+
+def _save_locked(
+    directory: str,
+    mentor_id: str,
+    version: int,
+    watermark: datetime,
+    matrix: np.ndarray,
+    chunks: List[Dict],
+) -> str:
+    manifest_path = _manifest_path(directory, mentor_id)
+    matrix_name = f"{_stem(mentor_id)}.{uuid.uuid4().hex[:12]}.npy"
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        tmp_matrix = f.name
+    os.replace(tmp_matrix, os.path.join(directory, matrix_name))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "mentor_id": mentor_id,
+        "version": version,
+        "watermark": watermark.isoformat(),
+        "rows": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "matrix_file": matrix_name,
+        "chunks": chunks,
+    }
+    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+        tmp_manifest = f.name
+    os.replace(tmp_manifest, manifest_path)
+
+    # Workers that mapped an old matrix keep their mapping after the unlink
+    for name in _matrix_files(directory, mentor_id):
+        if name != matrix_name:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return os.path.join(directory, matrix_name)
+
+
+def load_snapshot(directory: str, mentor_id: str) -> Optional[Dict]:
+    """
+    Map a mentor's snapshot read-only
+    Returns {"version", "watermark", "matrix" (np.memmap), "chunks"} or None
+    """
+    try:
+        manifest = _read_manifest(_manifest_path(directory, mentor_id))
+        if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT:
+            return None
+        matrix = np.load(os.path.join(directory, manifest["matrix_file"]), mmap_mode="r")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring vector index snapshot for mentor {mentor_id}: {e}")
+        return None
+    if (
+        matrix.dtype != np.float32
+        or matrix.ndim != 2
+        or matrix.shape != (manifest["rows"], manifest["dim"])
+        or len(manifest["chunks"]) != manifest["rows"]
+    ):
+        print(f"Ignoring vector index snapshot for mentor {mentor_id}: shape mismatch")
+        return None
+    return {
+        "version": manifest["version"],
+        "watermark": datetime.fromisoformat(manifest["watermark"]),
+        "matrix": matrix,
+        "chunks": manifest["chunks"],
+    }
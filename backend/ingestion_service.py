@@ -0,0 +1,382 @@
+"""
+Background ingestion pipeline for mentor content uploads.
+
+/mentor/content/upload only stores the file and enqueues a job in the
+ingestion_jobs collection. A pool of asyncio workers claims jobs from
+MongoDB and advances each one through its stages:
+  EXTRACTING -> EMBEDDING -> PROFILING -> COMPLETED
+The upload is copied from GridFS to a temporary file chunk by chunk, and
+extractors read from that file instead of an in-memory copy. PDF pages are
+streamed from a process pool, so for PDFs extraction keeps running during
+EMBEDDING. Progress (stage, chunks_done/chunks_total) is
+written to mentor_content so get_content_details can report it while the
+job runs.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+from dependencies import get_fs_bucket, logger
+from exceptions import ContentProcessingError
+from pdf_extraction import stream_pdf_pages
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# How long a claimed job may go without a heartbeat before another worker retries it
+INGESTION_LEASE_SECONDS = int(os.getenv("INGESTION_LEASE_SECONDS", "600"))
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+# Fallback polling interval for jobs enqueued by other processes
+INGESTION_POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", "5"))
+# Characters of extracted text sent to the agent profile analysis
+PROFILE_SAMPLE_CHARS = 10000
+# Bytes copied from GridFS to the worker's temporary file per read
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class JobStatus:
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    ERROR = "ERROR"
+
+
+class _ContentRemoved(Exception):
+    """The content (or its job) was deleted while the job was running"""
+
+
+class IngestionStage:
+    QUEUED = "QUEUED"
+    EXTRACTING = "EXTRACTING"
+    EMBEDDING = "EMBEDDING"
+    PROFILING = "PROFILING"
+    COMPLETED = "COMPLETED"
+
+
+async def _single(text: str):
+    yield text
+
+
+async def download_upload(file_id, filename: str) -> str:
+    """Copy a stored upload from GridFS to a temporary file. Returns its path (caller removes it)"""
+    grid_out = await get_fs_bucket().open_download_stream(file_id)
+    fd, path = tempfile.mkstemp(prefix="ingest-", suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await grid_out.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def extract_text(file_type: str, path: str) -> str:
+    """Extract plain text from a DOCX upload (blocking — run off the event loop)"""
+    extracted_text = ""
+    if file_type == "DOCX":
+        try:
+            import docx as python_docx
+            doc = python_docx.Document(path)
+            extracted_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+        except Exception as e:
+            raise ContentProcessingError(f"Erro ao processar DOCX: {str(e)}")
+        if not extracted_text.strip():
+            raise ContentProcessingError("Nao foi possivel extrair texto do DOCX")
+
+    return extracted_text
+
+
+class IngestionService:
+    """Mongo-backed job queue plus a local pool of asyncio ingestion workers"""
+
+    def __init__(self, rag_service, profile_service, transcription_service, workers: int = INGESTION_WORKERS):
+        self.rag_service = rag_service
+        self.profile_service = profile_service
+        self.transcription_service = transcription_service
+        self.workers = workers
+        self._db = None
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self, db) -> None:
+        """Start the worker pool on the running event loop"""
+        if self._tasks:
+            return
+        self._db = db
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker_loop(i)) for i in range(self.workers)]
+        logger.info(f"Ingestion pipeline started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, db, content_id: str, mentor_id: str, file_id, filename: str,
+                      file_type: str, title: str) -> None:
+        """Create the job for a freshly uploaded content and wake a worker"""
+        now = datetime.utcnow()
+        await db.ingestion_jobs.insert_one({
+            "_id": content_id,
+            "mentor_id": mentor_id,
+            "file_id": file_id,
+            "filename": filename,
+            "file_type": file_type,
+            "title": title,
+            "status": JobStatus.QUEUED,
+            "attempts": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker_loop(self, worker_id: int) -> None:
+        while True:
+            try:
+                job = await self._claim()
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=INGESTION_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker {worker_id} error: {e}")
+                await asyncio.sleep(INGESTION_POLL_SECONDS)
+
+    async def _claim(self) -> Optional[Dict]:
+        """Atomically take the oldest queued job (or one whose lease expired)"""
+        now = datetime.utcnow()
+        return await self._db.ingestion_jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JobStatus.QUEUED},
+                    {"status": JobStatus.RUNNING, "lease_expires_at": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "lease_expires_at": now + timedelta(seconds=INGESTION_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _progress(self, job: Dict, **fields) -> None:
+        """Record stage/progress on the content document and renew the job lease"""
+        await self._db.mentor_content.update_one({"_id": job["_id"]}, {"$set": fields})
+        await self._renew_lease(job)
+
+    async def _renew_lease(self, job: Dict) -> None:
+        now = datetime.utcnow()
+        await self._db.ingestion_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "lease_expires_at": now + timedelta(seconds=INGESTION_LEASE_SECONDS),
+                "updated_at": now,
+            }},
+        )
+
+    async def _heartbeat(self, job: Dict) -> None:
+        """Renew the lease during steps that report no progress (e.g. a long transcription)"""
+        while True:
+            await asyncio.sleep(INGESTION_LEASE_SECONDS / 3)
+            try:
+                await self._renew_lease(job)
+            except Exception as e:
+                logger.warning(f"Could not renew lease of ingestion job {job['_id']}: {e}")
+
+    async def _ensure_alive(self, job: Dict) -> None:
+        """Stop the job if the mentor deleted the content while it ran"""
+        content = await self._db.mentor_content.find_one({"_id": job["_id"]}, {"_id": 1})
+        if content is None or await self._db.ingestion_jobs.find_one({"_id": job["_id"]}, {"_id": 1}) is None:
+            raise _ContentRemoved()
+
+    async def _discard(self, job: Dict) -> None:
+        """Remove whatever a cancelled job already stored"""
+        db = self._db
+        result = await db.content_chunks.delete_many({"content_id": job["_id"]})
+        await self.rag_service.vector_index.on_content_removed(db, job["mentor_id"], job["_id"])
+        await db.ingestion_jobs.delete_one({"_id": job["_id"]})
+        logger.info(f"Content {job['_id']} was deleted during ingestion; removed {result.deleted_count} chunks")
+
+    async def _run(self, job: Dict) -> None:
+        db = self._db
+        content_id, mentor_id = job["_id"], job["mentor_id"]
+        started = datetime.utcnow()
+        if job["attempts"] > INGESTION_MAX_ATTEMPTS:
+            # Lease expired on the last attempt (worker crashed mid-job)
+            await self._fail(job, job.get("error") or "Tentativas de processamento esgotadas", retry=False)
+            return
+        if not await db.mentor_content.find_one({"_id": content_id}, {"_id": 1}):
+            # Content was deleted while the job was queued
+            await db.ingestion_jobs.delete_one({"_id": content_id})
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        source_path = None
+        try:
+            await self._progress(job, stage=IngestionStage.EXTRACTING)
+            source_path = await download_upload(job["file_id"], job["filename"])
+
+            # A retried job must not duplicate chunks from the failed attempt
+            if job["attempts"] > 1:
+                await db.content_chunks.delete_many({"content_id": content_id})
+                await self.rag_service.vector_index.on_content_removed(db, mentor_id, content_id)
+
+            extraction_stats = {}
+            if job["file_type"] == "PDF":
+                # Early pages are chunked and embedded while later ones are still parsed
+                text_stream = stream_pdf_pages(source_path, extraction_stats)
+            else:
+                if job["file_type"] in ("VIDEO", "AUDIO"):
+                    # Whisper windows are cut from the whole recording, so media is read in full
+                    media = await asyncio.to_thread(_read_file, source_path)
+                    extracted_text = await self.transcription_service.transcribe(media, job["filename"])
+                    del media
+                    if not extracted_text.strip():
+                        raise ContentProcessingError("Nao foi possivel transcrever o arquivo de audio/video")
+                else:
+                    extracted_text = await asyncio.to_thread(extract_text, job["file_type"], source_path)
+                text_stream = _single(extracted_text)
+                del extracted_text
+
+            # Only the beginning of the text is kept for the preview and the profile
+            head = []
+
+            async def sampled(stream):
+                kept = 0
+                async for piece in stream:
+                    if kept < PROFILE_SAMPLE_CHARS:
+                        head.append(piece[:PROFILE_SAMPLE_CHARS - kept])
+                        kept += len(head[-1])
+                    yield piece
+
+            await self._progress(job, stage=IngestionStage.EMBEDDING, chunks_done=0, chunks_total=0)
+
+            async def on_progress(done: int, total: int):
+                await self._ensure_alive(job)
+                await self._progress(job, chunks_done=done, chunks_total=total)
+
+            chunks_processed = await self.rag_service.process_content_stream(
+                sampled(text_stream),
+                mentor_id=mentor_id,
+                content_id=content_id,
+                title=job["title"],
+                db=db,
+                on_progress=on_progress,
+            )
+            sample_text = "\n".join(head)
+
+            fields = {"stage": IngestionStage.PROFILING, "processed_text": sample_text[:5000]}
+            if extraction_stats.get("page_seconds"):
+                page_seconds = extraction_stats["page_seconds"]
+                fields["extraction"] = {
+                    "pages": extraction_stats["pages"],
+                    "seconds": extraction_stats["seconds"],
+                    "slowest_page": extraction_stats["slowest_page"],
+                    "slowest_page_seconds": page_seconds[extraction_stats["slowest_page"] - 1],
+                }
+                # Full per-page timings stay on the job document
+                await db.ingestion_jobs.update_one({"_id": content_id}, {"$set": {"page_seconds": page_seconds}})
+                logger.info(
+                    f"Extracted {extraction_stats['pages']} pages of {content_id} in {extraction_stats['seconds']}s "
+                    f"(slowest: page {extraction_stats['slowest_page']})"
+                )
+            await self._progress(job, **fields)
+            await self._ensure_alive(job)
+            await self._update_agent_profile(mentor_id, sample_text)
+
+            await self._ensure_alive(job)
+            await db.mentor_content.update_one(
+                {"_id": content_id},
+                {"$set": {"status": "COMPLETED", "stage": IngestionStage.COMPLETED}},
+            )
+            await self.rag_service.answer_cache.invalidate(db, mentor_id)
+            await db.ingestion_jobs.update_one(
+                {"_id": content_id},
+                {"$set": {"status": JobStatus.DONE, "finished_at": datetime.utcnow(), "updated_at": datetime.utcnow()}},
+            )
+            elapsed = (datetime.utcnow() - started).total_seconds()
+            logger.info(f"Processed {chunks_processed} chunks for content {content_id} (type: {job['file_type']}) in {elapsed:.1f}s")
+
+        except _ContentRemoved:
+            await self._discard(job)
+        except ContentProcessingError as e:
+            # Bad input: retrying will not help
+            await self._fail(job, str(e), retry=False)
+        except Exception as e:
+            # Includes EmbeddingGenerationError once a batch ran out of retries (e.g. OpenAI outage)
+            logger.error(f"Error ingesting content {content_id} (attempt {job['attempts']}): {e}")
+            await self._fail(job, str(e), retry=job["attempts"] < INGESTION_MAX_ATTEMPTS)
+        finally:
+            heartbeat.cancel()
+            if source_path:
+                os.unlink(source_path)
+
+    async def _fail(self, job: Dict, error: str, retry: bool) -> None:
+        # A failed attempt must leave no chunks behind: the retry re-embeds everything
+        removed = await self._db.content_chunks.delete_many({"content_id": job["_id"]})
+        if removed.deleted_count:
+            await self.rag_service.vector_index.on_content_removed(self._db, job["mentor_id"], job["_id"])
+        now = datetime.utcnow()
+        if retry:
+            await self._db.ingestion_jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": JobStatus.QUEUED, "error": error, "updated_at": now}},
+            )
+            return
+        await self._db.ingestion_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": JobStatus.ERROR, "error": error, "finished_at": now, "updated_at": now}},
+        )
+        await self._db.mentor_content.update_one(
+            {"_id": job["_id"]}, {"$set": {"status": "ERROR", "error": error}}
+        )
+
+    async def _update_agent_profile(self, mentor_id: str, extracted_text: str) -> None:
+        """Generate / update the AI agent profile (pending mentor approval)"""
+        db = self._db
+        try:
+            mentor_doc = await db.mentors.find_one({"_id": mentor_id})
+            existing_profile = mentor_doc.get("agent_profile")
+            profile_data = await self.profile_service.analyze_content_and_generate_profile(
+                content_text=extracted_text,
+                mentor_name=mentor_doc["full_name"],
+                mentor_specialty=mentor_doc["specialty"],
+                existing_profile=existing_profile,
+            )
+            await db.mentors.update_one(
+                {"_id": mentor_id},
+                {"$set": {
+                    "agent_profile_pending": profile_data["profile_text"],
+                    "style_traits_pending": profile_data["style_traits"],
+                    "profile_status": "PENDING_APPROVAL",
+                    "profile_updated_at": datetime.utcnow(),
+                }}
+            )
+            logger.info(f"AI agent profile PENDING APPROVAL (source: {profile_data['analysis_source']})")
+        except Exception as profile_error:
+            logger.error(f"Error generating agent profile: {profile_error}")
@@ -0,0 +1,146 @@
+"""
+In-process BM25 lexical index for hybrid retrieval.
+
+Dense embeddings blur exact terms (drug names, doses, ICD codes), so each
+mentor's chunks are also kept in an inverted index. Text is folded for
+Portuguese (lowercase, accents stripped) and common stopwords are dropped;
+decimal numbers and codes such as "i10.9" or "2,5" stay single tokens.
+
+Lexical and vector rankings are combined with reciprocal-rank fusion. When
+the embedding API is unavailable, the lexical ranking alone still serves
+retrieval. A chunk found by BM25 alone must cover most of the query's idf
+weight (LEXICAL_ONLY_MIN_COVERAGE) before it is used as context.
+"""
+
+import heapq
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Share of the query's idf weight a chunk must contain to count as relevant
+LEXICAL_MIN_COVERAGE = float(os.getenv("LEXICAL_MIN_COVERAGE", "0.5"))
+# Stricter coverage for chunks found by BM25 alone (no vector match) before they serve as context
+LEXICAL_ONLY_MIN_COVERAGE = float(os.getenv("LEXICAL_ONLY_MIN_COVERAGE", "0.8"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidates taken from each ranking before fusion, as a multiple of top_k
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles depois do dos e ela elas ele eles em entre era
+essa essas esse esses esta estao estas este estes eu foi foram ha isso isto ja la lhe lhes mais
+mas me mesmo meu minha muito na nao nas nem no nos num numa o os ou para pela pelas pelo pelos
+por qual quais quando que quem se sem ser seu seus so sua suas tambem te tem tinha um uma uns umas
+voce voces vos sobre onde sao seja
+""".split())
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents (NFKD, combining marks removed)"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded tokens without stopwords"""
+    return [t for t in _TOKEN.findall(fold(text)) if t not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = RRF_K) -> Dict[str, float]:
+    """RRF score per id over several best-first rankings"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return fused
+
+
+def fused_relevance(fused_score: float, n_rankings: int = 2, k: int = RRF_K) -> float:
+    """RRF score scaled to [0, 1] (1.0 for an id ranked first in every ranking), comparable across shards"""
+    return fused_score * (k + 1) / n_rankings
+
+
+class LexicalIndex:
+    """BM25 postings for one mentor's chunks, keyed by chunk_id"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, chunks: Iterable[Dict]) -> None:
+        """Index chunk metadata dicts (chunk_id, text)"""
+        for chunk in chunks:
+            chunk_id = chunk["chunk_id"]
+            if chunk_id in self.doc_len:
+                continue
+            terms = Counter(tokenize(chunk.get("text", "")))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            length = sum(terms.values())
+            self.doc_len[chunk_id] = length
+            self.total_len += length
+
+    def remove(self, chunks: Iterable[Dict]) -> None:
+        """Drop chunks (re-tokenizes their text to find the postings to clear)"""
+        for chunk in chunks:
+            chunk_id = chunk["chunk_id"]
+            length = self.doc_len.pop(chunk_id, None)
+            if length is None:
+                continue
+            self.total_len -= length
+            for term in set(tokenize(chunk.get("text", ""))):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(chunk_id, None)
+                    if not docs:
+                        del self.postings[term]
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_len)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int, min_coverage: Optional[float] = None) -> List[Tuple[str, float, float]]:
+        """
+        BM25 ranking of chunks sharing terms with the query
+        Returns: [(chunk_id, bm25_score, coverage), ...] best first, where coverage
+        is the share of the query's idf weight found in the chunk
+        """
+        if not self.doc_len:
+            return []
+        min_coverage = LEXICAL_MIN_COVERAGE if min_coverage is None else min_coverage
+        # Every query term counts toward coverage; a term no chunk contains gets the
+        # df=0 idf, so "amiodarona intoxicacao" does not fully match a chunk on amiodarona
+        terms = list(dict.fromkeys(tokenize(query)))
+        idfs = {term: self._idf(term) for term in terms}
+        total_idf = sum(idfs.values())
+        if not total_idf:
+            return []
+        avg_len = self.total_len / len(self.doc_len) or 1.0
+        scores: Dict[str, float] = {}
+        matched: Dict[str, float] = {}
+        for term in terms:
+            if term not in self.postings:
+                continue
+            idf = idfs[term]
+            for chunk_id, tf in self.postings[term].items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[chunk_id] / avg_len)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched[chunk_id] = matched.get(chunk_id, 0.0) + idf
+        hits = (
+            (chunk_id, score, matched[chunk_id] / total_idf)
+            for chunk_id, score in scores.items()
+            if matched[chunk_id] / total_idf >= min_coverage
+        )
+        return heapq.nlargest(top_k, hits, key=lambda h: h[1])
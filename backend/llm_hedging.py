@@ -0,0 +1,115 @@
+"""
+Hedged requests across AI providers.
+
+Instead of waiting for the primary provider to fail completely before trying
+the fallback, the fallback is started once the primary has been running for
+longer than its usual latency (hedge mode) or right away (race mode). The
+first non-empty answer wins and the other request is cancelled.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# off: sequential fallback, hedge: start fallback after a latency percentile, race: start both at once
+# Opt-in: hedging can pay for two completions per question
+LLM_HEDGE_MODE = os.getenv("LLM_HEDGE_MODE", "off").lower()
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Used until a provider has LLM_HEDGE_MIN_SAMPLES latency samples
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "8"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+# Hard per-provider limits (seconds)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "45"))
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "45"))
+
+
+class LatencyTracker:
+    """
+    Sliding window of call latencies for one provider. Calls cut short by a
+    timeout or a winning hedge are recorded with their elapsed time, a lower
+    bound, so a provider whose slow calls never finish does not look fast.
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[rank]
+
+    def hedge_delay(self, p: float = LLM_HEDGE_PERCENTILE) -> float:
+        if len(self) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        return self.percentile(p)
+
+
+async def call_with_timeout(
+    name: str,
+    call: Callable[[], Awaitable[str]],
+    timeout: float,
+    tracker: Optional[LatencyTracker] = None,
+) -> str:
+    """Run one provider call with a hard timeout, recording its latency (a lower bound if cut short)"""
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(call(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if tracker is not None:
+            tracker.record(time.monotonic() - started)
+        raise
+    if tracker is not None:
+        tracker.record(time.monotonic() - started)
+    return result
+
+
+async def first_valid(
+    calls: List[Tuple[str, Callable[[], Awaitable[str]]]],
+    hedge_delay: float,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Run calls[0] and start each next call after hedge_delay seconds (or as soon
+    as every running call has failed). Returns (answer, name) for the first
+    non-empty answer, cancelling the rest, or (None, None) if all fail.
+    """
+    names: Dict[asyncio.Task, str] = {}
+    pending = set()
+    queue = list(calls)
+    loop = asyncio.get_running_loop()
+    next_start = loop.time()
+    try:
+        while pending or queue:
+            if queue and (not pending or loop.time() >= next_start):
+                name, call = queue.pop(0)
+                task = asyncio.create_task(call())
+                names[task] = name
+                pending.add(task)
+                next_start = loop.time() + hedge_delay
+                continue
+            timeout = max(0.0, next_start - loop.time()) if queue else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = names[task]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"{name} failed: {e!r}")
+                    continue
+                if result and result.strip():
+                    return result, name
+                print(f"{name} returned an empty answer")
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
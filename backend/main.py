@@ -2,27 +2,39 @@
 MedMentor API - main application entry point.
 All business logic lives in routers/.
 """
+import asyncio
 from datetime import datetime
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
-from dependencies import db, close_db, logger
+from dependencies import db, get_db, close_db, logger
+from auth_utils import get_current_user, password_hash_stats
+from db_indexes import ENSURE_INDEXES_ON_STARTUP, ensure_indexes
 
 # Services (initialized once)
 from multi_ai_rag_service import MultiAIRAGService
 from mentor_profile_service import MentorProfileService
 from anonymization_service import AnonymizationService
+from ingestion_service import IngestionService
+from transcription_service import TranscriptionService
+from mentor_directory import MentorDirectory
+from pdf_extraction import shutdown_pdf_executor
 
 multi_ai_rag_service = MultiAIRAGService()
 mentor_profile_service = MentorProfileService()
 anonymization_svc = AnonymizationService()
+transcription_service = TranscriptionService()
+mentor_directory = MentorDirectory()
+ingestion_service = IngestionService(multi_ai_rag_service, mentor_profile_service, transcription_service)
 
 # Import routers
 from routers import auth, users, mentors, chat, analytics
 
 # Inject shared services into routers that need them
-mentors._init_services(multi_ai_rag_service, mentor_profile_service)
-chat._init_services(multi_ai_rag_service, mentor_profile_service, anonymization_svc)
+mentors._init_services(multi_ai_rag_service, mentor_profile_service, ingestion_service, mentor_directory)
+chat._init_services(
+    multi_ai_rag_service, mentor_profile_service, anonymization_svc, transcription_service, mentor_directory
+)
 
 # FastAPI app
 app = FastAPI(title="MedMentor API", version="2.0.0")
@@ -34,6 +46,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Top-level router with /api prefix
@@ -48,6 +61,14 @@ async def health_check():
         "service": "MedMentor API",
     }
 
+# Internal metrics (authenticated: pool saturation is not for anonymous callers)
+@api_router.get("/metrics")
+async def internal_metrics(current_user: dict = Depends(get_current_user)):
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "password_hashing": password_hash_stats(),
+    }
+
 # Mount sub-routers
 api_router.include_router(auth.router)
 api_router.include_router(users.router)
@@ -58,6 +79,42 @@ api_router.include_router(analytics.router)
 app.include_router(api_router)
 
 
+@app.on_event("startup")
+async def start_ingestion_workers():
+    ingestion_service.start(get_db())
+
+
+async def _reconcile_indexes():
+    try:
+        report = await ensure_indexes(get_db())
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+        return
+    for ix in report["created"]:
+        logger.info(f"Created index {ix['collection']}.{ix['name']}")
+    for ix in report["failed"]:
+        logger.error(f"Could not create index {ix['collection']}.{ix['name']}: {ix['error']}")
+    for ix in report["extra"]:
+        logger.warning(f"Index {ix['collection']}.{ix['name']} is not in the registry (ops: {ix['ops']})")
+    for ix in report["unused"]:
+        logger.info(f"Index {ix['collection']}.{ix['name']} has not been used since the server started")
+
+
+# Strong references to startup background tasks (the loop only keeps weak ones)
+_background_tasks = set()
+
+
+@app.on_event("startup")
+async def start_index_reconciliation():
+    # In the background: building an index on a large collection must not delay startup
+    if ENSURE_INDEXES_ON_STARTUP:
+        task = asyncio.create_task(_reconcile_indexes())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await ingestion_service.stop()
+    shutdown_pdf_executor()
     close_db()
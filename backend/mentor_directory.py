@@ -0,0 +1,56 @@
+"""
+Cached mentor directory: mentor id -> display fields (full_name, specialty, avatar_url).
+
+Replaces per-row db.mentors.find_one calls in listings and search results
+with one batched $in lookup for whatever is not cached yet. Entries expire
+after MENTOR_DIRECTORY_TTL seconds so renames made through another worker
+show up; the worker that handles a rename or deletion invalidates at once.
+"""
+
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+MENTOR_DIRECTORY_TTL = float(os.getenv("MENTOR_DIRECTORY_TTL", "300"))
+DIRECTORY_PROJECTION = {"full_name": 1, "specialty": 1, "avatar_url": 1}
+
+
+class MentorDirectory:
+    """Process-local TTL cache of mentor display fields"""
+
+    def __init__(self, ttl: float = MENTOR_DIRECTORY_TTL):
+        self.ttl = ttl
+        # mentor_id -> (loaded_at, doc or None when the mentor does not exist)
+        self._entries: Dict[str, Tuple[float, Optional[Dict]]] = {}
+
+    async def get_many(self, db, mentor_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Display fields for each existing mentor in mentor_ids"""
+        now = time.monotonic()
+        found, missing = {}, []
+        for mentor_id in dict.fromkeys(mentor_ids):
+            entry = self._entries.get(mentor_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                if entry[1] is not None:
+                    found[mentor_id] = entry[1]
+            else:
+                missing.append(mentor_id)
+
+        if missing:
+            docs = await db.mentors.find({"_id": {"$in": missing}}, DIRECTORY_PROJECTION).to_list(None)
+            by_id = {doc["_id"]: doc for doc in docs}
+            for mentor_id in missing:
+                doc = by_id.get(mentor_id)
+                self._entries[mentor_id] = (now, doc)
+                if doc is not None:
+                    found[mentor_id] = doc
+        return found
+
+    async def get(self, db, mentor_id: str) -> Optional[Dict]:
+        return (await self.get_many(db, [mentor_id])).get(mentor_id)
+
+    def invalidate(self, mentor_id: Optional[str] = None) -> None:
+        """Forget one mentor (or everyone) so the next lookup reads MongoDB"""
+        if mentor_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(mentor_id, None)
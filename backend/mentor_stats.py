@@ -0,0 +1,121 @@
+"""
+Pre-aggregated per-mentor counters for the impactometer.
+
+Instead of scanning messages on every page view, chat and feedback writes
+$inc small counter documents in mentor_daily_stats:
+
+  {_id: "<mentor_id>:<YYYY-MM-DD>", mentor_id, day,
+   queries, likes, dislikes, terms: {word: count}}
+  {_id: "<mentor_id>:all", mentor_id, day: "all",
+   queries, likes, dislikes, conversations, users}
+
+A user is counted in "users" when an upsert of their
+{_id: "<mentor_id>:<user_id>"} marker in mentor_users inserts it, so two
+concurrent first conversations count the user once.
+
+Likes/dislikes are counted on the day the answer was sent. Reads fetch at
+most one document per day in the window plus the all-time document by _id.
+scripts/backfill_mentor_stats.py rebuilds the counters from messages.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+DAY_FORMAT = "%Y-%m-%d"
+ALL_TIME = "all"
+
+_WORD = re.compile(r'\b[a-záàâãéèêíïóôõöúçñ]{4,}\b')
+
+TOPIC_STOP_WORDS = frozenset({
+    "de", "da", "do", "a", "o", "e", "em", "para", "que", "um", "uma",
+    "os", "as", "no", "na", "por", "com", "se", "ao", "dos", "das",
+    "como", "qual", "quais", "sobre", "entre", "mais", "pode", "sua",
+    "seu", "meu", "minha", "quero", "saber", "favor", "obrigado",
+    "olá", "oi", "bom", "dia", "boa", "tarde", "noite", "dr", "dra",
+    "doutor", "doutora", "me", "fale", "explique", "poderia",
+    "gostaria", "preciso", "é", "são",
+})
+
+_FEEDBACK_FIELDS = {"LIKE": "likes", "DISLIKE": "dislikes"}
+
+
+def topic_terms(text: str) -> List[str]:
+    """Words counted as hot topics in a user question"""
+    return [w for w in _WORD.findall(text.lower()) if w not in TOPIC_STOP_WORDS]
+
+
+def _doc_id(mentor_id: str, day: str) -> str:
+    return f"{mentor_id}:{day}"
+
+
+async def _inc(db, mentor_id: str, day: str, inc: Dict[str, int]) -> None:
+    await db.mentor_daily_stats.update_one(
+        {"_id": _doc_id(mentor_id, day)},
+        {"$inc": inc, "$setOnInsert": {"mentor_id": mentor_id, "day": day}},
+        upsert=True,
+    )
+
+
+async def _first_with_mentor(db, mentor_id: str, user_id: str) -> bool:
+    """Atomically mark user_id as seen by mentor_id. True only for the call that created the marker"""
+    try:
+        result = await db.mentor_users.update_one(
+            {"_id": _doc_id(mentor_id, user_id)},
+            {"$setOnInsert": {"mentor_id": mentor_id, "user_id": user_id, "first_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Lost the upsert race to a concurrent first conversation
+        return False
+    return result.upserted_id is not None
+
+
+async def record_conversation(db, mentor_id: str, user_id: str) -> None:
+    """Count a new conversation (and the user, on their first conversation with this mentor)"""
+    new_user = await _first_with_mentor(db, mentor_id, user_id)
+    await _inc(db, mentor_id, ALL_TIME, {"conversations": 1, "users": 1 if new_user else 0})
+
+
+async def record_query(db, mentor_id: str, question: str, at: Optional[datetime] = None) -> None:
+    """Count an answered question and its topic words"""
+    day = (at or datetime.utcnow()).strftime(DAY_FORMAT)
+    inc = {"queries": 1}
+    for term in topic_terms(question):
+        inc[f"terms.{term}"] = inc.get(f"terms.{term}", 0) + 1
+    await _inc(db, mentor_id, day, inc)
+    await _inc(db, mentor_id, ALL_TIME, {"queries": 1})
+
+
+async def record_feedback(db, mentor_id: str, sent_at: datetime, old: Optional[str], new: Optional[str]) -> None:
+    """Move an answer's rating between the like/dislike counters"""
+    inc = {}
+    if old in _FEEDBACK_FIELDS:
+        inc[_FEEDBACK_FIELDS[old]] = -1
+    if new in _FEEDBACK_FIELDS:
+        inc[_FEEDBACK_FIELDS[new]] = inc.get(_FEEDBACK_FIELDS[new], 0) + 1
+    inc = {field: n for field, n in inc.items() if n}
+    if not inc:
+        return
+    await _inc(db, mentor_id, sent_at.strftime(DAY_FORMAT), inc)
+    await _inc(db, mentor_id, ALL_TIME, inc)
+
+
+def window_days(days: int, today: Optional[date] = None) -> List[date]:
+    """The last `days` days, oldest first, ending today (UTC)"""
+    today = today or datetime.utcnow().date()
+    return [today - timedelta(days=i) for i in range(days - 1, -1, -1)]
+
+
+async def read_window(db, mentor_id: str, days: int = 30) -> Tuple[Dict, Dict[str, Dict]]:
+    """
+    All-time counters and the per-day documents of the last `days` days
+    Returns: (all_time_doc, {"YYYY-MM-DD": daily_doc}) with missing days absent
+    """
+    day_keys = [d.strftime(DAY_FORMAT) for d in window_days(days)]
+    ids = [_doc_id(mentor_id, day) for day in day_keys + [ALL_TIME]]
+    docs = await db.mentor_daily_stats.find({"_id": {"$in": ids}}).to_list(None)
+    by_day = {doc["day"]: doc for doc in docs}
+    return by_day.pop(ALL_TIME, {}), by_day
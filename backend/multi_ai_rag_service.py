@@ -4,16 +4,27 @@ Supports OpenAI and Claude with automatic fallback
 Uses mentor-specific personality profiles for responses
 """
 
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Callable, Awaitable, AsyncIterator
 import os
 import asyncio
+import logging
 from datetime import datetime
 import tiktoken
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
+from vector_index import VectorIndexService
+from ann_index import cosine_top_k
+from lexical_index import HYBRID_RETRIEVAL
+from text_chunker import StreamingChunker, iter_chunks
+from embedding_cache import EmbeddingCache, cache_key
+from embedding_codec import embedding_fields
+from answer_cache import AnswerCache
+from llm_hedging import (
+    LLM_HEDGE_MODE, OPENAI_TIMEOUT, ANTHROPIC_TIMEOUT,
+    LatencyTracker, call_with_timeout, first_valid,
+)
 
 load_dotenv()
 
@@ -23,9 +34,26 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
 
+# Batched embedding during ingestion (OpenAI allows up to 2048 inputs / 300k tokens per request)
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "60000"))
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "256"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+# A failed batch is retried with exponential backoff before the ingestion attempt fails
+EMBEDDING_BATCH_RETRIES = int(os.getenv("EMBEDDING_BATCH_RETRIES", "3"))
+EMBEDDING_RETRY_BASE_SECONDS = float(os.getenv("EMBEDDING_RETRY_BASE_SECONDS", "1"))
+
+# Opt-in: end chunks on sentence/paragraph boundaries instead of the fixed token windows
+# (content ingested with either setting keeps its chunks until it is re-ingested)
+CHUNK_RESPECT_SENTENCES = os.getenv("CHUNK_RESPECT_SENTENCES", "false").lower() == "true"
+
+# Returned when every AI provider fails
+UNAVAILABLE_RESPONSE = "I apologize, but I'm currently unable to process your question due to technical issues. Please try again later."
+
 # Tokenizer for chunking
 encoding = tiktoken.get_encoding("cl100k_base")
 
+logger = logging.getLogger("medmentor")
+
 class MultiAIRAGService:
     """Enhanced RAG Service with multi-AI support and personalized agents"""
     
@@ -40,21 +68,41 @@ class MultiAIRAGService:
         self.chunk_size = 500  # tokens
         self.chunk_overlap = 50  # tokens
         
+        # Resident per-mentor embedding matrices used by /chat retrieval
+        self.vector_index = VectorIndexService()
+        # Embeddings keyed by text hash + model (in-process LRU + MongoDB)
+        self.embedding_cache = EmbeddingCache()
+        # Answers to near-identical questions, per mentor content/profile version
+        self.answer_cache = AnswerCache()
+        
+        # Per-provider latency history drives the hedge delay
+        self.latency = {"openai": LatencyTracker(), "claude": LatencyTracker()}
+        self.timeouts = {"openai": OPENAI_TIMEOUT, "claude": ANTHROPIC_TIMEOUT}
+        self.hedge_mode = LLM_HEDGE_MODE
+        
         print(f"✓ Multi-AI RAG Service initialized - embedding model: {self.embedding_model}")
         
     async def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding using user's OpenAI key (text-embedding-ada-002)
+        Served from the embedding cache when the same text was embedded before
         NEVER returns random vectors - raises exception on complete failure
         """
         from exceptions import EmbeddingGenerationError
         
+        key = cache_key(text, self.embedding_model)
+        cached = await self.embedding_cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        
         try:
             response = await self.openai_client.embeddings.create(
                 model=self.embedding_model,
                 input=text
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            await self.embedding_cache.put_many({key: embedding}, self.embedding_model)
+            return embedding
             
         except Exception as e:
             print(f"Embedding generation failed: {e}")
@@ -64,20 +112,69 @@ class MultiAIRAGService:
                 f"Please ensure embeddings are enabled on your OpenAI account."
             )
     
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts in a single API request
+        Only texts missing from the embedding cache are sent to the API
+        Returns embeddings in the same order as texts
+        """
+        from exceptions import EmbeddingGenerationError
+        
+        keys = [cache_key(text, self.embedding_model) for text in texts]
+        cached = await self.embedding_cache.get_many(list(set(keys)))
+        # One API input per distinct uncached key
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in pending:
+                pending[key] = text
+        if not pending:
+            return [cached[key] for key in keys]
+        
+        try:
+            response = await self.openai_client.embeddings.create(
+                model=self.embedding_model,
+                input=list(pending.values())
+            )
+            fresh = {
+                key: item.embedding
+                for key, item in zip(pending, sorted(response.data, key=lambda d: d.index))
+            }
+            await self.embedding_cache.put_many(fresh, self.embedding_model)
+            cached.update(fresh)
+            return [cached[key] for key in keys]
+            
+        except Exception as e:
+            print(f"Batch embedding generation failed ({len(texts)} texts): {e}")
+            raise EmbeddingGenerationError(
+                f"Failed to generate embeddings with OpenAI: {str(e)}"
+            )
+    
+    def batch_by_tokens(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into batches bounded by token budget and input count"""
+        batches = []
+        current, current_tokens = [], 0
+        for i, text in enumerate(texts):
+            n_tokens = len(encoding.encode(text))
+            if current and (
+                current_tokens + n_tokens > EMBEDDING_BATCH_TOKENS
+                or len(current) >= EMBEDDING_BATCH_MAX_INPUTS
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += n_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    def new_chunker(self) -> StreamingChunker:
+        return StreamingChunker(encoding, self.chunk_size, self.chunk_overlap, CHUNK_RESPECT_SENTENCES)
+    
     def chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks"""
-        tokens = encoding.encode(text)
-        chunks = []
-        
-        start = 0
-        while start < len(tokens):
-            end = start + self.chunk_size
-            chunk_tokens = tokens[start:end]
-            chunk_text = encoding.decode(chunk_tokens)
-            chunks.append(chunk_text)
-            start += (self.chunk_size - self.chunk_overlap)
-        
-        return chunks
+        return list(iter_chunks(
+            encoding, [text], self.chunk_size, self.chunk_overlap, CHUNK_RESPECT_SENTENCES
+        ))
     
     def cosine_similarity_search(
         self, 
@@ -90,12 +187,10 @@ class MultiAIRAGService:
         Find top k most similar documents using cosine similarity
         Returns: (indices, similarity_scores)
         """
-        query_vec = np.array(query_embedding).reshape(1, -1)
-        doc_vecs = np.array(document_embeddings)
-        
-        similarities = cosine_similarity(query_vec, doc_vecs)[0]
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        top_scores = similarities[top_indices]
+        if len(document_embeddings) == 0:
+            return [], []
+        top_indices, top_scores = cosine_top_k(query_embedding, document_embeddings, top_k)
+        top_indices, top_scores = top_indices.tolist(), top_scores.tolist()
         
         # Filter by minimum similarity
         valid_indices = [idx for idx, score in zip(top_indices, top_scores) if score >= min_similarity]
@@ -103,17 +198,83 @@ class MultiAIRAGService:
         
         return valid_indices, valid_scores
     
-    async def generate_rag_response(
-        self, 
-        question: str, 
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """generate_embeddings split into token-bounded requests, sent concurrently"""
+        batches = self.batch_by_tokens(texts)
+        results = await asyncio.gather(*[
+            self.generate_embeddings([texts[i] for i in batch]) for batch in batches
+        ])
+        embeddings: List[List[float]] = [None] * len(texts)
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+    
+    async def retrieve_many(
+        self,
+        db,
+        questions: List[str],
+        mentor_ids: Optional[List[str]] = None,
+        top_k: int = 5,
+        min_similarity: float = 0.45,
+        query_embeddings: Optional[List[List[float]]] = None,
+        hybrid: bool = HYBRID_RETRIEVAL
+    ) -> List[Dict]:
+        """
+        Retrieve context for several questions at once: one embedding request
+        and one matrix-matrix product per mentor index, shards scored in parallel
+        With hybrid, vector and BM25 rankings are fused; if the embedding API
+        fails, retrieval falls back to BM25 alone ("embedding" is then None)
+        mentor_ids limits the search (default: every mentor)
+        Returns per question: {"question", "embedding", "matches": [
+            {"mentor_id", "chunk_id", "content_id", "title", "text", "score"}, ...]} best first
+        """
+        from exceptions import EmbeddingGenerationError
+        
+        if not questions:
+            return []
+        if query_embeddings is None:
+            try:
+                query_embeddings = await self.embed_many(questions)
+            except EmbeddingGenerationError:
+                if not hybrid:
+                    raise
+                print(f"Embeddings unavailable; lexical-only retrieval for {len(questions)} questions")
+        
+        if mentor_ids is None:
+            indexes = await self.vector_index.get_all_indexes(db)
+        else:
+            mentors = await db.mentors.find(
+                {"_id": {"$in": list(mentor_ids)}}, {"_id": 1, "content_version": 1}
+            ).to_list(None)
+            indexes = [
+                await self.vector_index.get_index(db, m["_id"], m.get("content_version", 0))
+                for m in mentors
+            ]
+        
+        per_query = await self.vector_index.search_shards(
+            indexes, query_embeddings, top_k, min_similarity, query_texts=questions if hybrid else None
+        )
+        embeddings = query_embeddings if query_embeddings is not None else [None] * len(questions)
+        return [
+            {
+                "question": question,
+                "embedding": embedding,
+                "matches": [{"mentor_id": mentor_id, **chunk, "score": score} for score, mentor_id, chunk in hits],
+            }
+            for question, embedding, hits in zip(questions, embeddings, per_query)
+        ]
+    
+    def build_rag_prompt(
+        self,
+        question: str,
         context_chunks: List[Dict[str, str]],
         mentor_name: str,
-        mentor_profile: Optional[str] = None,
-        preferred_ai: str = "openai"
-    ) -> Tuple[str, List[Dict], str]:
+        mentor_profile: Optional[str] = None
+    ) -> Tuple[str, str, Dict[str, Dict]]:
         """
-        Generate a response using RAG with personalized agent profile
-        Returns: (response_text, citations, ai_used)
+        Build the RAG prompt with personalized agent profile
+        Returns: (system_message, user_message, citations_map)
         """
         
         # Build context with citations
@@ -155,47 +316,127 @@ PROVIDED KNOWLEDGE:
         
         user_message_text = f"Question: {question}\n\nPlease provide a detailed answer based on the sources above, with proper citations."
         
-        # Try preferred AI first, then fallback
-        if preferred_ai == "openai":
+        return system_message, user_message_text, citations_map
+    
+    @staticmethod
+    def extract_citations(response: str, citations_map: Dict[str, Dict]) -> List[Dict]:
+        """Citations whose [source_N] marker appears in the response"""
+        return [
+            citation_data
+            for source_id, citation_data in citations_map.items()
+            if f"[{source_id}]" in response
+        ]
+    
+    async def generate_rag_response(
+        self, 
+        question: str, 
+        context_chunks: List[Dict[str, str]],
+        mentor_name: str,
+        mentor_profile: Optional[str] = None,
+        preferred_ai: str = "openai"
+    ) -> Tuple[str, List[Dict], str]:
+        """
+        Generate a response using RAG with personalized agent profile
+        Returns: (response_text, citations, ai_used)
+        """
+        system_message, user_message_text, citations_map = self.build_rag_prompt(
+            question, context_chunks, mentor_name, mentor_profile
+        )
+        
+        # Try preferred AI first, then fallback (hedged when LLM_HEDGE_MODE is hedge or race)
+        if self.hedge_mode in ("hedge", "race"):
+            response, ai_used = await self._generate_hedged(system_message, user_message_text, preferred_ai)
+        elif preferred_ai == "openai":
             response, ai_used = await self._try_openai_then_claude(system_message, user_message_text)
         else:
             response, ai_used = await self._try_claude_then_openai(system_message, user_message_text)
         
-        # Extract citations used in response
-        used_citations = []
-        for source_id, citation_data in citations_map.items():
-            if f"[{source_id}]" in response:
-                used_citations.append(citation_data)
+        return response, self.extract_citations(response, citations_map), ai_used
+    
+    async def stream_rag_response(
+        self,
+        system_message: str,
+        user_message: str,
+        preferred_ai: str = "openai"
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a RAG answer as it is generated
+        Yields: (ai_used, text_delta)
+        Falls back to the other provider only if the first one fails before
+        emitting any text; a failure mid-answer is raised to the caller.
+        """
+        providers = [("openai", self._stream_with_openai), ("claude", self._stream_with_claude)]
+        if preferred_ai != "openai":
+            providers.reverse()
         
-        return response, used_citations, ai_used
+        for ai_used, stream in providers:
+            started = False
+            try:
+                async for delta in stream(system_message, user_message):
+                    started = True
+                    yield ai_used, delta
+                return
+            except Exception as e:
+                if started:
+                    raise
+                print(f"{ai_used} streaming failed: {e}, trying next provider...")
+        
+        yield "none", UNAVAILABLE_RESPONSE
+    
+    def _provider_call(self, ai: str, system_message: str, user_message: str) -> Callable[[], Awaitable[str]]:
+        """Zero-arg coroutine factory for one provider, with timeout and latency tracking"""
+        generate = self._generate_with_openai if ai == "openai" else self._generate_with_claude
+        return lambda: call_with_timeout(
+            ai, lambda: generate(system_message, user_message), self.timeouts[ai], self.latency[ai]
+        )
+    
+    async def _generate_hedged(self, system_message: str, user_message: str, preferred_ai: str) -> Tuple[str, str]:
+        """
+        Start the preferred provider, then the other one after the preferred
+        provider's latency percentile (immediately in race mode).
+        First non-empty answer wins; the slower request is cancelled.
+        """
+        primary = "openai" if preferred_ai == "openai" else "claude"
+        secondary = "claude" if primary == "openai" else "openai"
+        delay = 0.0 if self.hedge_mode == "race" else self.latency[primary].hedge_delay()
+        response, ai_used = await first_valid(
+            [
+                (primary, self._provider_call(primary, system_message, user_message)),
+                (secondary, self._provider_call(secondary, system_message, user_message)),
+            ],
+            hedge_delay=delay,
+        )
+        if response is None:
+            return UNAVAILABLE_RESPONSE, "none"
+        return response, ai_used
     
     async def _try_openai_then_claude(self, system_message: str, user_message: str) -> Tuple[str, str]:
         """Try OpenAI first, fallback to Claude if it fails"""
         try:
-            response = await self._generate_with_openai(system_message, user_message)
+            response = await self._provider_call("openai", system_message, user_message)()
             return response, "openai"
         except Exception as e:
             print(f"OpenAI failed: {e}, trying Claude...")
             try:
-                response = await self._generate_with_claude(system_message, user_message)
+                response = await self._provider_call("claude", system_message, user_message)()
                 return response, "claude"
             except Exception as e2:
                 print(f"Claude also failed: {e2}")
-                return "I apologize, but I'm currently unable to process your question due to technical issues. Please try again later.", "none"
+                return UNAVAILABLE_RESPONSE, "none"
     
     async def _try_claude_then_openai(self, system_message: str, user_message: str) -> Tuple[str, str]:
         """Try Claude first, fallback to OpenAI if it fails"""
         try:
-            response = await self._generate_with_claude(system_message, user_message)
+            response = await self._provider_call("claude", system_message, user_message)()
             return response, "claude"
         except Exception as e:
             print(f"Claude failed: {e}, trying OpenAI...")
             try:
-                response = await self._generate_with_openai(system_message, user_message)
+                response = await self._provider_call("openai", system_message, user_message)()
                 return response, "openai"
             except Exception as e2:
                 print(f"OpenAI also failed: {e2}")
-                return "I apologize, but I'm currently unable to process your question due to technical issues. Please try again later.", "none"
+                return UNAVAILABLE_RESPONSE, "none"
     
     async def _generate_with_openai(self, system_message: str, user_message: str) -> str:
         """Generate response using user's OpenAI Key (gpt-4o-mini)"""
@@ -225,45 +466,169 @@ PROVIDED KNOWLEDGE:
         
         return response.content[0].text
     
+    async def _stream_with_openai(self, system_message: str, user_message: str) -> AsyncIterator[str]:
+        """Stream response text deltas from OpenAI"""
+        stream = await self.openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.7,
+            max_tokens=2000,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def _stream_with_claude(self, system_message: str, user_message: str) -> AsyncIterator[str]:
+        """Stream response text deltas from Claude"""
+        async with self.anthropic_client.messages.stream(
+            model=ANTHROPIC_MODEL,
+            max_tokens=2000,
+            temperature=0.7,
+            system=system_message,
+            messages=[
+                {"role": "user", "content": user_message}
+            ]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
+    async def _iter_chunk_windows(self, text_stream: AsyncIterator[str]) -> AsyncIterator[Tuple[str, int]]:
+        """
+        Chunk a stream of text pieces (e.g. PDF pages) as they arrive
+        Yields: (chunk_text, n_tokens) as soon as each chunk is complete
+        """
+        chunker = self.new_chunker()
+        first = True
+        async for piece in text_stream:
+            for chunk in chunker.feed(piece if first else "\n" + piece):
+                yield chunk
+            first = False
+        for chunk in chunker.finish():
+            yield chunk
+    
+    async def process_content_stream(
+        self,
+        text_stream: AsyncIterator[str],
+        mentor_id: str,
+        content_id: str,
+        title: str,
+        db,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+    ) -> int:
+        """
+        Chunk text as it arrives, embed chunks in token-bounded batches (at most
+        EMBEDDING_CONCURRENCY batches in flight) and bulk-store them.
+        on_progress(chunks_done, chunks_seen) is awaited after every batch.
+        If the stream fails, chunks already stored for content_id are removed.
+        A batch that still fails after EMBEDDING_BATCH_RETRIES raises EmbeddingGenerationError.
+        """
+        from exceptions import EmbeddingGenerationError
+        
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        inserted_docs = []
+        tasks = []
+        progress = {"done": 0, "total": 0}
+        
+        async def report(batch_size: int):
+            progress["done"] += batch_size
+            if on_progress:
+                await on_progress(progress["done"], progress["total"])
+        
+        async def embed_batch(batch: List[Tuple[int, str]]) -> List[List[float]]:
+            first, last = batch[0][0], batch[-1][0]
+            for attempt in range(EMBEDDING_BATCH_RETRIES + 1):
+                try:
+                    return await self.generate_embeddings([text for _, text in batch])
+                except EmbeddingGenerationError as e:
+                    if attempt == EMBEDDING_BATCH_RETRIES:
+                        logger.error(f"Embedding chunks {first}-{last} failed after {attempt + 1} attempts: {e}")
+                        raise
+                    delay = EMBEDDING_RETRY_BASE_SECONDS * 2 ** attempt
+                    logger.warning(f"Embedding chunks {first}-{last} failed, retrying in {delay:.0f}s: {e}")
+                    await asyncio.sleep(delay)
+        
+        async def embed_and_store(batch: List[Tuple[int, str]]):
+            first, last = batch[0][0], batch[-1][0]
+            try:
+                # A batch that cannot be embedded fails the whole stream (and the ingestion attempt)
+                embeddings = await embed_batch(batch)
+                
+                now = datetime.utcnow()
+                chunk_docs = [
+                    {
+                        "content_id": content_id,
+                        "mentor_id": mentor_id,
+                        "title": title,
+                        "chunk_index": i,
+                        "text": text,
+                        **embedding_fields(embedding, self.embedding_model),
+                        "created_at": now
+                    }
+                    for (i, text), embedding in zip(batch, embeddings)
+                ]
+                try:
+                    await db.content_chunks.insert_many(chunk_docs, ordered=False)
+                except BulkWriteError as e:
+                    failed = {err["index"] for err in e.details.get("writeErrors", [])}
+                    logger.error(f"Error storing {len(failed)} chunks of batch {first}-{last}")
+                    chunk_docs = [d for j, d in enumerate(chunk_docs) if j not in failed]
+                inserted_docs.extend(chunk_docs)
+            finally:
+                semaphore.release()
+            await report(len(batch))
+        
+        async def flush(batch: List[Tuple[int, str]]):
+            # Backpressure: wait for a free slot before parsing further ahead
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(embed_and_store(batch)))
+        
+        if on_progress:
+            await on_progress(0, 0)
+        try:
+            batch, batch_tokens = [], 0
+            async for text, n_tokens in self._iter_chunk_windows(text_stream):
+                if batch and (
+                    batch_tokens + n_tokens > EMBEDDING_BATCH_TOKENS
+                    or len(batch) >= EMBEDDING_BATCH_MAX_INPUTS
+                ):
+                    await flush(batch)
+                    batch, batch_tokens = [], 0
+                batch.append((progress["total"], text))
+                batch_tokens += n_tokens
+                progress["total"] += 1
+            if batch:
+                await flush(batch)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await db.content_chunks.delete_many({"content_id": content_id})
+            raise
+        
+        if inserted_docs:
+            await self.vector_index.on_chunks_added(db, mentor_id, inserted_docs)
+        
+        return len(inserted_docs)
+    
     async def process_pdf_content(
         self, 
         pdf_text: str, 
         mentor_id: str, 
         content_id: str, 
         title: str, 
-        db
+        db,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> int:
-        """Process PDF content: chunk it, generate embeddings, and store"""
-        
-        # Chunk the text
-        chunks = self.chunk_text(pdf_text)
-        
-        processed_count = 0
-        
-        for i, chunk in enumerate(chunks):
-            try:
-                # Generate embedding
-                embedding = await self.generate_embedding(chunk)
-                
-                # Store chunk with embedding
-                chunk_doc = {
-                    "content_id": content_id,
-                    "mentor_id": mentor_id,
-                    "title": title,
-                    "chunk_index": i,
-                    "text": chunk,
-                    "embedding": embedding,
-                    "created_at": datetime.utcnow()
-                }
-                
-                await db.content_chunks.insert_one(chunk_doc)
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"Error processing chunk {i}: {e}")
-                continue
+        """Process already extracted text (see process_content_stream)"""
+        async def single():
+            yield pdf_text
         
-        return processed_count
+        return await self.process_content_stream(single(), mentor_id, content_id, title, db, on_progress)
 
     async def summarize_conversation_to_soap(
         self, 
@@ -0,0 +1,126 @@
+"""
+Page-parallel PDF text extraction.
+
+The PDF is read from a file on disk (the ingestion worker downloads uploads
+from GridFS into a temporary file) and split into page ranges that are
+parsed by a process pool (PyPDF2 is pure Python, so threads would serialize
+on the GIL). Pages are yielded in order as soon as their range is done, so
+chunking and embedding can start on the first pages of a large textbook
+while later ranges are still being parsed. Only PDF_MAX_RANGES_IN_FLIGHT
+ranges are submitted at a time, so parsed pages waiting for a slow consumer
+stay bounded.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from exceptions import ContentProcessingError
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+# Page ranges submitted to the pool ahead of the consumer
+PDF_MAX_RANGES_IN_FLIGHT = int(os.getenv("PDF_MAX_RANGES_IN_FLIGHT", str(2 * PDF_EXTRACT_WORKERS)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking the server would copy its event loop, threads and Mongo client into the workers
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_pdf_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _count_pages(path: str) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """Runs in a worker process. Returns [(page_number, text, seconds), ...]"""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    pages = []
+    for page_number in range(start, end):
+        started = time.perf_counter()
+        text = reader.pages[page_number].extract_text() or ""
+        pages.append((page_number, text, time.perf_counter() - started))
+    return pages
+
+
+async def stream_pdf_pages(
+    pdf_path: str,
+    stats: Optional[Dict] = None,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> AsyncIterator[str]:
+    """
+    Yield the text of each page in order.
+    stats (if given) is filled with pages, seconds, page_seconds and slowest_page.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_pdf_executor()
+    started = time.perf_counter()
+    page_seconds: List[float] = []
+    found_text = False
+
+    try:
+        total_pages = await loop.run_in_executor(executor, _count_pages, pdf_path)
+    except Exception as e:
+        raise ContentProcessingError(f"Erro ao processar PDF: {str(e)}")
+    if stats is not None:
+        stats["pages"] = total_pages
+
+    starts = iter(range(0, total_pages, pages_per_task))
+    in_flight: Deque[asyncio.Future] = deque()
+
+    def submit_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append(loop.run_in_executor(
+                executor, _extract_page_range, pdf_path, start, min(start + pages_per_task, total_pages)
+            ))
+
+    for _ in range(max(1, PDF_MAX_RANGES_IN_FLIGHT)):
+        submit_next()
+    try:
+        while in_flight:
+            try:
+                pages = await in_flight[0]
+            except Exception as e:
+                raise ContentProcessingError(f"Erro ao processar PDF: {str(e)}")
+            in_flight.popleft()
+            submit_next()
+            for _, text, seconds in pages:
+                page_seconds.append(seconds)
+                if text.strip():
+                    found_text = True
+                    yield text
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    if not found_text:
+        raise ContentProcessingError("Nao foi possivel extrair texto do PDF")
+
+    if stats is not None and page_seconds:
+        slowest = max(range(len(page_seconds)), key=page_seconds.__getitem__)
+        stats.update({
+            "seconds": round(time.perf_counter() - started, 3),
+            "page_seconds": [round(s, 4) for s in page_seconds],
+            "slowest_page": slowest + 1,
+        })
@@ -1,5 +1,4 @@
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from ann_index import cosine_top_k
 from typing import List, Dict, Tuple
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import os
@@ -70,12 +69,9 @@ class RAGService:
         top_k: int = 5
     ) -> List[int]:
         """Find top k most similar documents using cosine similarity"""
-        query_vec = np.array(query_embedding).reshape(1, -1)
-        doc_vecs = np.array(document_embeddings)
-        
-        similarities = cosine_similarity(query_vec, doc_vecs)[0]
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
+        if len(document_embeddings) == 0:
+            return []
+        top_indices, _ = cosine_top_k(query_embedding, document_embeddings, top_k)
         return top_indices.tolist()
     
     async def generate_rag_response(
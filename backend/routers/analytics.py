@@ -1,13 +1,13 @@
 """Analytics router: impactometer and detailed analytics endpoints."""
-import re
 import os
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
+from collections import Counter
 from fastapi import APIRouter, HTTPException, Depends
 
 from dependencies import db, logger
-from models import SenderType, FeedbackType, ContentStatus
+from models import SenderType, ContentStatus
 from auth_utils import get_current_user
+import mentor_stats
 from analytics_service import (
     get_queries_analytics, get_ratings_analytics,
     get_content_analytics, get_feedback_details_analytics,
@@ -51,61 +51,33 @@ async def get_impactometer(current_user: dict = Depends(get_current_user)):
 
     mentor_id = current_user["user_id"]
 
-    conversations = await db.conversations.find(
-        {"mentor_id": mentor_id}, {"_id": 1, "user_id": 1}
-    ).to_list(1000)
-    cids = [c["_id"] for c in conversations]
+    # O(30 days): counters maintained at write time by /chat and feedback (see mentor_stats)
+    all_time, daily = await mentor_stats.read_window(db, mentor_id, days=30)
 
-    bot_messages = await db.messages.find({
-        "conversation_id": {"$in": cids},
-        "sender_type": SenderType.MENTOR_BOT,
-    }, {"sent_at": 1, "feedback": 1}).sort("sent_at", -1).to_list(5000)
-
-    user_messages = await db.messages.find({
-        "conversation_id": {"$in": cids},
-        "sender_type": SenderType.USER,
-    }, {"sent_at": 1, "content": 1}).sort("sent_at", -1).to_list(5000)
-
-    # Queries per day (last 30 days)
-    daily_queries: dict[str, int] = defaultdict(int)
-    for msg in bot_messages:
-        day = msg["sent_at"].strftime("%Y-%m-%d")
-        daily_queries[day] += 1
-
-    today = datetime.utcnow().date()
     queries_timeline = []
-    for i in range(29, -1, -1):
-        d = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+    term_counts: Counter = Counter()
+    for day in mentor_stats.window_days(30):
+        d = day.strftime(mentor_stats.DAY_FORMAT)
+        stats = daily.get(d, {})
+        term_counts.update(stats.get("terms", {}))
         queries_timeline.append({
             "date": d,
-            "label": (today - timedelta(days=i)).strftime("%d/%m"),
-            "count": daily_queries.get(d, 0),
+            "label": day.strftime("%d/%m"),
+            "count": stats.get("queries", 0),
         })
+    # Hot topics cover the same 30 days as the timeline. They used to come from the
+    # mentor's last 5000 questions of any age, so a mentor with little recent
+    # traffic now sees fewer, fresher topics.
+    hot_topics = term_counts.most_common(20)
 
-    # Feedback
-    likes = sum(1 for m in bot_messages if m.get("feedback") == FeedbackType.LIKE)
-    dislikes = sum(1 for m in bot_messages if m.get("feedback") == FeedbackType.DISLIKE)
+    likes = all_time.get("likes", 0)
+    dislikes = all_time.get("dislikes", 0)
     total_feedback = likes + dislikes
 
-    # Hot topics
-    stop_words = {
-        "de", "da", "do", "a", "o", "e", "em", "para", "que", "um", "uma",
-        "os", "as", "no", "na", "por", "com", "se", "ao", "dos", "das",
-        "como", "qual", "quais", "sobre", "entre", "mais", "pode", "sua",
-        "seu", "meu", "minha", "quero", "saber", "favor", "obrigado",
-        "olá", "oi", "bom", "dia", "boa", "tarde", "noite", "dr", "dra",
-        "doutor", "doutora", "me", "fale", "explique", "poderia",
-        "gostaria", "preciso", "é", "são",
-    }
-    word_counts: dict[str, int] = defaultdict(int)
-    for msg in user_messages:
-        words = re.findall(r'\b[a-záàâãéèêíïóôõöúçñ]{4,}\b', msg.get("content", "").lower())
-        for w in words:
-            if w not in stop_words:
-                word_counts[w] += 1
-    hot_topics = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)[:20]
-
-    unique_users = {c.get("user_id", "") for c in conversations}
+    recent_queries = await db.messages.find({
+        "mentor_id": mentor_id,
+        "sender_type": SenderType.USER,
+    }, {"sent_at": 1, "content": 1}).sort("sent_at", -1).limit(10).to_list(10)
 
     total_content = await db.mentor_content.count_documents({
         "mentor_id": mentor_id, "status": ContentStatus.COMPLETED,
@@ -114,9 +86,9 @@ async def get_impactometer(current_user: dict = Depends(get_current_user)):
     like_rate = round(likes / total_feedback * 100, 1) if total_feedback > 0 else 0
 
     return {
-        "total_queries": len(bot_messages),
-        "total_users": len(unique_users),
-        "total_conversations": len(conversations),
+        "total_queries": all_time.get("queries", 0),
+        "total_users": all_time.get("users", 0),
+        "total_conversations": all_time.get("conversations", 0),
         "total_content": total_content,
         "likes": likes,
         "dislikes": dislikes,
@@ -125,7 +97,7 @@ async def get_impactometer(current_user: dict = Depends(get_current_user)):
         "hot_topics": [{"word": w, "count": c} for w, c in hot_topics],
         "recent_queries": [
             {"question": msg.get("content", "")[:100], "sent_at": msg["sent_at"].isoformat()}
-            for msg in user_messages[:10]
+            for msg in recent_queries
         ],
     }
 
@@ -146,13 +118,8 @@ async def get_ai_insights(current_user: dict = Depends(get_current_user)):
             return {"insights": cached["insights"], "generated_at": cached["generated_at"].isoformat(), "cached": True}
 
     # Gather last 50 user questions
-    conversations = await db.conversations.find(
-        {"mentor_id": mentor_id}, {"_id": 1}
-    ).to_list(1000)
-    cids = [c["_id"] for c in conversations]
-
     user_messages = await db.messages.find({
-        "conversation_id": {"$in": cids},
+        "mentor_id": mentor_id,
         "sender_type": SenderType.USER,
     }, {"content": 1, "sent_at": 1}).sort("sent_at", -1).to_list(50)
 
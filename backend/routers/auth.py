@@ -5,7 +5,7 @@ from fastapi import APIRouter, HTTPException, status
 
 from dependencies import db, logger
 from models import UserSignup, MentorSignup, LoginRequest, LoginResponse
-from auth_utils import hash_password, verify_password, create_access_token
+from auth_utils import hash_password_async, verify_password_async, create_access_token
 
 router = APIRouter(tags=["auth"])
 
@@ -24,7 +24,7 @@ async def signup(user_data: UserSignup):
     user_doc = {
         "_id": user_id,
         "email": user_data.email,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password_async(user_data.password),
         "full_name": user_data.full_name,
         "crm": user_data.crm,
         "specialty": user_data.specialty,
@@ -54,7 +54,7 @@ async def mentor_signup(mentor_data: MentorSignup):
     mentor_doc = {
         "_id": mentor_id,
         "email": mentor_data.email,
-        "password_hash": hash_password(mentor_data.password),
+        "password_hash": await hash_password_async(mentor_data.password),
         "full_name": mentor_data.full_name,
         "specialty": mentor_data.specialty,
         "bio": mentor_data.bio,
@@ -78,7 +78,7 @@ async def mentor_signup(mentor_data: MentorSignup):
 async def login(login_data: LoginRequest):
     """Login for users (medical subscribers)"""
     user = await db.users.find_one({"email": login_data.email})
-    if user and verify_password(login_data.password, user["password_hash"]):
+    if user and await verify_password_async(login_data.password, user["password_hash"]):
         token = create_access_token(data={"sub": user["_id"], "type": "user"})
         return LoginResponse(
             access_token=token, user_id=user["_id"], user_type="user"
@@ -94,7 +94,7 @@ async def login(login_data: LoginRequest):
 async def mentor_login(login_data: LoginRequest):
     """Login for mentors"""
     mentor = await db.mentors.find_one({"email": login_data.email})
-    if mentor and verify_password(login_data.password, mentor["password_hash"]):
+    if mentor and await verify_password_async(login_data.password, mentor["password_hash"]):
         token = create_access_token(data={"sub": mentor["_id"], "type": "mentor"})
         return LoginResponse(
             access_token=token, user_id=mentor["_id"], user_type="mentor"
@@ -1,12 +1,16 @@
 """Chat router: chat, conversations, SOAP, feedback, search, transcription."""
 import re
-import io
 import os
+import json
 import uuid
+import base64
+import binascii
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 
 from dependencies import db, logger
 from models import (
@@ -14,21 +18,33 @@ from models import (
     SenderType, FeedbackType,
 )
 from auth_utils import get_current_user
-from exceptions import ResponseValidationError
+from exceptions import ResponseValidationError, ContentProcessingError
+from lexical_index import HYBRID_RETRIEVAL
+import mentor_stats
 
 # Lazy-loaded services
 rag_service = None
 profile_service = None
 anonymization_svc = None
+transcription_svc = None
+mentor_directory = None
 
 router = APIRouter(tags=["chat"])
 
+# Longest preview of the last message kept on a conversation (list_conversations)
+LAST_MESSAGE_PREVIEW_CHARS = 100
 
-def _init_services(rag_svc, prof_svc, anon_svc):
-    global rag_service, profile_service, anonymization_svc
+# Recordings above Whisper's 25MB request limit are split by the transcription service
+TRANSCRIBE_MAX_BYTES = int(os.getenv("TRANSCRIBE_MAX_MB", "200")) * 1024 * 1024
+
+
+def _init_services(rag_svc, prof_svc, anon_svc, transcribe_svc, directory):
+    global rag_service, profile_service, anonymization_svc, transcription_svc, mentor_directory
     rag_service = rag_svc
     profile_service = prof_svc
     anonymization_svc = anon_svc
+    transcription_svc = transcribe_svc
+    mentor_directory = directory
 
 
 def validate_rag_response(response_text: str, citations: list) -> bool:
@@ -57,40 +73,23 @@ async def universal_search(q: str, current_user: dict = Depends(get_current_user
     query = q.strip()
     logger.info(f"Universal search: '{query}' by user {current_user['user_id']}")
     try:
-        # Bug #1 fix: generate_embedding is async — must be awaited
-        query_embedding = await rag_service.generate_embedding(query)
-
-        # Bug #2 fix: chunks live in the content_chunks collection, NOT embedded
-        # inside mentor_content documents. Query content_chunks directly.
-        raw_chunks = await db.content_chunks.find(
-            {},
-            {"embedding": 1, "text": 1, "mentor_id": 1, "title": 1},
-        ).limit(2000).to_list(2000)
-        if not raw_chunks:
+        # Search every mentor's resident index (no cap on library size)
+        retrieval = await rag_service.retrieve_many(db, [query], top_k=15, min_similarity=0.35)
+        matches = retrieval[0]["matches"]
+        if not matches:
             return {"results": [], "query": query, "total_results": 0}
-        all_chunks, chunk_meta = [], []
-        for chunk in raw_chunks:
-            if chunk.get("embedding"):
-                all_chunks.append(chunk["embedding"])
-                chunk_meta.append({
-                    "text": chunk.get("text", ""),
-                    "mentor_id": chunk.get("mentor_id", ""),
-                    "content_title": chunk.get("title", "Conteúdo"),
-                })
-        if not all_chunks:
-            return {"results": [], "query": query, "total_results": 0}
-        indices, scores = rag_service.cosine_similarity_search(query_embedding, all_chunks, top_k=15, min_similarity=0.35)
         mentor_results = {}
-        for idx, score in zip(indices, scores):
-            m = chunk_meta[idx]
-            mid = m["mentor_id"]
+        # Scores are on one scale across mentors (scaled RRF relevance when hybrid, cosine otherwise)
+        for match in matches:
+            mid, score = match["mentor_id"], match["score"]
             if mid not in mentor_results:
                 mentor_results[mid] = {"mentor_id": mid, "mentor_name": "", "specialty": "", "best_score": 0, "excerpts": []}
-            mentor_results[mid]["excerpts"].append({"text": m["text"][:300], "score": round(float(score), 3), "content_title": m["content_title"]})
-            if float(score) > mentor_results[mid]["best_score"]:
-                mentor_results[mid]["best_score"] = round(float(score), 3)
+            mentor_results[mid]["excerpts"].append({"text": match["text"][:300], "score": round(score, 3), "content_title": match["title"] or "Conteúdo"})
+            if score > mentor_results[mid]["best_score"]:
+                mentor_results[mid]["best_score"] = round(score, 3)
+        directory = await mentor_directory.get_many(db, mentor_results)
         for mid, result in mentor_results.items():
-            mentor = await db.mentors.find_one({"_id": mid})
+            mentor = directory.get(mid)
             if mentor:
                 result["mentor_name"] = mentor["full_name"]
                 result["specialty"] = mentor["specialty"]
@@ -104,8 +103,8 @@ async def universal_search(q: str, current_user: dict = Depends(get_current_user
 
 # ---------- chat ----------
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_with_mentor(chat_request: ChatRequest, current_user: dict = Depends(get_current_user)):
+async def _load_chat_mentor(chat_request: ChatRequest, current_user: dict) -> dict:
+    """Check that the user may chat with this mentor's bot and return the mentor"""
     if current_user["user_type"] != "user":
         raise HTTPException(status_code=403, detail="Only medical subscribers can chat")
     mentor = await db.mentors.find_one({"_id": chat_request.mentor_id})
@@ -118,61 +117,107 @@ async def chat_with_mentor(chat_request: ChatRequest, current_user: dict = Depen
         # Block only if there is NO previously-approved profile to fall back to.
         # If agent_profile exists, we continue using the last approved version.
         raise HTTPException(status_code=400, detail="O perfil do bot ainda nao foi aprovado pelo mentor.")
+    return mentor
+
+
+def _message_owner(conv: dict) -> dict:
+    """mentor_id/user_id copied onto every message so mentor queries skip the conversation fan-out"""
+    return {"conversation_id": conv["_id"], "mentor_id": conv["mentor_id"], "user_id": conv["user_id"]}
+
 
+async def _start_turn(chat_request: ChatRequest, current_user: dict) -> Tuple[dict, dict]:
+    """Resolve (or create) the conversation and store the anonymized question"""
     if chat_request.conversation_id:
-        conv = await db.conversations.find_one({"_id": chat_request.conversation_id})
+        conv = await db.conversations.find_one(
+            {"_id": chat_request.conversation_id}, {"mentor_id": 1, "user_id": 1}
+        )
         if not conv:
             raise HTTPException(status_code=404, detail="Conversation not found")
-        conversation_id = chat_request.conversation_id
     else:
-        conversation_id = str(uuid.uuid4())
-        await db.conversations.insert_one({
-            "_id": conversation_id, "user_id": current_user["user_id"],
+        conv = {
+            "_id": str(uuid.uuid4()), "user_id": current_user["user_id"],
             "mentor_id": chat_request.mentor_id,
             "title": chat_request.question[:50] + "...",
             "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
-        })
-
-    anon = anonymization_svc.anonymize_text(chat_request.question, conversation_id=conversation_id)
+        }
+        await db.conversations.insert_one(conv)
+        try:
+            await mentor_stats.record_conversation(db, conv["mentor_id"], conv["user_id"])
+        except Exception as e:
+            logger.error(f"Error updating mentor stats: {e}")
+
+    anon = anonymization_svc.anonymize_text(chat_request.question, conversation_id=conv["_id"])
     await db.messages.insert_one({
-        "_id": str(uuid.uuid4()), "conversation_id": conversation_id,
+        "_id": str(uuid.uuid4()), **_message_owner(conv),
         "sender_type": SenderType.USER, "content": anon["anonymized_text"],
         "original_content_hash": hash(chat_request.question),
         "citations": [], "feedback": FeedbackType.NONE, "sent_at": datetime.utcnow(),
     })
+    return conv, anon
+
 
+async def _embed_question(question: str) -> Optional[List[float]]:
+    """Question embedding, or None when the API is down and BM25 can answer alone"""
     try:
-        question_embedding = await rag_service.generate_embedding(anon["original_text"])
-    except Exception:
+        return await rag_service.generate_embedding(question)
+    except Exception as e:
+        if HYBRID_RETRIEVAL:
+            logger.warning(f"Embedding failed, using lexical retrieval only: {e}")
+            return None
         raise HTTPException(status_code=503, detail="Servico de embeddings temporariamente indisponivel.")
 
-    chunks = await db.content_chunks.find(
-        {"mentor_id": chat_request.mentor_id},
-        {"embedding": 1, "text": 1, "content_id": 1, "title": 1},
-    ).limit(500).to_list(500)
 
-    if not chunks:
-        response_text = f"Desculpe, mas Dr(a). {mentor['full_name']} ainda nao possui conteudo disponivel."
-        citations, ai_used = [], "none"
+async def _lookup_cached_answer(mentor: dict, question_embedding: Optional[List[float]]) -> Optional[dict]:
+    if question_embedding is None:
+        return None
+    return await rag_service.answer_cache.lookup(db, mentor, question_embedding)
+
+
+async def _retrieve_context(
+    mentor: dict, question: str, question_embedding: Optional[List[float]]
+) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """
+    Retrieve the chunks used to answer the question (hybrid vector + BM25 when enabled)
+    Returns: (top_chunks, None) or (None, canned_response) when there is nothing to answer from
+    """
+    index = await rag_service.vector_index.get_index(db, mentor["_id"], mentor.get("content_version", 0))
+    if not len(index):
+        return None, f"Desculpe, mas Dr(a). {mentor['full_name']} ainda nao possui conteudo disponivel."
+    if HYBRID_RETRIEVAL:
+        matches = index.hybrid_search(question, question_embedding, top_k=5, min_similarity=0.45)
     else:
-        chunk_embeddings = [c["embedding"] for c in chunks]
-        top_indices, sim_scores = rag_service.cosine_similarity_search(question_embedding, chunk_embeddings, top_k=5, min_similarity=0.45)
-        if not top_indices:
-            response_text = f"Desculpe, nao encontrei informacoes relevantes na base do(a) Dr(a). {mentor['full_name']}."
-            citations, ai_used = [], "none"
-        else:
-            top_chunks = [{"content_id": chunks[i]["content_id"], "title": chunks[i]["title"], "text": chunks[i]["text"]} for i in top_indices]
-            mentor_profile = None
-            if mentor.get("agent_profile"):
-                mentor_profile = profile_service.generate_system_prompt(
-                    mentor_profile={"profile_text": mentor["agent_profile"], "style_traits": mentor.get("style_traits", "")},
-                    mentor_name=mentor["full_name"], mentor_specialty=mentor["specialty"],
-                )
-            response_text, citations, ai_used = await rag_service.generate_rag_response(
-                question=chat_request.question, context_chunks=top_chunks,
-                mentor_name=mentor["full_name"], mentor_profile=mentor_profile, preferred_ai="openai",
-            )
+        matches = index.search(question_embedding, top_k=5, min_similarity=0.45)
+    if not matches:
+        return None, f"Desculpe, nao encontrei informacoes relevantes na base do(a) Dr(a). {mentor['full_name']}."
+    return [{"content_id": c["content_id"], "title": c["title"], "text": c["text"]} for c, _ in matches], None
+
+
+def _mentor_system_prompt(mentor: dict) -> Optional[str]:
+    if not mentor.get("agent_profile"):
+        return None
+    return profile_service.generate_system_prompt(
+        mentor_profile={"profile_text": mentor["agent_profile"], "style_traits": mentor.get("style_traits", "")},
+        mentor_name=mentor["full_name"], mentor_specialty=mentor["specialty"],
+    )
 
+
+async def _cache_answer(mentor: dict, anon: dict, question_embedding: Optional[List[float]],
+                        response_text: str, citations: list, ai_used: str) -> None:
+    """Store a generated answer in the semantic cache when it is safe to reuse"""
+    if question_embedding is None or ai_used == "none" or not citations or anon.get("replacements"):
+        # Never share answers to questions that contained patient identifiers
+        return
+    try:
+        validate_rag_response(response_text, citations)
+    except ResponseValidationError:
+        return
+    await rag_service.answer_cache.store(
+        db, mentor, anon["anonymized_text"], question_embedding, response_text, citations
+    )
+
+
+async def _finish_turn(conv: dict, question: str, response_text: str, citations: list) -> Tuple[str, str, list]:
+    """Validate and clean the answer, then persist it. Returns (message_id, response_text, citations)"""
     try:
         validate_rag_response(response_text, citations)
     except ResponseValidationError:
@@ -184,11 +229,42 @@ async def chat_with_mentor(chat_request: ChatRequest, current_user: dict = Depen
 
     bot_message_id = str(uuid.uuid4())
     await db.messages.insert_one({
-        "_id": bot_message_id, "conversation_id": conversation_id,
+        "_id": bot_message_id, **_message_owner(conv),
         "sender_type": SenderType.MENTOR_BOT, "content": response_text,
         "citations": citations, "feedback": FeedbackType.NONE, "sent_at": datetime.utcnow(),
     })
-    await db.conversations.update_one({"_id": conversation_id}, {"$set": {"updated_at": datetime.utcnow()}})
+    # The answer is the conversation's last message; keep a preview for the conversation list
+    await db.conversations.update_one({"_id": conv["_id"]}, {"$set": {
+        "updated_at": datetime.utcnow(), "last_message": response_text[:LAST_MESSAGE_PREVIEW_CHARS],
+    }})
+    try:
+        await mentor_stats.record_query(db, conv["mentor_id"], question)
+    except Exception as e:
+        logger.error(f"Error updating mentor stats: {e}")
+    return bot_message_id, response_text, citations
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_with_mentor(chat_request: ChatRequest, current_user: dict = Depends(get_current_user)):
+    mentor = await _load_chat_mentor(chat_request, current_user)
+    conv, anon = await _start_turn(chat_request, current_user)
+    conversation_id = conv["_id"]
+    question_embedding = await _embed_question(anon["original_text"])
+
+    cached = await _lookup_cached_answer(mentor, question_embedding)
+    if cached:
+        response_text, citations = cached["response"], cached["citations"]
+    else:
+        top_chunks, response_text = await _retrieve_context(mentor, anon["original_text"], question_embedding)
+        citations = []
+        if top_chunks:
+            response_text, citations, ai_used = await rag_service.generate_rag_response(
+                question=chat_request.question, context_chunks=top_chunks,
+                mentor_name=mentor["full_name"], mentor_profile=_mentor_system_prompt(mentor), preferred_ai="openai",
+            )
+            await _cache_answer(mentor, anon, question_embedding, response_text, citations, ai_used)
+
+    bot_message_id, response_text, citations = await _finish_turn(conv, anon["anonymized_text"], response_text, citations)
     return ChatResponse(
         conversation_id=conversation_id, message_id=bot_message_id,
         response=response_text, citations=[Citation(**c) for c in citations],
@@ -196,24 +272,135 @@ async def chat_with_mentor(chat_request: ChatRequest, current_user: dict = Depen
     )
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_mentor_stream(chat_request: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Server-Sent Events variant of /chat.
+
+    Events: `meta` (conversation_id, mentor_name), then one `token` per text
+    delta as the model generates it, then `done` with the validated, cleaned
+    response, citations and message_id (the `done` text is authoritative —
+    token deltas still contain raw [source_N] markers). Errors before the
+    stream starts are returned as regular HTTP errors.
+    """
+    mentor = await _load_chat_mentor(chat_request, current_user)
+    conv, anon = await _start_turn(chat_request, current_user)
+    conversation_id = conv["_id"]
+    question_embedding = await _embed_question(anon["original_text"])
+
+    cached = await _lookup_cached_answer(mentor, question_embedding)
+    if cached:
+        top_chunks, canned_response = None, cached["response"]
+    else:
+        top_chunks, canned_response = await _retrieve_context(mentor, anon["original_text"], question_embedding)
+
+    async def events():
+        yield _sse("meta", {"conversation_id": conversation_id, "mentor_name": mentor["full_name"]})
+        citations = cached["citations"] if cached else []
+        if top_chunks is None:
+            response_text = canned_response
+            yield _sse("token", {"text": response_text})
+        else:
+            system_message, user_message, citations_map = rag_service.build_rag_prompt(
+                question=chat_request.question, context_chunks=top_chunks,
+                mentor_name=mentor["full_name"], mentor_profile=_mentor_system_prompt(mentor),
+            )
+            parts, ai_used = [], "none"
+            try:
+                async for ai_used, delta in rag_service.stream_rag_response(system_message, user_message, preferred_ai="openai"):
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+            except Exception as e:
+                logger.error(f"Chat stream interrupted for conversation {conversation_id}: {e}")
+                parts, ai_used = ["Desculpe, ocorreu um erro ao processar a resposta. Por favor, tente novamente."], "none"
+            response_text = "".join(parts)
+            citations = rag_service.extract_citations(response_text, citations_map)
+            await _cache_answer(mentor, anon, question_embedding, response_text, citations, ai_used)
+
+        bot_message_id, response_text, citations = await _finish_turn(conv, anon["anonymized_text"], response_text, citations)
+        yield _sse("done", {
+            "conversation_id": conversation_id, "message_id": bot_message_id,
+            "response": response_text, "citations": citations, "mentor_name": mentor["full_name"],
+        })
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ---------- conversations ----------
 
+def _encode_cursor(conv: dict) -> str:
+    raw = f"{conv['updated_at'].isoformat()}|{conv['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    """Filter for the conversations after the cursor in (updated_at desc, _id desc) order"""
+    try:
+        updated_at, conv_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        updated_at = datetime.fromisoformat(updated_at)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"updated_at": {"$lt": updated_at}},
+        {"updated_at": updated_at, "_id": {"$lt": conv_id}},
+    ]}
+
+
+async def _last_message_previews(conversation_ids: List[str]) -> dict:
+    """Last message preview per conversation, for conversations written before the snapshot field"""
+    if not conversation_ids:
+        return {}
+    rows = await db.messages.aggregate([
+        {"$match": {"conversation_id": {"$in": conversation_ids}}},
+        # Same order as the (conversation_id, sent_at) index, so no in-memory sort
+        {"$sort": {"conversation_id": 1, "sent_at": 1}},
+        {"$group": {"_id": "$conversation_id", "content": {"$last": "$content"}}},
+        {"$project": {"content": {"$substrCP": ["$content", 0, LAST_MESSAGE_PREVIEW_CHARS]}}},
+    ]).to_list(None)
+    return {row["_id"]: row["content"] for row in rows}
+
+
 @router.get("/conversations", response_model=List[ConversationItem])
-async def list_conversations(current_user: dict = Depends(get_current_user)):
+async def list_conversations(
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    The user's conversations, most recently active first
+    When more remain, X-Next-Cursor holds the value to pass as ?cursor= for the next page
+    """
     if current_user["user_type"] != "user":
         raise HTTPException(status_code=403, detail="Access denied")
+    query = {"user_id": current_user["user_id"]}
+    if cursor:
+        query.update(_decode_cursor(cursor))
     conversations = await db.conversations.find(
-        {"user_id": current_user["user_id"]}
-    ).sort("updated_at", -1).to_list(100)
+        query, {"mentor_id": 1, "title": 1, "last_message": 1, "created_at": 1, "updated_at": 1}
+    ).sort([("updated_at", -1), ("_id", -1)]).limit(limit + 1).to_list(limit + 1)
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(conversations[-1])
+
+    mentors = await mentor_directory.get_many(db, [c["mentor_id"] for c in conversations])
+    previews = await _last_message_previews([c["_id"] for c in conversations if "last_message" not in c])
     result = []
     for conv in conversations:
-        mentor = await db.mentors.find_one({"_id": conv["mentor_id"]})
-        last_msg = await db.messages.find_one({"conversation_id": conv["_id"]}, sort=[("sent_at", -1)])
+        mentor = mentors.get(conv["mentor_id"])
+        last_message = conv["last_message"] if "last_message" in conv else previews.get(conv["_id"], "")
         result.append(ConversationItem(
             id=conv["_id"], mentor_id=conv["mentor_id"],
             mentor_name=mentor["full_name"] if mentor else "Unknown",
             mentor_avatar=mentor.get("avatar_url") if mentor else None,
-            title=conv["title"], last_message=last_msg["content"][:100] if last_msg else "",
+            title=conv["title"], last_message=last_message,
             created_at=conv["created_at"], updated_at=conv["updated_at"],
         ))
     return result
@@ -283,12 +470,21 @@ async def update_message_feedback(
 ):
     # Accept feedback from JSON body (frontend) OR query param (legacy tests)
     resolved_feedback = (body.feedback if body else None) or feedback
-    message = await db.messages.find_one({"_id": message_id})
+    # The previous value comes back atomically, so concurrent updates move the counters consistently
+    message = await db.messages.find_one_and_update(
+        {"_id": message_id}, {"$set": {"feedback": resolved_feedback}}, return_document=ReturnDocument.BEFORE
+    )
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
-    await db.messages.update_one({"_id": message_id}, {"$set": {"feedback": resolved_feedback}})
     try:
-        conv = await db.conversations.find_one({"_id": message["conversation_id"]})
+        mentor_id = message.get("mentor_id")
+        if mentor_id is None:
+            conv = await db.conversations.find_one({"_id": message["conversation_id"]}, {"mentor_id": 1})
+            mentor_id = conv["mentor_id"] if conv else "unknown"
+        if message["sender_type"] == SenderType.MENTOR_BOT:
+            await mentor_stats.record_feedback(
+                db, mentor_id, message["sent_at"], message.get("feedback"), resolved_feedback
+            )
         question_text = ""
         if message["sender_type"] == SenderType.MENTOR_BOT:
             prev = await db.messages.find_one(
@@ -300,7 +496,7 @@ async def update_message_feedback(
         await db.feedback_logs.insert_one({
             "_id": str(uuid.uuid4()), "message_id": message_id,
             "conversation_id": message["conversation_id"],
-            "mentor_id": conv["mentor_id"] if conv else "unknown",
+            "mentor_id": mentor_id,
             "user_id": current_user["user_id"], "feedback_type": resolved_feedback,
             "feedback_at": datetime.utcnow(), "question": question_text,
             "response_text": message.get("content", ""),
@@ -322,22 +518,14 @@ async def transcribe_audio(audio: UploadFile = File(...), current_user: dict = D
     content = await audio.read()
     if len(content) == 0:
         raise HTTPException(status_code=400, detail="Arquivo de audio vazio")
-    if len(content) > 25 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Arquivo muito grande. Maximo: 25MB")
+    if len(content) > TRANSCRIBE_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"Arquivo muito grande. Maximo: {TRANSCRIBE_MAX_BYTES // (1024 * 1024)}MB")
+    ext_map = {'audio/webm': 'webm', 'audio/wav': 'wav', 'audio/mp3': 'mp3', 'audio/mpeg': 'mp3', 'audio/mp4': 'mp4', 'audio/m4a': 'm4a', 'audio/ogg': 'ogg', 'audio/flac': 'flac'}
+    ext = ext_map.get(audio.content_type, 'webm')
     try:
-        from openai import OpenAI
-        key = os.environ.get('OPENAI_API_KEY')
-        if not key:
-            raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-        client = OpenAI(api_key=key)
-        ext_map = {'audio/webm': 'webm', 'audio/wav': 'wav', 'audio/mp3': 'mp3', 'audio/mpeg': 'mp3', 'audio/mp4': 'mp4', 'audio/m4a': 'm4a', 'audio/ogg': 'ogg', 'audio/flac': 'flac'}
-        ext = ext_map.get(audio.content_type, 'webm')
-        audio_file = io.BytesIO(content)
-        audio_file.name = audio.filename or f"audio.{ext}"
-        transcript = client.audio.transcriptions.create(model=os.environ.get('WHISPER_MODEL', 'whisper-1'), file=audio_file, language="pt", response_format="text")
-        return {"text": transcript.strip() if isinstance(transcript, str) else str(transcript).strip(), "language": "pt"}
-    except HTTPException:
-        raise
-    except Exception as e:
+        # Long recordings are segmented and transcribed concurrently
+        text = await transcription_svc.transcribe(content, audio.filename or f"audio.{ext}")
+        return {"text": text, "language": "pt"}
+    except ContentProcessingError as e:
         logger.error(f"Transcription error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro na transcricao: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
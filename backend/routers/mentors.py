@@ -1,13 +1,11 @@
 """Mentors router: listing, profile, content upload/manage, bot profile approval."""
 import uuid
-import io
-import os
 import base64
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 
-from dependencies import db, fs, logger
+from dependencies import db, get_fs_bucket, logger
 from models import (
     MentorListItem, MentorProfile, MentorStats,
     ContentUploadResponse, ContentItem,
@@ -19,15 +17,19 @@ from auth_utils import get_current_user
 # Lazy-loaded services (initialized in main.py)
 rag_service = None
 profile_service = None
+ingestion_service = None
+mentor_directory = None
 
 router = APIRouter(tags=["mentors"])
 
 
-def _init_services(rag_svc, prof_svc):
+def _init_services(rag_svc, prof_svc, ingestion_svc, directory):
     """Called once from main.py after service initialization."""
-    global rag_service, profile_service
+    global rag_service, profile_service, ingestion_service, mentor_directory
     rag_service = rag_svc
     profile_service = prof_svc
+    ingestion_service = ingestion_svc
+    mentor_directory = directory
 
 
 # ---------- public listing ----------
@@ -94,7 +96,14 @@ async def update_mentor_profile(
     update_dict = {k: v for k, v in profile_data.dict(exclude_unset=True).items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
-    await db.mentors.update_one({"_id": current_user["user_id"]}, {"$set": update_dict})
+    update = {"$set": update_dict}
+    if "full_name" in update_dict or "specialty" in update_dict:
+        # Both are part of the bot's system prompt, so cached answers are stale
+        update["$inc"] = {"profile_version": 1}
+    await db.mentors.update_one({"_id": current_user["user_id"]}, update)
+    if "$inc" in update:
+        mentor_directory.invalidate(current_user["user_id"])
+        await rag_service.answer_cache.invalidate(db, current_user["user_id"])
     return {"message": "Profile updated successfully"}
 
 
@@ -124,6 +133,7 @@ async def upload_mentor_avatar(
         {"_id": current_user["user_id"]},
         {"$set": {"avatar_url": avatar_url}},
     )
+    mentor_directory.invalidate(current_user["user_id"])
     logger.info(f"Mentor {current_user['user_id']} updated avatar ({ext}, {len(file_content)/1024:.1f}KB)")
     return {"avatar_url": avatar_url}
 
@@ -144,21 +154,57 @@ async def approve_bot_profile(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail="No pending profile text found")
     await db.mentors.update_one(
         {"_id": current_user["user_id"]},
-        {"$set": {
-            "agent_profile": pending,
-            "style_traits": mentor.get("style_traits_pending", mentor.get("style_traits")),
-            "profile_status": "ACTIVE",
-            "agent_profile_pending": None,
-            "style_traits_pending": None,
-            "profile_approved_at": datetime.utcnow(),
-        }}
+        {
+            "$set": {
+                "agent_profile": pending,
+                "style_traits": mentor.get("style_traits_pending", mentor.get("style_traits")),
+                "profile_status": "ACTIVE",
+                "agent_profile_pending": None,
+                "style_traits_pending": None,
+                "profile_approved_at": datetime.utcnow(),
+            },
+            # Answers cached under the previous profile must not be served
+            "$inc": {"profile_version": 1},
+        }
     )
+    await rag_service.answer_cache.invalidate(db, current_user["user_id"])
     logger.info(f"Mentor {current_user['user_id']} approved bot profile")
     return {"message": "Bot profile approved and activated", "profile_status": "ACTIVE"}
 
 
 # ---------- content management ----------
 
+# Bytes read from the upload and written to GridFS per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def _store_upload(file: UploadFile, content_type: str):
+    """Copy an upload into GridFS chunk by chunk without holding it in memory"""
+    grid_in = get_fs_bucket().open_upload_stream(
+        file.filename or "upload", metadata={"contentType": content_type}
+    )
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await grid_in.write(chunk)
+        await grid_in.close()
+    except BaseException:
+        await grid_in.abort()
+        raise
+    return grid_in._id
+
+
+async def _delete_stored_upload(content: dict) -> None:
+    if not content.get("file_id"):
+        return
+    try:
+        await get_fs_bucket().delete(content["file_id"])
+    except Exception as e:
+        logger.warning(f"Could not delete stored file for content {content['_id']}: {e}")
+
+
 @router.post("/mentor/content/upload", response_model=ContentUploadResponse)
 async def upload_content(
     file: UploadFile = File(...),
@@ -203,10 +249,12 @@ async def upload_content(
         raise HTTPException(status_code=400, detail=f"Formato nao suportado. Formatos aceitos: PDF, DOCX, MP4, MP3, WAV, M4A.")
 
     try:
-        file_content = await file.read()
         content_id = str(uuid.uuid4())
         title = file.filename.rsplit(".", 1)[0] if file.filename and "." in file.filename else (file.filename or "Untitled")
 
+        # Stream into GridFS so the ingestion worker can pick it up
+        file_id = await _store_upload(file, content_type)
+
         content_doc = {
             "_id": content_id,
             "mentor_id": current_user["user_id"],
@@ -214,109 +262,35 @@ async def upload_content(
             "filename": file.filename,
             "content_type": file_type,
             "file_type": file_type,
+            "file_id": file_id,
             "status": "PROCESSING",
+            "stage": "QUEUED",
             "uploaded_at": datetime.utcnow(),
         }
-        await db.mentor_content.insert_one(content_doc)
-
-        # Store in GridFS
-        fs.put(file_content, filename=file.filename, content_type=content_type)
-
-        # Extract text based on file type
-        extracted_text = ""
-        if file_type == "PDF":
-            try:
-                import PyPDF2
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-                for page in pdf_reader.pages:
-                    extracted_text += page.extract_text() or ""
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Erro ao processar PDF: {str(e)}")
-            if not extracted_text.strip():
-                raise HTTPException(status_code=400, detail="Nao foi possivel extrair texto do PDF")
-
-        elif file_type == "DOCX":
-            try:
-                import docx as python_docx
-                doc = python_docx.Document(io.BytesIO(file_content))
-                extracted_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Erro ao processar DOCX: {str(e)}")
-            if not extracted_text.strip():
-                raise HTTPException(status_code=400, detail="Nao foi possivel extrair texto do DOCX")
-
-        elif file_type in ("VIDEO", "AUDIO"):
-            try:
-                from openai import OpenAI
-                key = os.environ.get("OPENAI_API_KEY")
-                if not key:
-                    raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-                client = OpenAI(api_key=key)
-                audio_file = io.BytesIO(file_content)
-                audio_file.name = file.filename or f"audio{file_ext}"
-                transcript = client.audio.transcriptions.create(
-                    model=os.environ.get("WHISPER_MODEL", "whisper-1"),
-                    file=audio_file,
-                    language="pt",
-                    response_format="text",
-                )
-                extracted_text = str(transcript).strip() if transcript else ""
-            except HTTPException:
-                raise
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Erro na transcricao do arquivo: {str(e)}")
-            if not extracted_text.strip():
-                raise HTTPException(status_code=400, detail="Nao foi possivel transcrever o arquivo de audio/video")
-
-        await db.mentor_content.update_one(
-            {"_id": content_id},
-            {"$set": {"processed_text": extracted_text[:5000]}}
-        )
-
-        # Chunk and embed
-        chunks_processed = await rag_service.process_pdf_content(
-            pdf_text=extracted_text,
-            mentor_id=current_user["user_id"],
-            content_id=content_id,
-            title=title,
-            db=db,
-        )
-
-        # Generate / update AI agent profile
         try:
-            mentor_doc = await db.mentors.find_one({"_id": current_user["user_id"]})
-            existing_profile = mentor_doc.get("agent_profile")
-            profile_data = await profile_service.analyze_content_and_generate_profile(
-                content_text=extracted_text,
-                mentor_name=mentor_doc["full_name"],
-                mentor_specialty=mentor_doc["specialty"],
-                existing_profile=existing_profile,
+            await db.mentor_content.insert_one(content_doc)
+
+            # Extraction, chunking, embedding and profile generation run in the background
+            await ingestion_service.enqueue(
+                db,
+                content_id=content_id,
+                mentor_id=current_user["user_id"],
+                file_id=file_id,
+                filename=file.filename or f"upload{file_ext}",
+                file_type=file_type,
+                title=title,
             )
-            await db.mentors.update_one(
-                {"_id": current_user["user_id"]},
-                {"$set": {
-                    "agent_profile_pending": profile_data["profile_text"],
-                    "style_traits_pending": profile_data["style_traits"],
-                    "profile_status": "PENDING_APPROVAL",
-                    "profile_updated_at": datetime.utcnow(),
-                }}
-            )
-            logger.info(f"AI agent profile PENDING APPROVAL (source: {profile_data['analysis_source']})")
-        except Exception as profile_error:
-            logger.error(f"Error generating agent profile: {profile_error}")
-
-        await db.mentor_content.update_one(
-            {"_id": content_id}, {"$set": {"status": "COMPLETED"}}
-        )
-        logger.info(f"Processed {chunks_processed} chunks for content {content_id} (type: {file_type})")
+        except Exception:
+            # No job will ever read the stored file
+            await _delete_stored_upload(content_doc)
+            raise
+        logger.info(f"Queued content {content_id} for ingestion (type: {file_type})")
 
         return ContentUploadResponse(
             content_id=content_id, title=title,
-            status=ContentStatus.COMPLETED,
-            message=f"Conteudo enviado e processado com sucesso. {chunks_processed} chunks indexados.",
+            status=ContentStatus.PROCESSING,
+            message="Conteudo recebido. O processamento continua em segundo plano.",
         )
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"Error uploading content: {e}")
         if 'content_id' in locals():
@@ -359,6 +333,11 @@ async def get_content_details(content_id: str, current_user: dict = Depends(get_
         "uploaded_at": content["uploaded_at"],
         "processed_text": content.get("processed_text", ""),
         "chunk_count": chunk_count,
+        "stage": content.get("stage"),
+        "chunks_done": content.get("chunks_done", 0),
+        "chunks_total": content.get("chunks_total", 0),
+        "extraction": content.get("extraction"),
+        "error": content.get("error"),
     }
 
 
@@ -373,6 +352,10 @@ async def delete_content(content_id: str, current_user: dict = Depends(get_curre
         raise HTTPException(status_code=404, detail="Content not found")
     result = await db.content_chunks.delete_many({"content_id": content_id})
     await db.mentor_content.delete_one({"_id": content_id})
+    await db.ingestion_jobs.delete_one({"_id": content_id})
+    await _delete_stored_upload(content)
+    await rag_service.vector_index.on_content_removed(db, current_user["user_id"], content_id)
+    await rag_service.answer_cache.invalidate(db, current_user["user_id"])
     logger.info(f"Deleted content {content_id} and {result.deleted_count} chunks")
     return {"message": "Content deleted successfully", "deleted_chunks": result.deleted_count}
 
@@ -389,7 +372,12 @@ async def bulk_delete_content(content_ids: List[str], current_user: dict = Depen
             r = await db.content_chunks.delete_many({"content_id": cid})
             deleted_chunks_total += r.deleted_count
             await db.mentor_content.delete_one({"_id": cid})
+            await db.ingestion_jobs.delete_one({"_id": cid})
+            await _delete_stored_upload(content)
+            await rag_service.vector_index.on_content_removed(db, current_user["user_id"], cid)
             deleted_count += 1
+    if deleted_count:
+        await rag_service.answer_cache.invalidate(db, current_user["user_id"])
     logger.info(f"Bulk deleted {deleted_count} contents and {deleted_chunks_total} chunks")
     return {
         "message": f"Successfully deleted {deleted_count} content(s)",
@@ -404,24 +392,15 @@ async def bulk_delete_content(content_ids: List[str], current_user: dict = Depen
 async def get_mentor_stats(current_user: dict = Depends(get_current_user)):
     if current_user["user_type"] != "mentor":
         raise HTTPException(status_code=403, detail="Access denied")
-    conversations = await db.conversations.find(
-        {"mentor_id": current_user["user_id"]}, {"_id": 1}
-    ).to_list(1000)
-    cids = [c["_id"] for c in conversations]
-    total_queries = await db.messages.count_documents({
-        "conversation_id": {"$in": cids}, "sender_type": SenderType.MENTOR_BOT,
-    })
+    bot_messages = {"mentor_id": current_user["user_id"], "sender_type": SenderType.MENTOR_BOT}
+    total_queries = await db.messages.count_documents(bot_messages)
     total_content = await db.mentor_content.count_documents({
         "mentor_id": current_user["user_id"], "status": ContentStatus.COMPLETED,
     })
-    msgs_fb = await db.messages.find({
-        "conversation_id": {"$in": cids},
-        "sender_type": SenderType.MENTOR_BOT,
-        "feedback": {"$ne": FeedbackType.NONE},
-    }, {"feedback": 1}).to_list(1000)
-    if msgs_fb:
-        likes = sum(1 for m in msgs_fb if m["feedback"] == FeedbackType.LIKE)
-        avg = (likes / len(msgs_fb)) * 5.0
+    rated = await db.messages.count_documents({**bot_messages, "feedback": {"$ne": FeedbackType.NONE}})
+    if rated:
+        likes = await db.messages.count_documents({**bot_messages, "feedback": FeedbackType.LIKE})
+        avg = (likes / rated) * 5.0
     else:
         avg = 0.0
     return MentorStats(
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Migration script: rebuilds the mentor_daily_stats counters (see mentor_stats)
+from existing conversations and messages, and creates the mentor_users
+markers that tell /chat a user has already talked to a mentor.
+
+Usage:
+  cd /app/backend
+  python scripts/backfill_mentor_stats.py [--mentor MENTOR_ID]
+
+Requires mentor_id on messages: run scripts/backfill_message_owners.py first.
+
+Each mentor's counter documents are recomputed and replaced, so the script
+can be re-run to repair drift. Counter increments made by the API for a
+mentor while that mentor is being rebuilt are overwritten; run it when
+traffic is low.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import motor.motor_asyncio
+from pymongo import ReplaceOne, UpdateOne
+
+from mentor_stats import ALL_TIME, DAY_FORMAT, topic_terms
+
+
+MONGO_URL = os.environ["MONGO_URL"]
+DB_NAME = os.environ["DB_NAME"]
+
+
+async def rebuild_mentor(db, mentor_id: str) -> int:
+    """Recompute one mentor's counter documents. Returns how many were written."""
+    days = defaultdict(Counter)
+    terms = defaultdict(Counter)
+
+    bot_pipeline = [
+        {"$match": {"mentor_id": mentor_id, "sender_type": "MENTOR_BOT"}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$sent_at"}},
+            "queries": {"$sum": 1},
+            "likes": {"$sum": {"$cond": [{"$eq": ["$feedback", "LIKE"]}, 1, 0]}},
+            "dislikes": {"$sum": {"$cond": [{"$eq": ["$feedback", "DISLIKE"]}, 1, 0]}},
+        }},
+    ]
+    async for row in db.messages.aggregate(bot_pipeline):
+        days[row["_id"]].update({"queries": row["queries"], "likes": row["likes"], "dislikes": row["dislikes"]})
+
+    user_messages = db.messages.find(
+        {"mentor_id": mentor_id, "sender_type": "USER"}, {"content": 1, "sent_at": 1}
+    ).batch_size(1000)
+    async for msg in user_messages:
+        terms[msg["sent_at"].strftime(DAY_FORMAT)].update(topic_terms(msg.get("content", "")))
+
+    all_time = Counter()
+    for counts in days.values():
+        all_time.update(counts)
+    all_time["conversations"] = await db.conversations.count_documents({"mentor_id": mentor_id})
+    users = await db.conversations.aggregate([
+        {"$match": {"mentor_id": mentor_id}},
+        {"$group": {"_id": "$user_id", "first_at": {"$min": "$created_at"}}},
+    ]).to_list(None)
+    all_time["users"] = len(users)
+    if users:
+        await db.mentor_users.bulk_write([
+            UpdateOne(
+                {"_id": f"{mentor_id}:{u['_id']}"},
+                {"$setOnInsert": {"mentor_id": mentor_id, "user_id": u["_id"], "first_at": u["first_at"]}},
+                upsert=True,
+            )
+            for u in users
+        ], ordered=False)
+
+    writes = []
+    for day in set(days) | set(terms):
+        doc = {"mentor_id": mentor_id, "day": day, "queries": 0, "likes": 0, "dislikes": 0, **days[day]}
+        doc["terms"] = dict(terms[day])
+        writes.append(ReplaceOne({"_id": f"{mentor_id}:{day}"}, doc, upsert=True))
+    writes.append(ReplaceOne(
+        {"_id": f"{mentor_id}:{ALL_TIME}"},
+        {"mentor_id": mentor_id, "day": ALL_TIME, "queries": 0, "likes": 0, "dislikes": 0, **all_time},
+        upsert=True,
+    ))
+    await db.mentor_daily_stats.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def backfill(mentor_id: str = None):
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    query = {"_id": mentor_id} if mentor_id else {}
+    mentor_ids = [m["_id"] for m in await db.mentors.find(query, {"_id": 1}).to_list(None)]
+    print(f"Rebuilding impactometer counters for {len(mentor_ids)} mentors ({DB_NAME})")
+
+    start = datetime.utcnow()
+    written = 0
+    for i, mid in enumerate(mentor_ids, 1):
+        written += await rebuild_mentor(db, mid)
+        print(f"  [{i}/{len(mentor_ids)}] {mid}")
+
+    elapsed = (datetime.utcnow() - start).total_seconds()
+    print(f"\nBackfill complete: {written} counter documents written in {elapsed:.0f}s")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild mentor_daily_stats from messages")
+    parser.add_argument("--mentor", help="Only rebuild this mentor")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.mentor))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Migration script: copies mentor_id and user_id from each conversation onto
+its messages, and creates the messages indexes from db_indexes that
+mentor-facing queries (stats, impactometer, analytics) now use instead of a
+conversation_id $in.
+
+Usage:
+  cd /app/backend
+  python scripts/backfill_message_owners.py
+
+New messages are written with both fields by /chat; this only fills in
+messages stored before that. It is idempotent: messages that already have
+mentor_id are not touched, so it can be re-run (e.g. after a deploy that
+raced with it).
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import motor.motor_asyncio
+from pymongo import UpdateMany
+
+from db_indexes import ensure_indexes
+
+
+MONGO_URL = os.environ["MONGO_URL"]
+DB_NAME = os.environ["DB_NAME"]
+BACKFILL_BATCH_SIZE = 500
+
+
+async def backfill():
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    report = await ensure_indexes(db, ["messages"])
+    for ix in report["created"]:
+        print(f"Created index messages.{ix['name']}")
+
+    total = await db.conversations.count_documents({})
+    print(f"Backfilling message owners for {total} conversations ({DB_NAME})")
+
+    seen, updated = 0, 0
+    start = datetime.utcnow()
+    batch = []
+    cursor = db.conversations.find({}, {"_id": 1, "mentor_id": 1, "user_id": 1}).batch_size(BACKFILL_BATCH_SIZE)
+    async for conv in cursor:
+        seen += 1
+        batch.append(UpdateMany(
+            {"conversation_id": conv["_id"], "mentor_id": {"$exists": False}},
+            {"$set": {"mentor_id": conv.get("mentor_id"), "user_id": conv.get("user_id")}},
+        ))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            updated += (await db.messages.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+            print(f"  [{seen}/{total}] conversations, {updated} messages updated")
+    if batch:
+        updated += (await db.messages.bulk_write(batch, ordered=False)).modified_count
+
+    orphans = await db.messages.count_documents({"mentor_id": {"$exists": False}})
+    elapsed = (datetime.utcnow() - start).total_seconds()
+    print(f"\nBackfill complete: {updated} messages updated in {elapsed:.0f}s")
+    if orphans:
+        print(f"WARNING: {orphans} messages belong to no conversation and were left without mentor_id")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
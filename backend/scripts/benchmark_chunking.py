@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput and peak memory of the streaming chunker against the
+original whole-document chunk_text (encode everything, decode every window).
+
+Usage:
+  cd /app/backend
+  python scripts/benchmark_chunking.py --mb 8
+
+The corpus is synthetic Portuguese clinical prose, fed to the streaming
+chunker in page-sized pieces the way the PDF extraction stream delivers it.
+Chunks from the streaming variants are consumed and dropped one by one (as
+the embedding pipeline does); the original returns them all as a list.
+Peak memory is measured with tracemalloc (Python allocations only).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiktoken
+
+from text_chunker import iter_chunks
+
+WORDS = (
+    "paciente dose amiodarona fibrilação atrial insuficiência cardíaca tratamento exame "
+    "clínico pressão arterial diagnóstico conduta ecocardiograma anticoagulação risco "
+    "hemorrágico função renal ajuste sintomas dispneia edema frequência ritmo sinusal"
+).split()
+
+
+def make_corpus(mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < mb * 1024 * 1024:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 35))).capitalize()
+        sentence += rng.choice([". ", ". ", ". ", "? ", ".\n\n"])
+        parts.append(sentence)
+        size += len(sentence.encode("utf-8"))
+    return "".join(parts)
+
+
+def original_chunk_text(encoding, text: str, chunk_size: int, overlap: int):
+    """The previous MultiAIRAGService.chunk_text"""
+    tokens = encoding.encode(text)
+    chunks = []
+    start = 0
+    while start < len(tokens):
+        chunks.append(encoding.decode(tokens[start:start + chunk_size]))
+        start += chunk_size - overlap
+    return chunks
+
+
+def measure(name, fn, mb):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<26} {count:>7} chunks  {mb / elapsed:7.2f} MB/s  peak {peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--piece-chars", type=int, default=3000, help="Size of each streamed piece (about one page)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--encoding", default="cl100k_base")
+    args = parser.parse_args()
+
+    encoding = tiktoken.get_encoding(args.encoding)
+    text = make_corpus(args.mb)
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"Corpus: {mb:.1f} MB, pieces of {args.piece_chars} chars, chunk {args.chunk_size}/{args.overlap} tokens")
+
+    def pieces():
+        for i in range(0, len(text), args.piece_chars):
+            yield text[i:i + args.piece_chars]
+
+    def streamed(respect_sentences):
+        def run():
+            count = 0
+            for _ in iter_chunks(encoding, pieces(), args.chunk_size, args.overlap, respect_sentences):
+                count += 1
+            return count
+        return run
+
+    measure("original chunk_text", lambda: len(original_chunk_text(encoding, text, args.chunk_size, args.overlap)), mb)
+    measure("streaming (token windows)", streamed(False), mb)
+    measure("streaming (sentences)", streamed(True), mb)
+
+
+if __name__ == "__main__":
+    main()
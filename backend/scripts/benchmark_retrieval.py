@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recall and latency of the resident vector index backends (exact,
+IVF, int8 / binary quantized first pass with float re-ranking) against the
+original exact sklearn cosine_similarity retrieval path.
+
+Usage:
+  cd /app/backend
+  python scripts/benchmark_retrieval.py --rows 200000 --dim 1536
+
+The corpus is synthetic but clustered (topics + noise) so it behaves like
+real embedding data rather than uniform random vectors, which are a
+worst case for any ANN structure.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from ann_index import ExactSearch, IVFSearch, QuantizedSearch
+
+
+def make_corpus(rows: int, dim: int, topics: int, noise: float, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, rows)
+    docs = centers[labels] + noise * rng.standard_normal((rows, dim)).astype(np.float32)
+    docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+    return docs, centers, rng
+
+
+def make_queries(centers: np.ndarray, count: int, noise: float, rng) -> np.ndarray:
+    labels = rng.integers(0, centers.shape[0], count)
+    queries = centers[labels] + noise * rng.standard_normal((count, centers.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def sklearn_baseline(docs64: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """The original cosine_similarity_search kernel"""
+    from sklearn.metrics.pairwise import cosine_similarity
+    similarities = cosine_similarity(query.reshape(1, -1), docs64)[0]
+    return np.argsort(similarities)[-k:][::-1]
+
+
+def timed(fn, queries):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def report(name, latencies, recall=None):
+    recall_txt = f"recall@k={recall:.3f}" if recall is not None else "recall@k=1.000 (reference)"
+    print(f"  {name:<22} p50={np.percentile(latencies, 50):8.2f}ms  "
+          f"p95={np.percentile(latencies, 95):8.2f}ms  {recall_txt}")
+
+
+def recall_at_k(truth, found, k):
+    hits = sum(len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found))
+    return hits / (k * len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=2.0, help="Spread around topic centers (higher = harder)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[2, 5, 10, 20],
+                        help="Quantized candidates re-ranked, as a multiple of k")
+    args = parser.parse_args()
+
+    print(f"Corpus: {args.rows} x {args.dim}, {args.topics} topics (noise {args.noise}), {args.queries} queries, k={args.k}")
+    docs, centers, rng = make_corpus(args.rows, args.dim, args.topics, args.noise)
+    queries = make_queries(centers, args.queries, args.noise, rng)
+    docs64 = docs.astype(np.float64)
+
+    truth, lat = timed(lambda q: sklearn_baseline(docs64, q, args.k), queries)
+    report("sklearn cosine (old)", lat)
+
+    exact = ExactSearch()
+    found, lat = timed(lambda q: exact.search(docs, q, args.k)[0], queries)
+    report("exact float32", lat, recall_at_k(truth, found, args.k))
+
+    start = time.perf_counter()
+    batched = exact.search_many(docs, queries, args.k)
+    per_query = (time.perf_counter() - start) * 1000 / len(queries)
+    found = [rows for rows, _ in batched]
+    print(f"  {'exact batched':<22} {per_query:8.2f}ms/query amortized      "
+          f"recall@k={recall_at_k(truth, found, args.k):.3f}")
+
+    start = time.perf_counter()
+    ivf = IVFSearch.train(docs)
+    print(f"  IVF build: {ivf.n_lists} lists in {time.perf_counter() - start:.1f}s")
+    for n_probe in args.nprobe:
+        ivf.n_probe = n_probe
+        found, lat = timed(lambda q: ivf.search(docs, q, args.k)[0], queries)
+        report(f"ivf nprobe={n_probe}", lat, recall_at_k(truth, found, args.k))
+
+    for mode in ("int8", "binary"):
+        start = time.perf_counter()
+        quantized = QuantizedSearch(docs, mode)
+        print(f"  {mode} codes: {quantized.codec.codes.nbytes / 1024 / 1024:.1f}MB "
+              f"(float32 {docs.nbytes / 1024 / 1024:.1f}MB), built in {time.perf_counter() - start:.1f}s")
+        for factor in args.rerank:
+            quantized.rerank_factor = factor
+            found, lat = timed(lambda q: quantized.search(docs, q, args.k)[0], queries)
+            report(f"{mode} rerank={factor}x", lat, recall_at_k(truth, found, args.k))
+
+
+if __name__ == "__main__":
+    main()
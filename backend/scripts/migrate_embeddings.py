@@ -5,18 +5,24 @@ text-embedding-3-small model (replacing text-embedding-ada-002).
 
 Usage:
   cd /app/backend
-  python scripts/migrate_embeddings.py
+  python scripts/migrate_embeddings.py [--force]
+  python scripts/migrate_embeddings.py --pack
 
 The script:
-  1. Reads all existing chunks from MongoDB
-  2. Re-generates embeddings using the current model (text-embedding-3-small)
+  1. Reads the chunks not yet embedded with the current model (all with --force)
+  2. Re-generates embeddings using the current model (text-embedding-3-small),
+     reusing entries from the embedding cache for texts seen before
   3. Updates each chunk in-place
   4. Reports progress and errors
 
+With --pack, no embeddings are generated: chunks still stored as float
+arrays are rewritten in place as packed float32 binary (see embedding_codec).
+
 IMPORTANT: Run this script whenever the EMBEDDING_MODEL env variable is changed.
            Embeddings from different models are NOT compatible.
 """
 
+import argparse
 import asyncio
 import os
 import sys
@@ -29,52 +35,111 @@ load_dotenv()
 
 import motor.motor_asyncio
 from openai import AsyncOpenAI
+from pymongo import UpdateOne
+
+from embedding_cache import EmbeddingCache, cache_key
+from embedding_codec import embedding_fields
 
 
 MONGO_URL = os.environ["MONGO_URL"]
 DB_NAME = os.environ["DB_NAME"]
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+PACK_BATCH_SIZE = 500
 
 
-async def migrate():
+async def migrate(force: bool = False):
     client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
     db = client[DB_NAME]
     openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    cache = EmbeddingCache(db)
 
     print(f"Starting embedding migration -> {EMBEDDING_MODEL}")
     print(f"Connected to: {DB_NAME}")
 
-    total = await db.content_chunks.count_documents({})
-    print(f"Total chunks to process: {total}")
+    # Chunks already embedded with the target model are unchanged
+    query = {} if force else {"embedding_model": {"$ne": EMBEDDING_MODEL}}
+    total = await db.content_chunks.count_documents(query)
+    skipped = await db.content_chunks.count_documents({}) - total
+    print(f"Total chunks to process: {total} ({skipped} already on {EMBEDDING_MODEL})")
 
     processed = 0
     errors = 0
     start = datetime.utcnow()
 
-    async for chunk in db.content_chunks.find({}, {"_id": 1, "text": 1, "embedding": 1}):
+    async for chunk in db.content_chunks.find(query, {"_id": 1, "text": 1}):
         try:
-            response = await openai.embeddings.create(
-                model=EMBEDDING_MODEL,
-                input=chunk["text"],
-            )
-            new_embedding = response.data[0].embedding
+            key = cache_key(chunk["text"], EMBEDDING_MODEL)
+            cached = await cache.get_many([key])
+            if key in cached:
+                new_embedding = cached[key]
+            else:
+                response = await openai.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=chunk["text"],
+                )
+                new_embedding = response.data[0].embedding
+                await cache.put_many({key: new_embedding}, EMBEDDING_MODEL)
             await db.content_chunks.update_one(
                 {"_id": chunk["_id"]},
-                {"$set": {"embedding": new_embedding, "embedding_model": EMBEDDING_MODEL}},
+                {"$set": {**embedding_fields(new_embedding, EMBEDDING_MODEL), "embedded_at": datetime.utcnow()}},
             )
             processed += 1
             if processed % 10 == 0:
                 elapsed = (datetime.utcnow() - start).total_seconds()
-                print(f"  [{processed}/{total}] {elapsed:.0f}s elapsed — {errors} errors")
+                print(f"  [{processed}/{total}] {elapsed:.0f}s elapsed — {errors} errors, {cache.hits} cache hits")
         except Exception as e:
             errors += 1
             print(f"  ERROR on chunk {chunk['_id']}: {e}")
 
+    # Resident vector indexes in running API workers compare against
+    # content_version; bump it so they rebuild with the new embeddings.
+    if processed:
+        await db.mentors.update_many({}, {"$inc": {"content_version": 1}})
+
     elapsed = (datetime.utcnow() - start).total_seconds()
     print(f"\nMigration complete: {processed}/{total} chunks updated in {elapsed:.0f}s, {errors} errors")
     client.close()
 
 
+async def pack():
+    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    query = {"embedding": {"$type": "array"}}
+    total = await db.content_chunks.count_documents(query)
+    print(f"Packing {total} chunk embeddings as float32 binary ({DB_NAME})")
+
+    packed = 0
+    start = datetime.utcnow()
+    batch = []
+    async for chunk in db.content_chunks.find(query, {"_id": 1, "embedding": 1}).batch_size(PACK_BATCH_SIZE):
+        if chunk["embedding"]:
+            batch.append(UpdateOne(
+                {"_id": chunk["_id"], "embedding": {"$type": "array"}},
+                {"$set": embedding_fields(chunk["embedding"])},
+            ))
+        if len(batch) >= PACK_BATCH_SIZE:
+            packed += (await db.content_chunks.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+            print(f"  [{packed}/{total}] packed")
+    if batch:
+        packed += (await db.content_chunks.bulk_write(batch, ordered=False)).modified_count
+
+    # Vectors are unchanged (indexes already hold float32), so content_version is not bumped
+    elapsed = (datetime.utcnow() - start).total_seconds()
+    print(f"\nPacking complete: {packed}/{total} chunks rewritten in {elapsed:.0f}s")
+    client.close()
+
+
 if __name__ == "__main__":
-    asyncio.run(migrate())
+    parser = argparse.ArgumentParser(description="Re-generate content_chunks embeddings")
+    parser.add_argument("--force", action="store_true", help="Re-embed chunks already on the current model")
+    parser.add_argument("--pack", action="store_true", help="Only convert float array embeddings to packed float32")
+    args = parser.parse_args()
+    if args.pack:
+        asyncio.run(pack())
+    else:
+        if not OPENAI_API_KEY:
+            sys.exit("OPENAI_API_KEY is required to re-generate embeddings")
+        asyncio.run(migrate(force=args.force))
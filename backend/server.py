@@ -24,6 +24,7 @@ from auth_utils import (
 )
 from rag_service import rag_service
 from multi_ai_rag_service import multi_ai_rag_service
+from embedding_codec import decode_embedding
 from mentor_profile_service import mentor_profile_service
 from anonymization_service import anonymization_service
 from exceptions import ResponseValidationError
@@ -1009,6 +1010,10 @@ async def chat_with_mentor(
             "updated_at": datetime.utcnow()
         }
         await db.conversations.insert_one(conversation_doc)
+        conversation = conversation_doc
+    
+    # Denormalized onto every message for mentor-scoped queries
+    message_owner = {"mentor_id": conversation["mentor_id"], "user_id": conversation["user_id"]}
     
     # Anonymize user's question for LGPD/HIPAA compliance
     anonymization_result = anonymization_service.anonymize_text(
@@ -1023,6 +1028,7 @@ async def chat_with_mentor(
     user_message_doc = {
         "_id": user_message_id,
         "conversation_id": conversation_id,
+        **message_owner,
         "sender_type": SenderType.USER,
         "content": anonymization_result["anonymized_text"],  # STORE ANONYMIZED VERSION
         "original_content_hash": hash(chat_request.question),  # For integrity verification only
@@ -1056,7 +1062,7 @@ async def chat_with_mentor(
         ai_used = "none"
     else:
         # Get embeddings and perform similarity search with minimum threshold
-        chunk_embeddings = [chunk["embedding"] for chunk in chunks]
+        chunk_embeddings = [decode_embedding(chunk["embedding"]) for chunk in chunks]
         top_indices, similarity_scores = multi_ai_rag_service.cosine_similarity_search(
             question_embedding, 
             chunk_embeddings, 
@@ -1133,6 +1139,7 @@ async def chat_with_mentor(
     bot_message_doc = {
         "_id": bot_message_id,
         "conversation_id": conversation_id,
+        **message_owner,
         "sender_type": SenderType.MENTOR_BOT,
         "content": response_text,
         "citations": citations,
@@ -1,8 +1,29 @@
 """Tests for analytics and impactometer endpoints."""
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
 from httpx import AsyncClient
 from tests.conftest import auth_header
 from dependencies import db
+import mentor_stats
+from analytics_service import get_queries_analytics, get_ratings_analytics
+
+
+async def _seed_conversation(mentor_id: str, conversation_id: str, exchanges):
+    """exchanges: [(sent_at, question, answer, feedback or None), ...]"""
+    await db.conversations.insert_one({"_id": conversation_id, "mentor_id": mentor_id, "user_id": "u1"})
+    messages = []
+    for i, (sent_at, question, answer, feedback) in enumerate(exchanges):
+        owner = {"conversation_id": conversation_id, "mentor_id": mentor_id, "user_id": "u1"}
+        messages.append({"_id": f"{conversation_id}-q{i}", **owner,
+                         "sender_type": "USER", "content": question, "sent_at": sent_at})
+        bot = {"_id": f"{conversation_id}-a{i}", **owner, "sender_type": "MENTOR_BOT",
+               "content": answer, "citations": [{"content_id": "c1"}], "sent_at": sent_at + timedelta(seconds=5)}
+        if feedback:
+            bot["feedback"] = feedback
+        messages.append(bot)
+    await db.messages.insert_many(messages)
 
 
 @pytest.mark.asyncio
@@ -23,6 +44,49 @@ class TestImpactometer:
         assert "hot_topics" in data
         assert "recent_queries" in data
 
+    async def test_impactometer_reads_write_time_counters(self, async_client: AsyncClient, registered_user, registered_mentor):
+        await db.mentors.update_one(
+            {"_id": registered_mentor["user_id"]},
+            {"$set": {"profile_status": "ACTIVE", "agent_profile": "Sou um bot de cardiologia."}}
+        )
+        user_headers = auth_header(registered_user["token"])
+        first = (await async_client.post("/api/chat", headers=user_headers, json={
+            "mentor_id": registered_mentor["user_id"], "question": "Sintomas de arritmia cardiaca?",
+        })).json()
+        await async_client.post("/api/chat", headers=user_headers, json={
+            "mentor_id": registered_mentor["user_id"], "question": "Tratamento da arritmia?",
+            "conversation_id": first["conversation_id"],
+        })
+        # A rating that changes moves the counter instead of adding to it
+        for feedback in ("LIKE", "DISLIKE", "DISLIKE"):
+            await async_client.post(f"/api/messages/{first['message_id']}/feedback?feedback={feedback}", headers=user_headers)
+
+        resp = await async_client.get("/api/mentor/impactometer", headers=auth_header(registered_mentor["token"]))
+        data = resp.json()
+        assert data["total_queries"] == 2
+        assert data["total_conversations"] == 1
+        assert data["total_users"] == 1
+        assert (data["likes"], data["dislikes"]) == (0, 1)
+        assert data["queries_timeline"][-1]["count"] == 2
+        assert {"word": "arritmia", "count": 2} in data["hot_topics"]
+        assert data["recent_queries"][0]["question"] == "Tratamento da arritmia?"
+
+    async def test_hot_topics_cover_the_last_30_days(self, async_client: AsyncClient, registered_mentor):
+        mentor_id = registered_mentor["user_id"]
+        now = datetime.utcnow()
+        await mentor_stats.record_query(db, mentor_id, "Hipertensão resistente?", at=now - timedelta(days=45))
+        await mentor_stats.record_query(db, mentor_id, "Arritmia no idoso?", at=now - timedelta(days=29))
+        resp = await async_client.get("/api/mentor/impactometer", headers=auth_header(registered_mentor["token"]))
+        data = resp.json()
+        assert data["total_queries"] == 2
+        assert sorted(t["word"] for t in data["hot_topics"]) == ["arritmia", "idoso"]
+
+    async def test_concurrent_first_conversations_count_the_user_once(self, setup_test_db):
+        await asyncio.gather(*[mentor_stats.record_conversation(db, "m1", "u1") for _ in range(5)])
+        await mentor_stats.record_conversation(db, "m1", "u2")
+        all_time, _ = await mentor_stats.read_window(db, "m1", days=1)
+        assert (all_time["conversations"], all_time["users"]) == (6, 2)
+
     async def test_impactometer_requires_mentor(self, async_client: AsyncClient, registered_user):
         resp = await async_client.get("/api/mentor/impactometer", headers=auth_header(registered_user["token"]))
         assert resp.status_code == 403
@@ -38,6 +102,27 @@ class TestQueriesAnalytics:
         resp = await async_client.get("/api/mentor/analytics/queries", headers=auth_header(registered_mentor["token"]))
         assert resp.status_code == 200
 
+    async def test_queries_are_aggregated_per_day_and_hour(self, setup_test_db):
+        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        await _seed_conversation("m1", "cv1", [
+            (now - timedelta(days=1), "Qual a dose?", "x" * 150, None),
+            (now - timedelta(days=1, minutes=-1), "E a meia-vida?", "Curta", None),
+        ])
+        await _seed_conversation("m1", "cv2", [(now - timedelta(days=40), "Antiga", "Resposta antiga", None)])
+        await _seed_conversation("m2", "cv3", [(now, "Outro mentor", "Nao conta", None)])
+
+        data = await get_queries_analytics(db, "m1")
+        assert data["total_queries"] == 3
+        assert len(data["daily_data"]) == 31
+        yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+        assert {"date": yesterday, "count": 2} in data["daily_data"]
+        assert sum(d["count"] for d in data["daily_data"]) == 2
+        assert sum(data["hourly_distribution"]) == 3
+        assert data["last_week_total"] == 2
+        latest = data["recent_queries"][0]
+        assert latest["question"] == "E a meia-vida?"
+        assert data["recent_queries"][1]["response_preview"] == "x" * 100 + "..."
+
     async def test_queries_analytics_requires_mentor(self, async_client: AsyncClient, registered_user):
         resp = await async_client.get("/api/mentor/analytics/queries", headers=auth_header(registered_user["token"]))
         assert resp.status_code == 403
@@ -49,6 +134,24 @@ class TestRatingsAnalytics:
         resp = await async_client.get("/api/mentor/analytics/ratings", headers=auth_header(registered_mentor["token"]))
         assert resp.status_code == 200
 
+    async def test_ratings_are_aggregated(self, setup_test_db):
+        now = datetime.utcnow()
+        await _seed_conversation("m1", "cv1", [
+            (now - timedelta(days=2), "P1", "Boa", "LIKE"),
+            (now - timedelta(days=2), "P2", "Ruim", "DISLIKE"),
+            (now - timedelta(days=1), "P3", "y" * 250, "LIKE"),
+            (now - timedelta(days=1), "P4", "Sem nota", None),
+        ])
+
+        data = await get_ratings_analytics(db, "m1")
+        assert data["like_count"] == 2
+        assert data["dislike_count"] == 1
+        assert data["total_feedbacks"] == 3
+        assert data["average_rating"] == pytest.approx(3.33, abs=0.01)
+        assert [r["rating"] for r in data["rating_timeline"]] == [2.5, 5.0]
+        assert data["best_responses"][0]["content"] == "y" * 200 + "..."
+        assert data["best_responses"][0]["citations_count"] == 1
+
     async def test_ratings_analytics_requires_mentor(self, async_client: AsyncClient, registered_user):
         resp = await async_client.get("/api/mentor/analytics/ratings", headers=auth_header(registered_user["token"]))
         assert resp.status_code == 403
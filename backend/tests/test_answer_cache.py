@@ -0,0 +1,34 @@
+"""Tests for the per-mentor semantic answer cache."""
+import pytest
+from answer_cache import AnswerCache
+from dependencies import db
+
+CITATIONS = [{"source_id": "c1", "title": "Artigo", "excerpt": "trecho"}]
+
+
+@pytest.mark.asyncio
+class TestAnswerCache:
+    async def test_similar_question_hits(self, setup_test_db):
+        cache = AnswerCache(threshold=0.95)
+        mentor = {"_id": "m1", "content_version": 3, "profile_version": 1}
+        await cache.store(db, mentor, "dose de amiodarona na FA", [1.0, 0.0, 0.0], "Resposta [source_1]", CITATIONS)
+
+        hit = await cache.lookup(db, mentor, [0.99, 0.05, 0.0])
+        assert hit == {"response": "Resposta [source_1]", "citations": CITATIONS}
+        assert await cache.lookup(db, mentor, [0.0, 1.0, 0.0]) is None
+
+    async def test_version_change_misses(self, setup_test_db):
+        cache = AnswerCache(threshold=0.95)
+        mentor = {"_id": "m1", "content_version": 1, "profile_version": 0}
+        await cache.store(db, mentor, "pergunta", [1.0, 0.0], "Resposta [source_1]", CITATIONS)
+        assert await cache.lookup(db, mentor | {"content_version": 2}, [1.0, 0.0]) is None
+        assert await cache.lookup(db, mentor | {"profile_version": 1}, [1.0, 0.0]) is None
+
+    async def test_entries_are_shared_and_invalidated(self, setup_test_db):
+        mentor = {"_id": "m1"}
+        await AnswerCache().store(db, mentor, "pergunta", [0.0, 1.0], "Resposta [source_1]", CITATIONS)
+        other_worker = AnswerCache()
+        assert await other_worker.lookup(db, mentor, [0.0, 1.0]) is not None
+        await other_worker.invalidate(db, "m1")
+        assert await db.answer_cache.count_documents({"mentor_id": "m1"}) == 0
+        assert await other_worker.lookup(db, mentor, [0.0, 1.0]) is None
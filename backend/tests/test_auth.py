@@ -112,3 +112,23 @@ class TestProtectedRoutes:
         data = resp.json()
         assert data["email"] == "testuser@med.com"
         assert data["full_name"] == "Dr. Teste"
+
+
+@pytest.mark.asyncio
+class TestPasswordHashPool:
+    async def test_async_hash_and_verify(self):
+        from auth_utils import hash_password_async, verify_password_async, password_hash_stats
+        before = password_hash_stats()["completed"]
+        hashed = await hash_password_async("Senha123!")
+        assert await verify_password_async("Senha123!", hashed)
+        assert not await verify_password_async("errada", hashed)
+        stats = password_hash_stats()
+        assert stats["completed"] == before + 3
+        assert stats["queued"] == 0 and stats["running"] == 0
+
+    async def test_hash_pool_stats_require_authentication(self, async_client: AsyncClient, registered_user):
+        assert "password_hashing" not in (await async_client.get("/api/health")).json()
+        assert (await async_client.get("/api/metrics")).status_code in (401, 403)
+        resp = await async_client.get("/api/metrics", headers=auth_header(registered_user["token"]))
+        assert resp.status_code == 200
+        assert "queued" in resp.json()["password_hashing"]
@@ -1,7 +1,8 @@
 """Tests for chat, conversations, and search endpoints."""
+import json
 import uuid
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 from httpx import AsyncClient
 from tests.conftest import auth_header
 from dependencies import db
@@ -38,6 +39,52 @@ class TestConversations:
         assert len(data) == 1
         assert data[0]["title"] == "Test conversation"
         assert data[0]["last_message"] == "Hello world"
+        assert data[0]["mentor_name"] == "Dr. Mentor Teste"
+        assert "x-next-cursor" not in resp.headers
+
+    async def test_list_conversations_cursor_pagination(self, async_client: AsyncClient, registered_user, registered_mentor):
+        base = datetime.utcnow().replace(microsecond=0)
+        # Two conversations share updated_at to exercise the _id tie-break
+        stamps = [base, base, base - timedelta(minutes=1), base - timedelta(minutes=2), base - timedelta(minutes=3)]
+        await db.conversations.insert_many([
+            {
+                "_id": f"conv-{i}", "user_id": registered_user["user_id"],
+                "mentor_id": registered_mentor["user_id"], "title": f"Conversa {i}",
+                "last_message": f"Resposta {i}", "created_at": stamp, "updated_at": stamp,
+            }
+            for i, stamp in enumerate(stamps)
+        ])
+        headers = auth_header(registered_user["token"])
+        seen, cursor = [], None
+        for _ in range(3):
+            params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+            resp = await async_client.get("/api/conversations", headers=headers, params=params)
+            assert resp.status_code == 200
+            seen.extend(c["id"] for c in resp.json())
+            cursor = resp.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        assert seen == ["conv-1", "conv-0", "conv-2", "conv-3", "conv-4"]
+        assert cursor is None
+
+    async def test_list_conversations_invalid_cursor(self, async_client: AsyncClient, registered_user):
+        resp = await async_client.get(
+            "/api/conversations", headers=auth_header(registered_user["token"]), params={"cursor": "!!"}
+        )
+        assert resp.status_code == 400
+
+    async def test_chat_keeps_last_message_snapshot(self, async_client: AsyncClient, registered_user, registered_mentor):
+        await db.mentors.update_one(
+            {"_id": registered_mentor["user_id"]},
+            {"$set": {"profile_status": "ACTIVE", "agent_profile": "Sou um bot de cardiologia."}}
+        )
+        chat = (await async_client.post("/api/chat", headers=auth_header(registered_user["token"]), json={
+            "mentor_id": registered_mentor["user_id"], "question": "O que e arritmia?",
+        })).json()
+        conv = await db.conversations.find_one({"_id": chat["conversation_id"]})
+        assert conv["last_message"] == chat["response"][:100]
+        listed = (await async_client.get("/api/conversations", headers=auth_header(registered_user["token"]))).json()
+        assert listed[0]["last_message"] == conv["last_message"]
 
 
 @pytest.mark.asyncio
@@ -125,6 +172,14 @@ class TestChat:
         assert "conteudo" in data["response"].lower() or "nao possui" in data["response"].lower()
         assert data["mentor_name"] == "Dr. Mentor Teste"
 
+        # Messages carry their owners so mentor queries need no conversation lookup
+        stored = await db.messages.find({"conversation_id": data["conversation_id"]}).to_list(None)
+        assert len(stored) == 2
+        assert {m["mentor_id"] for m in stored} == {registered_mentor["user_id"]}
+        assert {m["user_id"] for m in stored} == {registered_user["user_id"]}
+        stats = await async_client.get("/api/mentor/stats", headers=auth_header(registered_mentor["token"]))
+        assert stats.json()["total_queries"] == 1
+
     async def test_chat_with_pending_mentor(self, async_client: AsyncClient, registered_user, registered_mentor):
         await db.mentors.update_one(
             {"_id": registered_mentor["user_id"]},
@@ -138,6 +193,35 @@ class TestChat:
         assert "aguardando" in resp.json()["detail"].lower()
 
 
+@pytest.mark.asyncio
+class TestChatStream:
+    async def test_stream_rejects_inactive_mentor(self, async_client: AsyncClient, registered_user, registered_mentor):
+        resp = await async_client.post("/api/chat/stream", headers=auth_header(registered_user["token"]), json={
+            "mentor_id": registered_mentor["user_id"],
+            "question": "O que e insuficiencia cardiaca?",
+        })
+        assert resp.status_code == 400
+
+    async def test_stream_events_and_persistence(self, async_client: AsyncClient, registered_user, registered_mentor):
+        await db.mentors.update_one(
+            {"_id": registered_mentor["user_id"]},
+            {"$set": {"profile_status": "ACTIVE", "agent_profile": "Sou um bot de cardiologia."}}
+        )
+        resp = await async_client.post("/api/chat/stream", headers=auth_header(registered_user["token"]), json={
+            "mentor_id": registered_mentor["user_id"],
+            "question": "O que e arritmia?",
+        })
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [line.split(": ", 1)[1] for line in resp.text.splitlines() if line.startswith("event: ")]
+        assert events[0] == "meta" and events[-1] == "done"
+        assert "token" in events
+        done = json.loads(resp.text.strip().split("\n")[-1][len("data: "):])
+        stored = await db.messages.find_one({"_id": done["message_id"]})
+        assert stored["content"] == done["response"]
+        assert stored["conversation_id"] == done["conversation_id"]
+
+
 @pytest.mark.asyncio
 class TestFeedback:
     async def test_feedback_nonexistent_message(self, async_client: AsyncClient, registered_user):
@@ -0,0 +1,92 @@
+"""Tests for the index registry: reconciliation and index use by hot queries."""
+from datetime import datetime
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from db_indexes import INDEXES, ensure_indexes
+from dependencies import db
+
+NOW = datetime(2024, 1, 1)
+
+# (collection, filter, sort) for the queries the routers and services run on every request
+HOT_QUERIES = [
+    ("users", {"email": "a@b.com"}, None),
+    ("mentors", {"email": "a@b.com"}, None),
+    ("mentor_content", {"mentor_id": "m1"}, [("uploaded_at", DESCENDING)]),
+    ("content_chunks", {"mentor_id": "m1"}, None),
+    ("content_chunks", {"content_id": "c1"}, None),
+    ("content_chunks", {"mentor_id": "m1", "$or": [
+        {"created_at": {"$gte": NOW}}, {"embedded_at": {"$gte": NOW}},
+    ]}, None),
+    ("conversations", {"user_id": "u1"}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("conversations", {"user_id": "u1", "$or": [
+        {"updated_at": {"$lt": NOW}}, {"updated_at": NOW, "_id": {"$lt": "cv1"}},
+    ]}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("conversations", {"mentor_id": "m1"}, None),
+    ("messages", {"conversation_id": "cv1"}, [("sent_at", ASCENDING)]),
+    ("messages", {"conversation_id": "cv1", "sender_type": "USER", "sent_at": {"$lt": NOW}}, [("sent_at", DESCENDING)]),
+    ("messages", {"mentor_id": "m1", "sender_type": "MENTOR_BOT"}, [("sent_at", DESCENDING)]),
+    ("messages", {"mentor_id": "m1", "sender_type": "MENTOR_BOT", "feedback": "LIKE"}, None),
+    ("feedback_logs", {"mentor_id": "m1"}, [("feedback_at", DESCENDING)]),
+    ("answer_cache", {"mentor_id": "m1", "content_version": 1, "profile_version": 0}, [("created_at", DESCENDING)]),
+    ("ai_insights_cache", {"mentor_id": "m1"}, None),
+    ("ingestion_jobs", {"$or": [
+        {"status": "QUEUED"}, {"status": "RUNNING", "lease_expires_at": {"$lt": NOW}},
+    ]}, None),
+]
+
+
+def _stages(plan) -> list:
+    """Every stage name in an explain() plan tree (classic and SBE layouts)"""
+    found = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            found.append(plan["stage"])
+        for value in plan.values():
+            found.extend(_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            found.extend(_stages(item))
+    return found
+
+
+@pytest.mark.asyncio
+class TestIndexRegistry:
+    async def test_missing_indexes_are_created_once(self, setup_test_db):
+        await ensure_indexes(db)
+        await db.messages.drop_index("mentor_sender_sent")
+        report = await ensure_indexes(db)
+        assert {"collection": "messages", "name": "mentor_sender_sent"} in report["created"]
+        assert not report["failed"]
+
+        again = await ensure_indexes(db)
+        assert again["created"] == []
+
+    async def test_extra_indexes_are_reported_not_dropped(self, setup_test_db):
+        await db.messages.create_index([("content", ASCENDING)], name="adhoc_content")
+        try:
+            report = await ensure_indexes(db, ["messages"])
+            assert "adhoc_content" in [ix["name"] for ix in report["extra"]]
+            assert "adhoc_content" in await db.messages.index_information()
+        finally:
+            await db.messages.drop_index("adhoc_content")
+
+    async def test_embedding_cache_entries_expire(self, setup_test_db):
+        await ensure_indexes(db, ["embedding_cache"])
+        ttl = (await db.embedding_cache.index_information())["last_used_ttl"]
+        assert ttl["expireAfterSeconds"] > 0
+
+    async def test_hot_queries_use_an_index(self, setup_test_db):
+        await ensure_indexes(db)
+        for collection, query, sort in HOT_QUERIES:
+            assert collection in INDEXES
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+            stages = _stages(plan)
+            assert "COLLSCAN" not in stages, (collection, query, stages)
+            assert any("IXSCAN" in s or s == "IDHACK" or s.startswith("EXPRESS") for s in stages), (collection, query, stages)
+            # Sorted listings should read the index in order instead of sorting in memory
+            if sort:
+                assert "SORT" not in stages, (collection, query, stages)
@@ -0,0 +1,45 @@
+"""Tests for the content-addressed embedding cache."""
+from datetime import datetime, timedelta
+
+import pytest
+from embedding_cache import EmbeddingCache, cache_key
+from dependencies import db
+
+
+class TestCacheKey:
+    def test_normalization_and_model_scope(self):
+        assert cache_key("  Dor   lombar\n", "m1") == cache_key("Dor lombar", "m1")
+        assert cache_key("Dor lombar", "m1") != cache_key("Dor lombar", "m2")
+
+
+@pytest.mark.asyncio
+class TestEmbeddingCache:
+    async def test_lru_tier_evicts_oldest(self):
+        # Two 1-d float32 vectors
+        cache = EmbeddingCache(max_bytes=8, persist=False)
+        await cache.put_many({"a": [1.0], "b": [2.0]}, "m")
+        await cache.get_many(["a"])
+        await cache.put_many({"c": [3.0]}, "m")
+        found = await cache.get_many(["a", "b", "c"])
+        assert sorted(found) == ["a", "c"]
+        assert cache.hits == 3 and cache.misses == 1
+
+    async def test_lru_tier_is_bounded_by_bytes(self):
+        cache = EmbeddingCache(max_bytes=16, persist=False)
+        await cache.put_many({"a": [1.0], "b": [2.0], "c": [3.0]}, "m")
+        # A 3-d vector (12 bytes) evicts the two oldest 1-d ones
+        await cache.put_many({"big": [1.0, 2.0, 3.0]}, "m")
+        assert sorted(await cache.get_many(["a", "b", "c", "big"])) == ["big", "c"]
+        assert cache._lru_bytes == 16
+
+    async def test_persistent_tier_is_shared(self, setup_test_db):
+        await EmbeddingCache(db).put_many({"k": [0.5, 0.25]}, "m")
+        found = await EmbeddingCache(db).get_many(["k", "missing"])
+        assert found == {"k": [0.5, 0.25]}
+
+    async def test_hits_refresh_last_used_for_the_ttl_index(self, setup_test_db):
+        await EmbeddingCache(db).put_many({"k": [0.5]}, "m")
+        month_ago = datetime.utcnow() - timedelta(days=30)
+        await db.embedding_cache.update_one({"_id": "k"}, {"$set": {"last_used": month_ago}})
+        await EmbeddingCache(db).get_many(["k"])
+        assert (await db.embedding_cache.find_one({"_id": "k"}))["last_used"] > month_ago
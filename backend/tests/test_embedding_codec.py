@@ -0,0 +1,41 @@
+"""Tests for the packed float32 embedding storage format."""
+import bson
+import numpy as np
+import pytest
+from embedding_codec import decode_embedding, embedding_fields, pack_embedding
+from dependencies import db
+
+
+class TestEmbeddingCodec:
+    def test_round_trip_through_bson(self):
+        vector = [0.25, -1.5, 3.0]
+        stored = bson.decode(bson.encode({"embedding": pack_embedding(vector)}))["embedding"]
+        decoded = decode_embedding(stored)
+        assert decoded.dtype == np.float32
+        assert decoded.tolist() == vector
+
+    def test_legacy_arrays_and_empty_values(self):
+        assert decode_embedding([1, 2]).tolist() == [1.0, 2.0]
+        assert decode_embedding([]) is None
+        assert decode_embedding(None) is None
+        assert decode_embedding(b"\x00\x01\x02") is None
+
+    def test_fields_carry_dim_and_model(self):
+        fields = embedding_fields([0.0] * 8, "text-embedding-3-small")
+        assert fields["embedding_dim"] == 8
+        assert fields["embedding_model"] == "text-embedding-3-small"
+        assert len(fields["embedding"]) == 32
+
+    def test_packed_is_smaller_than_float_array(self):
+        vector = np.random.default_rng(0).standard_normal(1536).tolist()
+        packed = len(bson.encode({"embedding": pack_embedding(vector)}))
+        array = len(bson.encode({"embedding": vector}))
+        assert packed * 3 < array
+
+
+@pytest.mark.asyncio
+class TestPackedStorage:
+    async def test_mongo_round_trip(self, setup_test_db):
+        await db.content_chunks.insert_one({"_id": "packed", **embedding_fields([0.5, 0.25])})
+        doc = await db.content_chunks.find_one({"_id": "packed"})
+        assert decode_embedding(doc["embedding"]).tolist() == [0.5, 0.25]
@@ -0,0 +1,136 @@
+"""Tests for memory-mapped vector index snapshots."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+import vector_index
+from index_snapshot import load_snapshot, save_snapshot
+from vector_index import MentorVectorIndex, VectorIndexService
+from dependencies import db
+
+
+def _chunk(chunk_id, content_id, embedding, text="texto", **extra):
+    return {"_id": chunk_id, "content_id": content_id, "title": "Artigo", "text": text, "embedding": embedding, **extra}
+
+
+def _mapped_index(tmp_path, docs, version=1):
+    built = MentorVectorIndex("m1", version)
+    built.add_chunks(docs)
+    matrix, chunks = built.snapshot_state()
+    save_snapshot(str(tmp_path), "m1", version, datetime.utcnow(), matrix, chunks)
+    snapshot = load_snapshot(str(tmp_path), "m1")
+    index = MentorVectorIndex("m1", version)
+    index.load_mapped(snapshot["matrix"], snapshot["chunks"])
+    return index
+
+
+class TestSnapshotFiles:
+    def test_roundtrip_is_memory_mapped(self, tmp_path):
+        matrix = np.eye(3, dtype=np.float32)
+        chunks = [{"chunk_id": str(i), "content_id": "c1", "title": "", "text": ""} for i in range(3)]
+        watermark = datetime(2024, 5, 1, 12, 0)
+        save_snapshot(str(tmp_path), "m1", 7, watermark, matrix, chunks)
+
+        snapshot = load_snapshot(str(tmp_path), "m1")
+        assert isinstance(snapshot["matrix"], np.memmap)
+        assert np.array_equal(snapshot["matrix"], matrix)
+        assert snapshot["version"] == 7
+        assert snapshot["watermark"] == watermark
+        assert snapshot["chunks"] == chunks
+
+    def test_resave_replaces_previous_matrix(self, tmp_path):
+        chunks = [{"chunk_id": "a", "content_id": "c1", "title": "", "text": ""}]
+        save_snapshot(str(tmp_path), "m1", 1, datetime.utcnow(), np.ones((1, 2), np.float32), chunks)
+        save_snapshot(str(tmp_path), "m1", 2, datetime.utcnow(), np.zeros((1, 2), np.float32), chunks)
+        assert len(list(tmp_path.glob("*.npy"))) == 1
+        assert load_snapshot(str(tmp_path), "m1")["version"] == 2
+
+    def test_concurrent_saves_leave_one_matrix(self, tmp_path):
+        chunks = [{"chunk_id": "a", "content_id": "c1", "title": "", "text": ""}]
+        # A matrix orphaned by an earlier race, and another mentor's files that must survive
+        np.save(tmp_path / "m1.0123456789ab.npy", np.ones((1, 2), np.float32))
+        save_snapshot(str(tmp_path), "m1.x", 1, datetime.utcnow(), np.ones((1, 2), np.float32), chunks)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(
+                lambda v: save_snapshot(str(tmp_path), "m1", v, datetime.utcnow(), np.full((1, 2), v, np.float32), chunks),
+                range(8),
+            ))
+        assert len(list(tmp_path.glob("m1.[0-9a-f]*.npy"))) == 1
+        assert load_snapshot(str(tmp_path), "m1") is not None
+        assert load_snapshot(str(tmp_path), "m1.x") is not None
+
+    def test_missing_or_corrupt_snapshot_is_ignored(self, tmp_path):
+        assert load_snapshot(str(tmp_path), "m1") is None
+        chunks = [{"chunk_id": "a", "content_id": "c1", "title": "", "text": ""}]
+        path = save_snapshot(str(tmp_path), "m1", 1, datetime.utcnow(), np.ones((1, 2), np.float32), chunks)
+        np.save(path, np.ones((2, 2), np.float32))
+        assert load_snapshot(str(tmp_path), "m1") is None
+
+
+class TestMappedIndex:
+    def test_new_chunks_go_to_delta_and_are_searched(self, tmp_path):
+        index = _mapped_index(tmp_path, [_chunk("a", "c1", [1.0, 0.0, 0.0]), _chunk("b", "c1", [0.0, 1.0, 0.0])])
+        assert index.add_chunks([_chunk("c", "c2", [0.0, 0.0, 1.0]), _chunk("d", "c2", [0.9, 0.1, 0.0])]) == 2
+        assert index.mapped
+        assert len(index) == 4
+
+        results = index.search_many([[0.0, 0.0, 1.0], [1.0, 0.0, 0.0]], top_k=2, min_similarity=0.0)
+        assert results[0][0][0]["chunk_id"] == "c"
+        assert [c["chunk_id"] for c, _ in results[1]] == ["a", "d"]
+        assert index.hybrid_search("texto", [0.0, 0.0, 1.0], top_k=1, min_similarity=0.0)[0][0]["chunk_id"] == "c"
+
+    def test_delta_is_compacted_past_threshold(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(vector_index, "VECTOR_INDEX_DELTA_MAX_ROWS", 1)
+        index = _mapped_index(tmp_path, [_chunk("a", "c1", [1.0, 0.0])])
+        index.add_chunks([_chunk("b", "c2", [0.0, 1.0]), _chunk("c", "c2", [0.6, 0.8])])
+        assert not index.mapped
+        assert index.matrix.shape == (3, 2)
+        assert index.search([0.0, 1.0], top_k=1)[0][0]["chunk_id"] == "b"
+
+    def test_remove_content_from_mapped_index(self, tmp_path):
+        index = _mapped_index(tmp_path, [_chunk("a", "c1", [1.0, 0.0]), _chunk("b", "c2", [0.0, 1.0])])
+        index.add_chunks([_chunk("c", "c3", [0.6, 0.8])])
+        assert index.remove_content("c1") == 1
+        assert [c["chunk_id"] for c in index.chunks] == ["b", "c"]
+        assert index.matrix.shape == (2, 2)
+        assert index.search([1.0, 0.0], min_similarity=0.9) == []
+
+
+class TestSnapshotWarmStart:
+    async def test_snapshot_is_saved_and_caught_up(self, setup_test_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(vector_index, "VECTOR_INDEX_SNAPSHOT_DIR", str(tmp_path))
+        now = datetime.utcnow()
+        await db.mentors.insert_one({"_id": "s1", "full_name": "Dr. Snap", "content_version": 1})
+        await db.content_chunks.insert_many([
+            _chunk("a", "c1", [1.0, 0.0], mentor_id="s1", created_at=now - timedelta(days=2)),
+            _chunk("b", "c2", [0.0, 1.0], mentor_id="s1", created_at=now - timedelta(days=2)),
+        ])
+        await VectorIndexService().get_index(db, "s1", 1)
+        assert load_snapshot(str(tmp_path), "s1")["version"] == 1
+
+        # Another worker adds one content and deletes another
+        await db.content_chunks.insert_one(_chunk("c", "c3", [0.6, 0.8], mentor_id="s1", created_at=datetime.utcnow()))
+        await db.content_chunks.delete_many({"content_id": "c1"})
+
+        index = await VectorIndexService().get_index(db, "s1", 3)
+        assert index.version == 3
+        assert sorted(c["chunk_id"] for c in index.chunks) == ["b", "c"]
+        assert index.search([1.0, 0.0], top_k=1, min_similarity=0.0)[0][0]["chunk_id"] == "c"
+        # Removal forces a re-save at the new version
+        assert load_snapshot(str(tmp_path), "s1")["version"] == 3
+
+    async def test_reembedded_chunk_forces_rebuild(self, setup_test_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(vector_index, "VECTOR_INDEX_SNAPSHOT_DIR", str(tmp_path))
+        old = datetime.utcnow() - timedelta(days=2)
+        await db.mentors.insert_one({"_id": "s2", "full_name": "Dr. Snap", "content_version": 1})
+        await db.content_chunks.insert_one(_chunk("a", "c1", [1.0, 0.0], mentor_id="s2", created_at=old))
+        await VectorIndexService().get_index(db, "s2", 1)
+
+        await db.content_chunks.update_one(
+            {"_id": "a"}, {"$set": {"embedding": [0.0, 1.0], "embedded_at": datetime.utcnow()}}
+        )
+        index = await VectorIndexService().get_index(db, "s2", 2)
+        assert not index.mapped
+        assert index.search([0.0, 1.0], top_k=1)[0][1] == pytest.approx(1.0)
@@ -0,0 +1,177 @@
+"""Tests for the background ingestion worker."""
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+import ingestion_service
+from dependencies import db, get_fs_bucket
+from exceptions import ContentProcessingError, EmbeddingGenerationError
+from ingestion_service import IngestionService, JobStatus, download_upload
+
+
+class _FakeVectorIndex:
+    def __init__(self):
+        self.removed = []
+
+    async def on_content_removed(self, db, mentor_id, content_id):
+        self.removed.append(content_id)
+
+
+class _FakeTranscription:
+    def __init__(self):
+        self.received = []
+
+    async def transcribe(self, data, filename):
+        self.received.append(data)
+        return "texto transcrito da aula"
+
+
+class _SlowTranscription:
+    """A long recording: no progress is reported while Whisper runs"""
+
+    def __init__(self):
+        self.leases = []
+
+    async def transcribe(self, data, filename):
+        for _ in range(3):
+            await asyncio.sleep(0.1)
+            job = await db.ingestion_jobs.find_one({"_id": "c1"})
+            self.leases.append(job["lease_expires_at"])
+        raise ContentProcessingError("audio vazio")
+
+
+class _DeletedMidStreamRag:
+    """Stores a batch, then the mentor deletes the content before the next one"""
+
+    def __init__(self, delete_after_last_batch=False):
+        self.vector_index = _FakeVectorIndex()
+        self.delete_after_last_batch = delete_after_last_batch
+
+    async def process_content_stream(self, text_stream, mentor_id, content_id, title, db, on_progress=None):
+        async for _ in text_stream:
+            pass
+        await db.content_chunks.insert_one({"content_id": content_id, "mentor_id": mentor_id, "text": "trecho"})
+        if self.delete_after_last_batch:
+            await on_progress(1, 1)
+            await db.mentor_content.delete_one({"_id": content_id})
+        else:
+            await db.mentor_content.delete_one({"_id": content_id})
+            await on_progress(1, 2)
+        return 1
+
+
+class _EmbeddingOutageRag:
+    """Stores some chunks, then a batch runs out of embedding retries"""
+
+    def __init__(self):
+        self.vector_index = _FakeVectorIndex()
+
+    async def process_content_stream(self, text_stream, mentor_id, content_id, title, db, on_progress=None):
+        async for _ in text_stream:
+            pass
+        await db.content_chunks.insert_one({"content_id": content_id, "mentor_id": mentor_id, "text": "trecho"})
+        raise EmbeddingGenerationError("Failed to generate embeddings with OpenAI: 503")
+
+
+async def _queued_job(content_id="c1", mentor_id="m1"):
+    file_id = await get_fs_bucket().upload_from_stream("aula.mp3", b"ID3audio")
+    now = datetime.utcnow()
+    await db.mentor_content.insert_one({"_id": content_id, "mentor_id": mentor_id, "status": "PROCESSING"})
+    await db.ingestion_jobs.insert_one({
+        "_id": content_id, "mentor_id": mentor_id, "file_id": file_id, "filename": "aula.mp3",
+        "file_type": "AUDIO", "title": "Aula", "status": JobStatus.RUNNING, "attempts": 1,
+        "created_at": now, "updated_at": now,
+    })
+    return await db.ingestion_jobs.find_one({"_id": content_id})
+
+
+@pytest.mark.asyncio
+class TestDeletedDuringIngestion:
+    @pytest.mark.parametrize("delete_after_last_batch", [False, True])
+    async def test_chunks_are_removed_and_job_stops(self, setup_test_db, delete_after_last_batch):
+        rag = _DeletedMidStreamRag(delete_after_last_batch)
+        service = IngestionService(rag, profile_service=None, transcription_service=_FakeTranscription())
+        service._db = db
+        await service._run(await _queued_job())
+
+        assert await db.content_chunks.count_documents({"content_id": "c1"}) == 0
+        assert rag.vector_index.removed == ["c1"]
+        assert await db.ingestion_jobs.find_one({"_id": "c1"}) is None
+        # The deleted content is not recreated as COMPLETED
+        assert await db.mentor_content.find_one({"_id": "c1"}) is None
+
+
+@pytest.mark.asyncio
+class TestJobLease:
+    async def test_lease_is_renewed_during_long_transcription(self, setup_test_db, monkeypatch):
+        monkeypatch.setattr(ingestion_service, "INGESTION_LEASE_SECONDS", 0.15)
+        transcription = _SlowTranscription()
+        service = IngestionService(_DeletedMidStreamRag(), profile_service=None, transcription_service=transcription)
+        service._db = db
+        await service._run(await _queued_job())
+
+        assert len(set(transcription.leases)) == 3
+        job = await db.ingestion_jobs.find_one({"_id": "c1"})
+        assert job["status"] == JobStatus.ERROR
+        # The heartbeat stops with the job
+        await asyncio.sleep(0.2)
+        assert (await db.ingestion_jobs.find_one({"_id": "c1"}))["updated_at"] == job["updated_at"]
+
+
+@pytest.mark.asyncio
+class TestDownload:
+    async def test_upload_is_copied_to_a_temporary_file_in_chunks(self, setup_test_db, monkeypatch):
+        monkeypatch.setattr(ingestion_service, "DOWNLOAD_CHUNK_SIZE", 4)
+        payload = b"%PDF-1.4 conteudo da aula"
+        file_id = await get_fs_bucket().upload_from_stream("aula.pdf", payload)
+        path = await download_upload(file_id, "aula.pdf")
+        try:
+            assert path.endswith(".pdf")
+            with open(path, "rb") as f:
+                assert f.read() == payload
+        finally:
+            os.unlink(path)
+
+    async def test_temporary_file_is_removed_after_the_job(self, setup_test_db, monkeypatch):
+        paths = []
+        real_download = ingestion_service.download_upload
+
+        async def tracked(file_id, filename):
+            paths.append(await real_download(file_id, filename))
+            return paths[-1]
+
+        monkeypatch.setattr(ingestion_service, "download_upload", tracked)
+        transcription = _FakeTranscription()
+        service = IngestionService(_DeletedMidStreamRag(), profile_service=None, transcription_service=transcription)
+        service._db = db
+        await service._run(await _queued_job())
+
+        assert transcription.received == [b"ID3audio"]
+        assert len(paths) == 1 and not os.path.exists(paths[0])
+
+
+@pytest.mark.asyncio
+class TestFailedAttempt:
+    async def test_embedding_failure_is_retried_without_leftover_chunks(self, setup_test_db):
+        rag = _EmbeddingOutageRag()
+        service = IngestionService(rag, profile_service=None, transcription_service=_FakeTranscription())
+        service._db = db
+        await service._run(await _queued_job())
+
+        job = await db.ingestion_jobs.find_one({"_id": "c1"})
+        assert job["status"] == JobStatus.QUEUED
+        assert "503" in job["error"]
+        assert await db.content_chunks.count_documents({"content_id": "c1"}) == 0
+        assert rag.vector_index.removed == ["c1"]
+        assert (await db.mentor_content.find_one({"_id": "c1"}))["status"] == "PROCESSING"
+
+    async def test_last_attempt_marks_the_content_failed(self, setup_test_db, monkeypatch):
+        monkeypatch.setattr(ingestion_service, "INGESTION_MAX_ATTEMPTS", 1)
+        service = IngestionService(_EmbeddingOutageRag(), profile_service=None, transcription_service=_FakeTranscription())
+        service._db = db
+        await service._run(await _queued_job())
+
+        assert (await db.ingestion_jobs.find_one({"_id": "c1"}))["status"] == JobStatus.ERROR
+        assert (await db.mentor_content.find_one({"_id": "c1"}))["status"] == "ERROR"
+        assert await db.content_chunks.count_documents({"content_id": "c1"}) == 0
@@ -0,0 +1,106 @@
+"""Tests for the BM25 lexical index and hybrid retrieval."""
+import pytest
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from vector_index import MentorVectorIndex, VectorIndexService
+
+
+def _meta(chunk_id, text):
+    return {"chunk_id": chunk_id, "content_id": "c1", "title": "Artigo", "text": text}
+
+
+class TestTokenize:
+    def test_folds_accents_and_drops_stopwords(self):
+        assert tokenize("Qual a dose de Amiodarona na Fibrilação?") == ["dose", "amiodarona", "fibrilacao"]
+
+    def test_keeps_codes_and_decimals(self):
+        assert tokenize("CID I10.9, dose 2,5 mg") == ["cid", "i10.9", "dose", "2,5", "mg"]
+
+
+class TestLexicalIndex:
+    def test_rare_exact_term_ranks_first(self):
+        index = LexicalIndex()
+        index.add([
+            _meta("a", "Amiodarona 200 mg na fibrilação atrial"),
+            _meta("b", "Fibrilação atrial e anticoagulação"),
+            _meta("c", "Fibrilação atrial paroxística"),
+        ])
+        hits = index.search("amiodarona fibrilação", top_k=3)
+        assert hits[0][0] == "a"
+        assert hits[0][2] == pytest.approx(1.0)
+
+    def test_coverage_threshold_and_removal(self):
+        index = LexicalIndex()
+        index.add([_meta("a", "losartana hipertensão"), _meta("b", "metformina diabetes")])
+        assert [h[0] for h in index.search("losartana diabetes", top_k=5, min_coverage=0.9)] == []
+        index.remove([_meta("a", "losartana hipertensão")])
+        assert index.search("losartana", top_k=5) == []
+        assert len(index) == 1
+
+    def test_unknown_query_terms_count_toward_coverage(self):
+        index = LexicalIndex()
+        index.add([_meta("a", "Amiodarona 200 mg"), _meta("b", "Losartana 50 mg")])
+        assert index.search("amiodarona", top_k=5)[0][2] == pytest.approx(1.0)
+        # No chunk mentions "intoxicacao": it still weighs in the coverage
+        assert index.search("amiodarona intoxicação", top_k=5, min_coverage=0.0)[0][2] < 0.5
+        assert index.search("amiodarona intoxicação", top_k=5) == []
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=0)
+        assert max(fused, key=fused.get) == "b"
+
+
+class TestHybridSearch:
+    def _index(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([
+            {"_id": "a", "content_id": "c1", "title": "T", "text": "Amiodarona 200 mg ao dia", "embedding": [1.0, 0.0, 0.0]},
+            {"_id": "b", "content_id": "c1", "title": "T", "text": "Insuficiência cardíaca", "embedding": [0.0, 1.0, 0.0]},
+            {"_id": "c", "content_id": "c2", "title": "T", "text": "Hipertensão CID I10.9", "embedding": [0.0, 0.0, 1.0]},
+        ])
+        return index
+
+    def test_exact_term_found_beside_vector_hits(self):
+        results = self._index().hybrid_search("CID I10.9", [0.0, 1.0, 0.0], top_k=5, min_similarity=0.45)
+        assert {c["chunk_id"] for c, _ in results} == {"b", "c"}
+
+    def test_lexical_only_without_embedding(self):
+        index = self._index()
+        assert [c["chunk_id"] for c, _ in index.hybrid_search("amiodarona 200 mg", None)] == ["a"]
+        index.remove_content("c2")
+        assert index.hybrid_search("I10.9", None) == []
+
+    def test_lexical_only_hit_needs_stricter_coverage(self, monkeypatch):
+        import vector_index
+        index = self._index()
+        index.add_chunks([
+            {"_id": "d", "content_id": "c3", "title": "T", "text": "Amiodarona e tireoide", "embedding": [0.0, 1.0, 0.0]},
+        ])
+        # "a" and "d" each cover ~60% of the query: "d" also matches the vector, "a" does not
+        results = index.hybrid_search("amiodarona tireoide 200", [0.0, 1.0, 0.0], top_k=5, min_similarity=0.45)
+        assert {c["chunk_id"] for c, _ in results} == {"b", "d"}
+        assert index.hybrid_search("amiodarona tireoide 200", None) == []
+        monkeypatch.setattr(vector_index, "LEXICAL_ONLY_MIN_COVERAGE", 0.6)
+        assert {c["chunk_id"] for c, _ in index.hybrid_search("amiodarona tireoide 200", None)} == {"a", "d"}
+
+    def test_relevance_is_the_scaled_fused_score(self):
+        results = self._index().hybrid_search("amiodarona", [1.0, 0.0, 0.0], top_k=5, min_similarity=0.45)
+        # First in both rankings
+        assert results == [(results[0][0], pytest.approx(1.0))]
+
+
+@pytest.mark.asyncio
+class TestHybridShardMerge:
+    async def test_lexical_only_hit_does_not_outrank_a_fused_hit(self):
+        strong, lexical = MentorVectorIndex("m1"), MentorVectorIndex("m2")
+        strong.add_chunks([
+            {"_id": "a", "content_id": "c1", "title": "T", "text": "Amiodarona na fibrilação", "embedding": [0.8, 0.6]},
+        ])
+        # Covers every query term, but its embedding points elsewhere
+        lexical.add_chunks([
+            {"_id": "b", "content_id": "c2", "title": "T", "text": "Amiodarona", "embedding": [0.0, 1.0]},
+        ])
+        hits = (await VectorIndexService().search_shards(
+            [lexical, strong], [[1.0, 0.0]], top_k=2, min_similarity=0.45, query_texts=["amiodarona"]
+        ))[0]
+        assert [(m, c["chunk_id"]) for _, m, c in hits] == [("m1", "a"), ("m2", "b")]
+        assert hits[0][0] > hits[1][0]
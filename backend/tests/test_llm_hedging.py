@@ -0,0 +1,82 @@
+"""Tests for hedged requests across AI providers."""
+import asyncio
+import pytest
+from llm_hedging import LatencyTracker, call_with_timeout, first_valid
+
+
+def _provider(answer, delay, log, name):
+    async def call():
+        log.append(f"start:{name}")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(f"cancel:{name}")
+            raise
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    return call
+
+
+class TestLatencyTracker:
+    def test_percentile_and_default_delay(self):
+        tracker = LatencyTracker(window=100)
+        assert tracker.percentile(95) is None
+        for i in range(1, 101):
+            tracker.record(i / 100)
+        assert tracker.percentile(50) == pytest.approx(0.5, abs=0.02)
+        assert tracker.hedge_delay(95) == pytest.approx(0.95, abs=0.02)
+
+
+@pytest.mark.asyncio
+class TestFirstValid:
+    async def test_fast_primary_never_starts_secondary(self):
+        log = []
+        result = await first_valid(
+            [("openai", _provider("a", 0.01, log, "openai")), ("claude", _provider("b", 0.01, log, "claude"))],
+            hedge_delay=0.5,
+        )
+        assert result == ("a", "openai")
+        assert log == ["start:openai"]
+
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        log = []
+        result = await first_valid(
+            [("openai", _provider("a", 1.0, log, "openai")), ("claude", _provider("b", 0.01, log, "claude"))],
+            hedge_delay=0.05,
+        )
+        await asyncio.sleep(0)
+        assert result == ("b", "claude")
+        assert "cancel:openai" in log
+
+    async def test_failure_starts_secondary_immediately(self):
+        log = []
+        result = await first_valid(
+            [("openai", _provider(RuntimeError("down"), 0, log, "openai")), ("claude", _provider("b", 0, log, "claude"))],
+            hedge_delay=10,
+        )
+        assert result == ("b", "claude")
+
+    async def test_all_failures(self):
+        log = []
+        result = await first_valid(
+            [("openai", _provider("", 0, log, "openai")), ("claude", _provider(RuntimeError("x"), 0, log, "claude"))],
+            hedge_delay=0,
+        )
+        assert result == (None, None)
+
+    async def test_timed_out_and_cancelled_calls_record_a_lower_bound(self):
+        tracker = LatencyTracker()
+        with pytest.raises(asyncio.TimeoutError):
+            await call_with_timeout("openai", _provider("a", 1.0, [], "openai"), 0.05, tracker)
+        assert await call_with_timeout("openai", _provider("a", 0, [], "openai"), 1, tracker) == "a"
+
+        # The slow primary loses the hedge: its elapsed time is still recorded
+        result = await first_valid([
+            ("openai", lambda: call_with_timeout("openai", _provider("a", 1.0, [], "openai"), 5, tracker)),
+            ("claude", _provider("b", 0.01, [], "claude")),
+        ], hedge_delay=0.05)
+        await asyncio.sleep(0.01)
+        assert result == ("b", "claude")
+        assert len(tracker) == 3
+        assert tracker.percentile(0) < 0.05 <= tracker.percentile(50)
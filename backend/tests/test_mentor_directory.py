@@ -0,0 +1,29 @@
+"""Tests for the cached mentor directory."""
+import pytest
+from mentor_directory import MentorDirectory
+from dependencies import db
+
+
+@pytest.mark.asyncio
+class TestMentorDirectory:
+    async def test_batched_lookup_and_cache(self, setup_test_db):
+        await db.mentors.insert_many([
+            {"_id": "d1", "full_name": "Dr. Um", "specialty": "Cardiologia"},
+            {"_id": "d2", "full_name": "Dr. Dois", "specialty": "Neurologia"},
+        ])
+        directory = MentorDirectory()
+        found = await directory.get_many(db, ["d1", "d2", "missing", "d1"])
+        assert {k: v["full_name"] for k, v in found.items()} == {"d1": "Dr. Um", "d2": "Dr. Dois"}
+
+        # Served from the cache until invalidated
+        await db.mentors.update_one({"_id": "d1"}, {"$set": {"full_name": "Dr. Renomeado"}})
+        assert (await directory.get(db, "d1"))["full_name"] == "Dr. Um"
+        directory.invalidate("d1")
+        assert (await directory.get(db, "d1"))["full_name"] == "Dr. Renomeado"
+
+    async def test_entries_expire(self, setup_test_db):
+        await db.mentors.insert_one({"_id": "d3", "full_name": "Dr. Tres", "specialty": "Pediatria"})
+        directory = MentorDirectory(ttl=0)
+        assert (await directory.get(db, "d3"))["specialty"] == "Pediatria"
+        await db.mentors.delete_one({"_id": "d3"})
+        assert await directory.get(db, "d3") is None
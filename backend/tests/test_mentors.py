@@ -197,6 +197,54 @@ class TestContentManagement:
         assert data["deleted_contents"] == 2
         assert data["deleted_chunks"] == 2
 
+    async def test_upload_is_queued_for_background_ingestion(self, async_client: AsyncClient, registered_mentor):
+        resp = await async_client.post(
+            "/api/mentor/content/upload",
+            headers=auth_header(registered_mentor["token"]),
+            files={"file": ("aula.pdf", b"%PDF-1.4 conteudo", "application/pdf")},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["status"] == "PROCESSING"
+        job = await db.ingestion_jobs.find_one({"_id": data["content_id"]})
+        assert job["status"] == "QUEUED"
+        assert job["file_type"] == "PDF"
+        details = await async_client.get(f"/api/mentor/content/{data['content_id']}", headers=auth_header(registered_mentor["token"]))
+        assert details.json()["stage"] == "QUEUED"
+        assert details.json()["chunks_done"] == 0
+
+    async def test_upload_is_streamed_to_gridfs_and_removed_on_delete(self, async_client: AsyncClient, registered_mentor):
+        from dependencies import get_fs_bucket
+        payload = b"%PDF-1.4 " + b"x" * (3 * 1024 * 1024)
+        resp = await async_client.post(
+            "/api/mentor/content/upload",
+            headers=auth_header(registered_mentor["token"]),
+            files={"file": ("grande.pdf", payload, "application/pdf")},
+        )
+        content_id = resp.json()["content_id"]
+        job = await db.ingestion_jobs.find_one({"_id": content_id})
+        grid_out = await get_fs_bucket().open_download_stream(job["file_id"])
+        assert await grid_out.read() == payload
+
+        resp = await async_client.delete(f"/api/mentor/content/{content_id}", headers=auth_header(registered_mentor["token"]))
+        assert resp.status_code == 200
+        assert await db["fs.files"].count_documents({"_id": job["file_id"]}) == 0
+
+    async def test_stored_upload_is_removed_when_enqueue_fails(self, async_client: AsyncClient, registered_mentor, monkeypatch):
+        from routers import mentors as mentors_router
+
+        async def failing_enqueue(*args, **kwargs):
+            raise RuntimeError("fila indisponivel")
+
+        monkeypatch.setattr(mentors_router.ingestion_service, "enqueue", failing_enqueue)
+        resp = await async_client.post(
+            "/api/mentor/content/upload",
+            headers=auth_header(registered_mentor["token"]),
+            files={"file": ("aula.pdf", b"%PDF-1.4 conteudo", "application/pdf")},
+        )
+        assert resp.status_code == 500
+        assert await db["fs.files"].count_documents({}) == 0
+
     async def test_user_cannot_bulk_delete(self, async_client: AsyncClient, registered_user):
         resp = await async_client.post(
             "/api/mentor/content/bulk-delete",
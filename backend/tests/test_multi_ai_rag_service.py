@@ -0,0 +1,171 @@
+"""Tests for batched embedding and chunk storage during ingestion."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import tiktoken
+from pymongo.errors import BulkWriteError
+import multi_ai_rag_service
+from embedding_cache import EmbeddingCache
+from multi_ai_rag_service import MultiAIRAGService
+
+# Byte-level encoding: one token per byte, no BPE file download
+ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+
+class _FakeEmbeddings:
+    """OpenAI embeddings endpoint returning items out of order, vector = [len(text)]"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, model, input):
+        self.requests.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+class _FakeVectorIndex:
+    def __init__(self):
+        self.added = []
+
+    async def on_chunks_added(self, db, mentor_id, docs):
+        self.added.extend(docs)
+
+
+class _FakeChunks:
+    """content_chunks where inserting a chunk with fail_text fails (unordered bulk write)"""
+
+    def __init__(self, fail_text=None):
+        self.docs = []
+        self.fail_text = fail_text
+
+    async def insert_many(self, docs, ordered=True):
+        failed = [i for i, d in enumerate(docs) if d["text"] == self.fail_text]
+        self.docs.extend(d for i, d in enumerate(docs) if i not in failed)
+        if failed:
+            raise BulkWriteError({"writeErrors": [{"index": i, "code": 11000, "errmsg": "duplicate"} for i in failed]})
+
+    async def delete_many(self, query):
+        self.docs = [d for d in self.docs if d["content_id"] != query["content_id"]]
+
+
+def _service():
+    service = MultiAIRAGService()
+    service.openai_client = SimpleNamespace(embeddings=_FakeEmbeddings())
+    service.embedding_cache = EmbeddingCache(persist=False)
+    service.vector_index = _FakeVectorIndex()
+    return service
+
+
+class TestBatchByTokens:
+    def test_batches_respect_token_budget_and_input_count(self, monkeypatch):
+        monkeypatch.setattr(multi_ai_rag_service, "encoding", ENCODING)
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_BATCH_TOKENS", 10)
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_BATCH_MAX_INPUTS", 3)
+        texts = ["aaaa", "bbbb", "cccc", "x" * 20, "d", "e", "f", "g"]
+        # A text over the whole budget still gets a batch of its own
+        assert _service().batch_by_tokens(texts) == [[0, 1], [2], [3], [4, 5, 6], [7]]
+
+    def test_every_text_is_batched_once_in_order(self, monkeypatch):
+        monkeypatch.setattr(multi_ai_rag_service, "encoding", ENCODING)
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_BATCH_TOKENS", 7)
+        texts = ["a" * n for n in (1, 6, 3, 9, 2, 2, 5, 1)]
+        batches = _service().batch_by_tokens(texts)
+        assert [i for batch in batches for i in batch] == list(range(len(texts)))
+        assert all(len(b) == 1 or sum(len(texts[i]) for i in b) <= 7 for b in batches)
+
+
+@pytest.mark.asyncio
+class TestGenerateEmbeddings:
+    async def test_order_is_preserved_and_duplicates_sent_once(self):
+        service = _service()
+        texts = ["bb", "a", "cccc", "a"]
+        assert await service.generate_embeddings(texts) == [[2.0], [1.0], [4.0], [1.0]]
+        assert service.openai_client.embeddings.requests == [["bb", "a", "cccc"]]
+
+        # Cached texts are not sent again
+        assert await service.generate_embeddings(["cccc", "ddd"]) == [[4.0], [3.0]]
+        assert service.openai_client.embeddings.requests[-1] == ["ddd"]
+
+
+@pytest.mark.asyncio
+class TestProcessContentStream:
+    async def _process(self, service, db, chunks, monkeypatch):
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_BATCH_TOKENS", 10)
+
+        async def windows(text_stream):
+            for text in chunks:
+                yield text, len(text)
+
+        async def no_text():
+            yield ""
+
+        monkeypatch.setattr(service, "_iter_chunk_windows", windows)
+        return await service.process_content_stream(no_text(), "m1", "c1", "Aula", db=db)
+
+    async def test_chunk_order_survives_concurrent_batches(self, monkeypatch):
+        service = _service()
+        real_generate = service.generate_embeddings
+
+        async def slow_first_batch(texts):
+            if texts[0] == "aaaaa":
+                await asyncio.sleep(0.05)
+            return await real_generate(texts)
+
+        monkeypatch.setattr(service, "generate_embeddings", slow_first_batch)
+        db = SimpleNamespace(content_chunks=_FakeChunks())
+        chunks = ["aaaaa", "bbbbb", "cccccc", "ddd", "eeeeeeee"]
+        assert await self._process(service, db, chunks, monkeypatch) == 5
+
+        stored = sorted(db.content_chunks.docs, key=lambda d: d["chunk_index"])
+        assert [d["text"] for d in stored] == chunks
+        assert len(service.openai_client.embeddings.requests) == 3
+
+    async def test_partial_bulk_write_failure_keeps_the_rest(self, monkeypatch):
+        service = _service()
+        db = SimpleNamespace(content_chunks=_FakeChunks(fail_text="bbb"))
+        assert await self._process(service, db, ["aaa", "bbb", "ccc", "dddddddd"], monkeypatch) == 3
+
+        assert sorted(d["text"] for d in db.content_chunks.docs) == ["aaa", "ccc", "dddddddd"]
+        # Only stored chunks reach the vector index
+        assert sorted(d["text"] for d in service.vector_index.added) == ["aaa", "ccc", "dddddddd"]
+
+    async def test_failed_batch_is_retried(self, monkeypatch):
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_RETRY_BASE_SECONDS", 0)
+        service = _service()
+        real_create = service.openai_client.embeddings.create
+        failures = [RuntimeError("rate limit")] * 2
+
+        async def flaky_create(model, input):
+            if failures:
+                raise failures.pop()
+            return await real_create(model, input)
+
+        monkeypatch.setattr(service.openai_client.embeddings, "create", flaky_create)
+        db = SimpleNamespace(content_chunks=_FakeChunks())
+        assert await self._process(service, db, ["aaa", "bbb"], monkeypatch) == 2
+
+    async def test_batch_failing_every_retry_fails_the_stream(self, monkeypatch):
+        from exceptions import EmbeddingGenerationError
+        monkeypatch.setattr(multi_ai_rag_service, "EMBEDDING_RETRY_BASE_SECONDS", 0)
+        service = _service()
+        real_create = service.openai_client.embeddings.create
+
+        async def failing_on_ccc(model, input):
+            if "cccccccc" in input:
+                raise RuntimeError("service unavailable")
+            return await real_create(model, input)
+
+        monkeypatch.setattr(service.openai_client.embeddings, "create", failing_on_ccc)
+        db = SimpleNamespace(content_chunks=_FakeChunks())
+        with pytest.raises(EmbeddingGenerationError):
+            await self._process(service, db, ["aaa", "bbb", "cccccccc"], monkeypatch)
+        # Chunks stored by the batches that succeeded are removed, nothing reaches the index
+        assert db.content_chunks.docs == []
+        assert service.vector_index.added == []
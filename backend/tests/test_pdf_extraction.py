@@ -0,0 +1,74 @@
+"""Tests for page-parallel PDF extraction."""
+import pytest
+import pdf_extraction
+from exceptions import ContentProcessingError
+from pdf_extraction import stream_pdf_pages
+
+
+def make_pdf(page_texts):
+    """Minimal multi-page PDF with one line of Helvetica text per page"""
+    n = len(page_texts)
+    font_id = 3 + 2 * n
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+    ]
+    for i, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * i, font_id)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.mark.asyncio
+class TestStreamPdfPages:
+    async def test_pages_arrive_in_order_across_ranges(self, tmp_path):
+        pdf = tmp_path / "aula.pdf"
+        pdf.write_bytes(make_pdf([f"Pagina {i}" for i in range(7)]))
+        stats = {}
+        pages = [text async for text in stream_pdf_pages(str(pdf), stats, pages_per_task=3)]
+        assert [p.strip() for p in pages] == [f"Pagina {i}" for i in range(7)]
+        assert stats["pages"] == 7
+        assert len(stats["page_seconds"]) == 7
+        assert 1 <= stats["slowest_page"] <= 7
+
+    async def test_ranges_in_flight_are_capped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pdf_extraction, "PDF_MAX_RANGES_IN_FLIGHT", 2)
+        executor = pdf_extraction.get_pdf_executor()
+        submitted = []
+
+        class _RecordingExecutor:
+            def submit(self, fn, *args):
+                if fn is pdf_extraction._extract_page_range:
+                    submitted.append(args[1])
+                return executor.submit(fn, *args)
+
+        monkeypatch.setattr(pdf_extraction, "get_pdf_executor", _RecordingExecutor)
+        pdf = tmp_path / "livro.pdf"
+        pdf.write_bytes(make_pdf([f"Pagina {i}" for i in range(10)]))
+        pages = stream_pdf_pages(str(pdf), pages_per_task=2)
+        assert (await pages.__anext__()).strip() == "Pagina 0"
+        # The third range is submitted only once the first one is done
+        assert submitted == [0, 2, 4]
+        await pages.aclose()
+
+    async def test_invalid_pdf(self, tmp_path):
+        pdf = tmp_path / "invalido.pdf"
+        pdf.write_bytes(b"nao e um pdf")
+        with pytest.raises(ContentProcessingError):
+            async for _ in stream_pdf_pages(str(pdf)):
+                pass
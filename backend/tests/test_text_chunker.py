@@ -0,0 +1,60 @@
+"""Tests for the incremental streaming chunker."""
+import pytest
+import tiktoken
+from text_chunker import StreamingChunker, iter_chunks
+
+# Byte-level encoding: same interface as cl100k_base, no BPE file download
+ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+TEXT = "".join(
+    f"Paciente {i} com fibrilação atrial recebeu amiodarona na dose habitual. " for i in range(400)
+)
+
+
+def whole_document_chunks(text, chunk_size, overlap):
+    tokens = ENCODING.encode(text)
+    return [ENCODING.decode(tokens[s:s + chunk_size]) for s in range(0, len(tokens), chunk_size - overlap)]
+
+
+class TestStreamingChunker:
+    def test_token_mode_matches_whole_document_windows(self):
+        pieces = [TEXT[i:i + 1000] for i in range(0, len(TEXT), 1000)]
+        chunks = list(iter_chunks(ENCODING, pieces, 200, 20, respect_sentences=False))
+        assert chunks == whole_document_chunks(TEXT, 200, 20)
+
+    def test_token_mode_omits_trailing_window_made_only_of_overlap(self):
+        # 380 tokens: the whole-document windows end with tokens 360-380, all already in the second chunk
+        text = "x" * 380
+        old = whole_document_chunks(text, 200, 20)
+        assert len(old) == 3 and old[2] in old[1]
+        assert list(iter_chunks(ENCODING, [text], 200, 20, respect_sentences=False)) == old[:2]
+        # One token past the overlap is new text and still gets its own shorter chunk
+        text = "x" * 381
+        assert list(iter_chunks(ENCODING, [text], 200, 20, respect_sentences=False)) == \
+            whole_document_chunks(text, 200, 20)
+
+    def test_sentence_mode_ends_on_sentences_within_budget(self):
+        chunks = list(iter_chunks(ENCODING, [TEXT], 200, 20))
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.endswith(".")
+            assert len(ENCODING.encode_ordinary(chunk)) <= 200
+        assert "Paciente 399 " in chunks[-1]
+
+    def test_long_sentence_is_split_on_words(self):
+        sentence = " ".join(["cardiomiopatia"] * 200) + "."
+        chunks = list(iter_chunks(ENCODING, [sentence], 100, 10))
+        assert all(len(ENCODING.encode_ordinary(c)) <= 100 for c in chunks)
+        assert chunks[-1].endswith("cardiomiopatia.")
+
+    def test_empty_input_yields_nothing(self):
+        assert list(iter_chunks(ENCODING, ["", "   "], 100, 10)) == []
+
+    def test_overlap_must_be_smaller_than_chunk_size(self):
+        with pytest.raises(ValueError):
+            StreamingChunker(ENCODING, chunk_size=50, overlap=50)
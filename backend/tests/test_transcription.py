@@ -0,0 +1,66 @@
+"""Tests for long-media segmentation and transcript stitching."""
+import io
+import wave
+import pytest
+from types import SimpleNamespace
+from transcription_service import (
+    merge_overlapping_text, mp3_frames, split_mp3, split_wav, stitch_windows,
+)
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz, no padding: 417-byte frames of 1152 samples
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def _wav(seconds, rate=8000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x01\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+class TestSegmentation:
+    def test_mp3_frames_skip_id3_tag(self):
+        tag = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"\x00" * 5
+        frames = mp3_frames(tag + MP3_FRAME * 3)
+        assert [f[0] for f in frames] == [15, 432, 849]
+        assert frames[0][1] == 417
+
+    def test_mp3_windows_overlap_and_cover_everything(self):
+        data = MP3_FRAME * 1000  # ~26s
+        windows = split_mp3(data, window_seconds=10, overlap_seconds=2, max_bytes=10 ** 9)
+        assert len(windows) > 2
+        assert windows[0][0] == 0
+        for (s1, e1, _, _), (s2, _, _, _) in zip(windows, windows[1:]):
+            assert 0 < e1 - s2 <= 2 + MP3_FRAME_SECONDS
+        assert windows[-1][1] == pytest.approx(1000 * MP3_FRAME_SECONDS)
+        assert all(len(w[2]) % 417 == 0 for w in windows)
+
+    def test_mp3_windows_respect_byte_budget(self):
+        windows = split_mp3(MP3_FRAME * 100, window_seconds=600, overlap_seconds=0, max_bytes=417 * 30)
+        assert all(len(w[2]) <= 417 * 30 for w in windows)
+        assert sum(len(w[2]) for w in windows) == 417 * 100
+
+    def test_wav_windows_are_valid_wav(self):
+        windows = split_wav(_wav(25), window_seconds=10, overlap_seconds=2, max_bytes=10 ** 9)
+        assert [(s, e) for s, e, _, _ in windows] == [(0, 10), (8, 18), (16, 25)]
+        with wave.open(io.BytesIO(windows[1][2])) as w:
+            assert w.getnframes() == 10 * 8000
+
+
+class TestStitching:
+    def test_segments_split_at_overlap_midpoint(self):
+        windows = [(0.0, 10.0, b"", "a"), (8.0, 18.0, b"", "b")]
+        seg = lambda start, end, text: SimpleNamespace(start=start, end=end, text=text)
+        results = [
+            SimpleNamespace(segments=[seg(0, 5, "um"), seg(5, 8.5, "dois"), seg(8.5, 10, "tres")]),
+            SimpleNamespace(segments=[seg(0, 0.5, "dois"), seg(0.5, 2, "tres"), seg(2, 10, "quatro")]),
+        ]
+        assert stitch_windows(windows, results) == "um dois tres quatro"
+
+    def test_text_overlap_is_trimmed(self):
+        merged = merge_overlapping_text("a dose inicial de amiodarona e alta", "de amiodarona e alta, depois reduz")
+        assert merged == "a dose inicial de amiodarona e alta depois reduz"
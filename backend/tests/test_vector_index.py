@@ -0,0 +1,262 @@
+"""Tests for the resident per-mentor vector index."""
+import asyncio
+
+import numpy as np
+import pytest
+import ann_index
+from ann_index import ExactSearch, IVFSearch, QuantizedSearch, cosine_top_k
+import vector_index
+from embedding_codec import pack_embedding
+from vector_index import MentorVectorIndex, VectorIndexService
+from dependencies import db
+
+
+def _chunk(chunk_id, content_id, embedding, text="texto"):
+    return {"_id": chunk_id, "content_id": content_id, "title": "Artigo", "text": text, "embedding": embedding}
+
+
+class TestMentorVectorIndex:
+    def test_search_returns_best_match_first(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([
+            _chunk("a", "c1", [1.0, 0.0, 0.0]),
+            _chunk("b", "c1", [0.0, 1.0, 0.0]),
+            _chunk("c", "c2", [0.9, 0.1, 0.0]),
+        ])
+        results = index.search([2.0, 0.0, 0.0], top_k=2, min_similarity=0.0)
+        assert [c["chunk_id"] for c, _ in results] == ["a", "c"]
+        assert results[0][1] == pytest.approx(1.0)
+
+    def test_min_similarity_filters(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk("a", "c1", [1.0, 0.0]), _chunk("b", "c1", [0.0, 1.0])])
+        results = index.search([1.0, 0.0], top_k=5, min_similarity=0.5)
+        assert len(results) == 1
+
+    def test_duplicate_and_mismatched_chunks_are_skipped(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk("a", "c1", [1.0, 0.0])])
+        added = index.add_chunks([_chunk("a", "c1", [1.0, 0.0]), _chunk("b", "c1", [1.0, 0.0, 0.0])])
+        assert added == 0
+        assert len(index) == 1
+
+    def test_packed_and_array_embeddings_mix(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk("a", "c1", pack_embedding([1.0, 0.0])), _chunk("b", "c1", [0.0, 1.0])])
+        assert index.matrix.dtype == np.float32
+        results = index.search([1.0, 0.1], top_k=1, min_similarity=0.0)
+        assert results[0][0]["chunk_id"] == "a"
+
+    def test_remove_content(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk("a", "c1", [1.0, 0.0]), _chunk("b", "c2", [0.0, 1.0])])
+        assert index.remove_content("c1") == 1
+        assert len(index) == 1
+        assert index.matrix.shape == (1, 2)
+        assert index.search([1.0, 0.0], min_similarity=0.5) == []
+
+
+class TestExactKernel:
+    def test_search_many_matches_single_queries(self):
+        rng = np.random.default_rng(2)
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk(str(i), "c1", v.tolist()) for i, v in enumerate(rng.standard_normal((300, 16)))])
+        queries = rng.standard_normal((4, 16)).tolist() + [[0.0] * 16]
+        batched = index.search_many(queries, top_k=7, min_similarity=0.0)
+        for query, results in zip(queries, batched[:4]):
+            single = index.search(query, top_k=7, min_similarity=0.0)
+            assert [c["chunk_id"] for c, _ in results] == [c["chunk_id"] for c, _ in single]
+            assert [s for _, s in results] == pytest.approx([s for _, s in single], abs=1e-5)
+        assert batched[4] == []
+
+    def test_top_k_larger_than_index(self):
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk("a", "c1", [1.0, 0.0]), _chunk("b", "c1", [0.6, 0.8])])
+        results = index.search_many([[1.0, 0.0], [0.0, 1.0]], top_k=10, min_similarity=0.0)
+        assert [[c["chunk_id"] for c, _ in r] for r in results] == [["a", "b"], ["b", "a"]]
+
+    def test_cosine_top_k_on_unnormalized_vectors(self):
+        docs = [[3.0, 0.0], [1.0, 1.0], [0.0, 0.0]]
+        top, scores = cosine_top_k([2.0, 0.0], docs, 2)
+        assert top.tolist() == [0, 1]
+        assert scores == pytest.approx([1.0, 2 ** -0.5])
+
+
+class TestIVFSearch:
+    def _corpus(self, rows=2000, dim=32, topics=20):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((topics, dim)).astype(np.float32)
+        docs = centers[rng.integers(0, topics, rows)] + 0.3 * rng.standard_normal((rows, dim)).astype(np.float32)
+        docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+        return docs
+
+    def test_ivf_matches_exact_on_clustered_data(self):
+        docs = self._corpus()
+        ivf = IVFSearch.train(docs, n_lists=20)
+        ivf.n_probe = 4
+        exact = ExactSearch()
+        for q in docs[:20]:
+            assert set(ivf.search(docs, q, 5)[0]) == set(exact.search(docs, q, 5)[0])
+
+    def test_index_uses_attached_ivf_and_keeps_appended_rows(self):
+        docs = self._corpus(rows=500)
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk(str(i), "c1", v.tolist()) for i, v in enumerate(docs[:400])])
+        assert index.attach_ann(IVFSearch.train(index.matrix, n_lists=10), index.generation)
+        assert index.backend == "ivf"
+        index.add_chunks([_chunk(str(i), "c2", v.tolist()) for i, v in enumerate(docs[400:], start=400)])
+        best, score = index.search(docs[450].tolist(), top_k=1, min_similarity=0.0)[0]
+        assert best["chunk_id"] == "450"
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+    def test_removal_discards_ivf(self):
+        docs = self._corpus(rows=200)
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk(str(i), "c1" if i < 100 else "c2", v.tolist()) for i, v in enumerate(docs)])
+        generation = index.generation
+        ann = IVFSearch.train(index.matrix, n_lists=5)
+        index.remove_content("c1")
+        assert not index.attach_ann(ann, generation)
+        assert index.backend == "exact"
+
+
+class TestQuantizedSearch:
+    def _corpus(self, rows=3000, dim=64):
+        rng = np.random.default_rng(1)
+        docs = rng.standard_normal((rows, dim)).astype(np.float32)
+        return docs / np.linalg.norm(docs, axis=1, keepdims=True)
+
+    @pytest.mark.parametrize("mode", ["int8", "binary"])
+    def test_rerank_returns_exact_scores(self, mode):
+        docs = self._corpus()
+        quantized = QuantizedSearch(docs, mode, rerank_factor=50)
+        exact = ExactSearch()
+        for q in docs[:10]:
+            rows, scores = quantized.search(docs, q, 5)
+            assert rows[0] == exact.search(docs, q, 1)[0][0]
+            assert scores == pytest.approx(docs[rows] @ q)
+
+    def test_appended_rows_are_encoded(self):
+        docs = self._corpus(rows=600)
+        quantized = QuantizedSearch(docs[:500], "binary")
+        quantized.add_rows(docs, 500)
+        assert quantized.n_rows == 600
+        assert quantized.search(docs, docs[550], 1)[0][0] == 550
+
+    def test_index_switches_to_quantized_backend(self, monkeypatch):
+        monkeypatch.setattr(ann_index, "VECTOR_QUANTIZATION", "int8")
+        monkeypatch.setattr(ann_index, "QUANT_MIN_ROWS", 100)
+        docs = self._corpus(rows=150)
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk(str(i), "c1" if i < 80 else "c2", v.tolist()) for i, v in enumerate(docs)])
+        assert index.backend == "int8+rerank"
+        assert index.search(docs[120].tolist(), top_k=1, min_similarity=0.0)[0][0]["chunk_id"] == "120"
+        index.remove_content("c2")
+        assert index.backend == "exact"
+
+
+class TestVectorIndexService:
+    async def test_incremental_updates_follow_content_version(self, setup_test_db):
+        await db.mentors.insert_one({"_id": "m1", "full_name": "Dr. Index"})
+        await db.content_chunks.insert_one(_chunk("a", "c1", [1.0, 0.0]) | {"mentor_id": "m1"})
+        service = VectorIndexService()
+
+        index = await service.get_index(db, "m1", 0)
+        assert len(index) == 1
+
+        new_chunk = _chunk("b", "c2", [0.0, 1.0]) | {"mentor_id": "m1"}
+        await db.content_chunks.insert_one(new_chunk)
+        await service.on_chunks_added(db, "m1", [new_chunk])
+        mentor = await db.mentors.find_one({"_id": "m1"})
+        assert mentor["content_version"] == 1
+        index = await service.get_index(db, "m1", mentor["content_version"])
+        assert len(index) == 2
+
+        await db.content_chunks.delete_many({"content_id": "c1"})
+        await service.on_content_removed(db, "m1", "c1")
+        index = await service.get_index(db, "m1", 2)
+        assert [c["chunk_id"] for c in index.chunks] == ["b"]
+
+    async def test_stale_index_is_rebuilt(self, setup_test_db):
+        await db.mentors.insert_one({"_id": "m2", "full_name": "Dr. Index", "content_version": 0})
+        service = VectorIndexService()
+        index = await service.get_index(db, "m2", 0)
+        assert len(index) == 0
+        # Another worker added chunks and bumped the version
+        await db.content_chunks.insert_one(_chunk("x", "c1", [1.0, 0.0]) | {"mentor_id": "m2"})
+        index = await service.get_index(db, "m2", 1)
+        assert len(index) == 1
+
+    async def test_all_indexes_load_with_bounded_concurrency(self, setup_test_db, monkeypatch):
+        await db.mentors.insert_many([{"_id": f"w{i}", "content_version": i} for i in range(6)])
+        monkeypatch.setattr(vector_index, "VECTOR_INDEX_LOAD_CONCURRENCY", 2)
+        service = VectorIndexService()
+        running, peak = [0], [0]
+
+        async def slow_get_index(db, mentor_id, version=0):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            return MentorVectorIndex(mentor_id, version)
+
+        monkeypatch.setattr(service, "get_index", slow_get_index)
+        indexes = await service.get_all_indexes(db)
+        assert sorted((i.mentor_id, i.version) for i in indexes) == [(f"w{i}", i) for i in range(6)]
+        assert peak[0] == 2
+
+    async def test_ann_build_task_is_referenced_until_done(self, monkeypatch):
+        monkeypatch.setattr(vector_index, "wants_ivf", lambda n_rows: True)
+        trained = IVFSearch.train(np.eye(4, dtype=np.float32), n_lists=2)
+        monkeypatch.setattr(vector_index.IVFSearch, "train", staticmethod(lambda matrix: trained))
+        service = VectorIndexService()
+        index = MentorVectorIndex("m1")
+        index.add_chunks([_chunk(str(i), "c1", row.tolist()) for i, row in enumerate(np.eye(4))])
+        service._maybe_build_ann(index)
+        assert len(service._builds) == 1
+        await asyncio.gather(*service._builds)
+        assert not service._builds
+        assert index.backend == "ivf"
+
+    async def test_parallel_shard_search_matches_inline(self, monkeypatch):
+        rng = np.random.default_rng(3)
+        service = VectorIndexService()
+        indexes = []
+        for m in range(6):
+            index = MentorVectorIndex(f"s{m}")
+            index.add_chunks([_chunk(f"{m}-{i}", "c1", v.tolist()) for i, v in enumerate(rng.standard_normal((40 * (m + 1), 8)))])
+            indexes.append(index)
+        queries = rng.standard_normal((3, 8)).tolist()
+        inline = await service.search_shards(indexes, queries, top_k=4, min_similarity=0.0)
+
+        monkeypatch.setattr(vector_index, "VECTOR_SEARCH_PARALLEL_MIN_ROWS", 0)
+        monkeypatch.setattr(vector_index, "VECTOR_SEARCH_WORKERS", 3)
+        parallel = await service.search_shards(indexes, queries, top_k=4, min_similarity=0.0)
+        assert [[(m, c["chunk_id"]) for _, m, c in hits] for hits in parallel] == \
+            [[(m, c["chunk_id"]) for _, m, c in hits] for hits in inline]
+        assert all(len(hits) == 4 for hits in parallel)
+
+
+class TestRetrieveMany:
+    async def test_per_question_results_across_mentors(self, setup_test_db):
+        from multi_ai_rag_service import MultiAIRAGService
+        await db.mentors.insert_many([{"_id": "r1", "full_name": "Dr. A"}, {"_id": "r2", "full_name": "Dr. B"}])
+        await db.content_chunks.insert_many([
+            _chunk("a", "c1", [1.0, 0.0, 0.0]) | {"mentor_id": "r1"},
+            _chunk("b", "c2", [0.0, 1.0, 0.0]) | {"mentor_id": "r2"},
+            _chunk("c", "c2", [0.7, 0.7, 0.0]) | {"mentor_id": "r2"},
+        ])
+        service = MultiAIRAGService()
+        results = await service.retrieve_many(
+            db, ["fibrilacao", "arritmia", "nada"], top_k=2, min_similarity=0.5,
+            query_embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+        )
+        assert [r["question"] for r in results] == ["fibrilacao", "arritmia", "nada"]
+        assert [(m["mentor_id"], m["chunk_id"]) for m in results[0]["matches"]] == [("r1", "a"), ("r2", "c")]
+        assert [m["chunk_id"] for m in results[1]["matches"]] == ["b", "c"]
+        assert results[2]["matches"] == []
+
+        only_r1 = await service.retrieve_many(
+            db, ["fibrilacao"], mentor_ids=["r1"], min_similarity=0.0, query_embeddings=[[0.0, 1.0, 0.0]]
+        )
+        assert {m["mentor_id"] for m in only_r1[0]["matches"]} == {"r1"}
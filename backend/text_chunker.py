@@ -0,0 +1,200 @@
+"""
+Incremental token-window chunker.
+
+Text is fed piece by piece (e.g. page by page from the PDF extraction
+stream) and overlapping chunks are emitted as soon as they are complete, so
+memory is bounded by the window size rather than by the document size.
+
+With respect_sentences=True chunks end on sentence / paragraph boundaries
+and the overlap is made of whole trailing sentences (or trailing words when
+the last sentence is longer than the overlap). With respect_sentences=False
+chunks are the original fixed token windows (chunk_size tokens, advancing by
+chunk_size - overlap), except that a trailing window holding only overlap
+tokens (all already in the previous chunk) is not emitted.
+"""
+
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+# End of a sentence (with closing quotes/brackets) or a blank line
+_BOUNDARY = re.compile(r"[.!?…][\"')\]]*\s+|\n\s*\n")
+_WORD = re.compile(r"\S+\s*")
+
+# Input is tokenized in slices of at most this many characters
+SLICE_CHARS = 4096
+
+
+class StreamingChunker:
+    """feed() text pieces, then finish(); both yield (chunk_text, n_tokens)"""
+
+    def __init__(self, encoding, chunk_size: int = 500, overlap: int = 50, respect_sentences: bool = True):
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.respect_sentences = respect_sentences
+        # Text not yet tokenized (after the last boundary / whitespace seen)
+        self._pending = ""
+        # Sentence mode: [(unit_text, n_tokens)]; token mode: flat token list
+        self._units: List[Tuple[str, int]] = []
+        self._unit_tokens = 0
+        self._tokens: List[int] = []
+        # Whether the buffer holds text that no chunk has emitted yet
+        self._fresh = False
+
+    def _count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    # ---------- input slicing ----------
+
+    def _take_slices(self, final: bool) -> Iterator[str]:
+        """Cut pending text into slices that end on a boundary (or whitespace)"""
+        text = self._pending
+        start = 0
+        while len(text) - start > SLICE_CHARS or (final and start < len(text)):
+            end = min(start + SLICE_CHARS, len(text))
+            if end < len(text) or not final:
+                window = text[start:end]
+                cut = -1
+                if self.respect_sentences:
+                    for m in _BOUNDARY.finditer(window):
+                        cut = m.end()
+                if cut <= 0:
+                    # Cut before the whitespace so the next word keeps its leading space
+                    cut = max(window.rfind(" "), window.rfind("\n"))
+                if cut > 0:
+                    end = start + cut
+            yield text[start:end]
+            start = end
+        self._pending = text[start:]
+
+    # ---------- sentence mode ----------
+
+    def _units_of(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Split a slice into sentences, and overlong sentences into word groups"""
+        start = 0
+        pieces = [m.end() for m in _BOUNDARY.finditer(text)]
+        if not pieces or pieces[-1] != len(text):
+            pieces.append(len(text))
+        for end in pieces:
+            unit = text[start:end]
+            start = end
+            if not unit:
+                continue
+            n = self._count(unit)
+            if n <= self.chunk_size:
+                yield unit, n
+            else:
+                yield from self._word_groups(unit)
+
+    def _word_groups(self, text: str) -> Iterator[Tuple[str, int]]:
+        group, group_tokens = [], 0
+        for word in _WORD.findall(text):
+            n = self._count(word)
+            if n > self.chunk_size:
+                # Pathological "word" (e.g. a long base64 blob): hard token split
+                tokens = self.encoding.encode_ordinary(word)
+                for i in range(0, len(tokens), self.chunk_size):
+                    piece = tokens[i:i + self.chunk_size]
+                    yield self.encoding.decode(piece), len(piece)
+                continue
+            if group and group_tokens + n > self.chunk_size:
+                yield "".join(group), group_tokens
+                group, group_tokens = [], 0
+            group.append(word)
+            group_tokens += n
+        if group:
+            yield "".join(group), group_tokens
+
+    def _emit_units(self) -> Tuple[str, int]:
+        text = "".join(u for u, _ in self._units).strip()
+        n = self._unit_tokens
+        # Carry whole trailing sentences (or trailing words) into the next chunk
+        keep, kept = [], 0
+        for unit, k in reversed(self._units):
+            if kept + k > self.overlap:
+                break
+            keep.append((unit, k))
+            kept += k
+        if not keep and self.overlap:
+            for unit, k in reversed(list(self._word_groups_tail(self._units[-1][0]))):
+                keep.append((unit, k))
+                kept += k
+        self._units = keep[::-1]
+        self._unit_tokens = kept
+        self._fresh = False
+        return text, n
+
+    def _word_groups_tail(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Trailing words of text totalling at most overlap tokens, in reverse order"""
+        total = 0
+        for word in reversed(_WORD.findall(text)):
+            n = self._count(word)
+            if total + n > self.overlap:
+                break
+            total += n
+            yield word, n
+
+    def _push_unit(self, unit: str, n: int) -> Iterator[Tuple[str, int]]:
+        while self._units and self._unit_tokens + n > self.chunk_size:
+            if self._fresh:
+                yield self._emit_units()
+            else:
+                # Only overlap left: drop it from the front to make room
+                _, k = self._units.pop(0)
+                self._unit_tokens -= k
+        self._units.append((unit, n))
+        self._unit_tokens += n
+        self._fresh = True
+
+    # ---------- token-window mode ----------
+
+    def _push_tokens(self, tokens: List[int]) -> Iterator[Tuple[str, int]]:
+        self._tokens.extend(tokens)
+        self._fresh = True
+        step = self.chunk_size - self.overlap
+        while len(self._tokens) >= self.chunk_size:
+            yield self.encoding.decode(self._tokens[:self.chunk_size]), self.chunk_size
+            self._tokens = self._tokens[step:]
+            self._fresh = len(self._tokens) > self.overlap
+
+    # ---------- public API ----------
+
+    def _consume(self, final: bool) -> Iterator[Tuple[str, int]]:
+        for piece in self._take_slices(final):
+            if self.respect_sentences:
+                for unit, n in self._units_of(piece):
+                    yield from self._push_unit(unit, n)
+            else:
+                yield from self._push_tokens(self.encoding.encode_ordinary(piece))
+
+    def feed(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Add text; yields every chunk that became complete"""
+        self._pending += text
+        yield from self._consume(final=False)
+
+    def finish(self) -> Iterator[Tuple[str, int]]:
+        """Flush the remaining text as a final (shorter) chunk"""
+        yield from self._consume(final=True)
+        if not self._fresh:
+            return
+        if self.respect_sentences:
+            text, n = self._emit_units()
+            if text:
+                yield text, n
+        elif self._tokens:
+            yield self.encoding.decode(self._tokens), len(self._tokens)
+            self._tokens = []
+            self._fresh = False
+
+
+def iter_chunks(encoding, pieces: Iterable[str], chunk_size: int = 500, overlap: int = 50,
+                respect_sentences: bool = True) -> Iterator[str]:
+    """Chunk an iterable of text pieces lazily"""
+    chunker = StreamingChunker(encoding, chunk_size, overlap, respect_sentences)
+    for piece in pieces:
+        for text, _ in chunker.feed(piece):
+            yield text
+    for text, _ in chunker.finish():
+        yield text
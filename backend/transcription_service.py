@@ -0,0 +1,265 @@
+"""
+Async Whisper transcription with support for long recordings.
+
+Files under the Whisper request limit are sent as-is. Longer recordings are
+cut locally into overlapping windows that each fit in one request:
+- WAV is split on sample frames with the standard library `wave` module
+- MP3 is split on MPEG audio frame boundaries (no re-encoding)
+- anything else (MP4, M4A, OGG, FLAC, WEBM) is first converted to a small
+  mono MP3 with ffmpeg, when ffmpeg is installed
+Windows are transcribed concurrently and stitched back in order, keeping
+each overlapping stretch of audio from only one window.
+"""
+
+import asyncio
+import io
+import os
+import re
+import shutil
+import tempfile
+import wave
+from typing import List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from exceptions import ContentProcessingError
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-1")
+# Whisper rejects requests over 25MB; keep some room for the multipart envelope
+WHISPER_MAX_BYTES = int(os.getenv("WHISPER_MAX_BYTES", str(24 * 1024 * 1024)))
+TRANSCRIPTION_WINDOW_SECONDS = float(os.getenv("TRANSCRIPTION_WINDOW_SECONDS", "600"))
+TRANSCRIPTION_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_OVERLAP_SECONDS", "5"))
+TRANSCRIPTION_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "4"))
+TRANSCRIPTION_TIMEOUT = float(os.getenv("TRANSCRIPTION_TIMEOUT", "300"))
+
+# (start_seconds, end_seconds, audio_bytes, filename)
+Window = Tuple[float, float, bytes, str]
+
+# MPEG audio bitrate tables (kbps) for Layer III, indexed by header bitrate index
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],     # MPEG-2 / 2.5
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _is_wav(data: bytes) -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _is_mp3(data: bytes, filename: str) -> bool:
+    if data[:3] == b"ID3":
+        return True
+    return filename.lower().endswith(".mp3") or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0)
+
+
+def mp3_frames(data: bytes) -> List[Tuple[int, int, float]]:
+    """Locate MPEG Layer III frames. Returns [(offset, length, duration_seconds), ...]"""
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # ID3v2 size is a 4-byte syncsafe integer
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size
+    frames = []
+    end = len(data) - 3
+    while pos <= end:
+        b1, b2 = data[pos + 1], data[pos + 2]
+        if data[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+            pos += 1
+            continue
+        version = (b1 >> 3) & 0x03      # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        layer = (b1 >> 1) & 0x03        # 1 = Layer III
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 0x03
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            pos += 1
+            continue
+        bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        padding = (b2 >> 1) & 0x01
+        samples = 1152 if version == 3 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+        frames.append((pos, length, samples / sample_rate))
+        pos += length
+    return frames
+
+
+def split_mp3(data: bytes, window_seconds: float, overlap_seconds: float, max_bytes: int) -> List[Window]:
+    """Cut an MP3 into overlapping windows on frame boundaries"""
+    frames = mp3_frames(data)
+    if not frames:
+        raise ContentProcessingError("Nao foi possivel ler os quadros do arquivo MP3")
+    starts = [0.0]
+    for _, _, duration in frames:
+        starts.append(starts[-1] + duration)
+
+    windows = []
+    first = 0
+    while first < len(frames):
+        last = first
+        size = 0
+        while last < len(frames) and size + frames[last][1] <= max_bytes and starts[last + 1] - starts[first] <= window_seconds:
+            size += frames[last][1]
+            last += 1
+        last = max(last, first + 1)
+        begin, stop = frames[first][0], frames[last - 1][0] + frames[last - 1][1]
+        windows.append((starts[first], starts[last], data[begin:stop], f"part{len(windows)}.mp3"))
+        if last >= len(frames):
+            break
+        # Next window starts overlap_seconds before this one ends
+        next_first = last
+        while next_first > first + 1 and starts[last] - starts[next_first - 1] <= overlap_seconds:
+            next_first -= 1
+        first = next_first
+    return windows
+
+
+def split_wav(data: bytes, window_seconds: float, overlap_seconds: float, max_bytes: int) -> List[Window]:
+    """Cut a WAV file into overlapping windows, each a standalone WAV"""
+    with wave.open(io.BytesIO(data)) as reader:
+        params = reader.getparams()
+        rate = reader.getframerate()
+        frame_bytes = reader.getsampwidth() * reader.getnchannels()
+        n_frames = reader.getnframes()
+        pcm = reader.readframes(n_frames)
+    # 1KB of headroom for the WAV header
+    window_seconds = min(window_seconds, (max_bytes - 1024) / (rate * frame_bytes))
+    if window_seconds <= overlap_seconds:
+        raise ContentProcessingError("Audio WAV com taxa de amostragem alta demais para segmentar")
+
+    windows = []
+    start = 0.0
+    while True:
+        first = int(start * rate)
+        last = min(n_frames, int((start + window_seconds) * rate))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as writer:
+            writer.setparams(params)
+            writer.writeframes(pcm[first * frame_bytes:last * frame_bytes])
+        windows.append((first / rate, last / rate, buf.getvalue(), f"part{len(windows)}.wav"))
+        if last >= n_frames:
+            break
+        start += window_seconds - overlap_seconds
+    return windows
+
+
+def _words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s]", "", text.lower()).split()
+
+
+def merge_overlapping_text(previous: str, following: str, max_words: int = 60) -> str:
+    """Join two transcripts whose edges cover the same audio, dropping the repeated words"""
+    if not previous:
+        return following
+    prev_words, next_words = _words(previous), _words(following)
+    tokens = following.split()
+    for n in range(min(max_words, len(prev_words), len(next_words)), 2, -1):
+        if prev_words[-n:] == next_words[:n] and len(tokens) >= n:
+            return f"{previous} {' '.join(tokens[n:])}".strip()
+    return f"{previous} {following}".strip()
+
+
+def stitch_windows(windows: List[Window], results: List[object]) -> str:
+    """
+    Combine per-window transcriptions in order. With segment timestamps each
+    overlap is split at its midpoint; otherwise repeated words are trimmed.
+    """
+    segmented = all(getattr(r, "segments", None) for r in results)
+    if not segmented:
+        text = ""
+        for r in results:
+            text = merge_overlapping_text(text, (getattr(r, "text", None) or str(r)).strip())
+        return text
+
+    parts = []
+    for i, ((start, end, _, _), result) in enumerate(zip(windows, results)):
+        lower = 0.0 if i == 0 else (start + windows[i - 1][1]) / 2
+        upper = float("inf") if i == len(windows) - 1 else (windows[i + 1][0] + end) / 2
+        for segment in result.segments:
+            midpoint = start + (segment.start + segment.end) / 2
+            if lower <= midpoint < upper:
+                parts.append(segment.text.strip())
+    return " ".join(p for p in parts if p)
+
+
+class TranscriptionService:
+    """Shared async Whisper client plus local segmentation of long media"""
+
+    def __init__(self, concurrency: int = TRANSCRIPTION_CONCURRENCY):
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            key = os.environ.get("OPENAI_API_KEY")
+            if not key:
+                raise ContentProcessingError("OpenAI API key not configured")
+            self._client = AsyncOpenAI(api_key=key, timeout=TRANSCRIPTION_TIMEOUT)
+        return self._client
+
+    async def _request(self, audio: bytes, filename: str, response_format: str):
+        audio_file = io.BytesIO(audio)
+        audio_file.name = filename
+        async with self._semaphore:
+            return await self.client.audio.transcriptions.create(
+                model=WHISPER_MODEL,
+                file=audio_file,
+                language="pt",
+                response_format=response_format,
+            )
+
+    async def _to_mp3(self, data: bytes, filename: str) -> bytes:
+        """Convert any media ffmpeg understands into 32kbps mono MP3 (speech quality)"""
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise ContentProcessingError(
+                "Arquivo muito grande para transcricao direta. Envie em MP3/WAV ou instale o ffmpeg no servidor."
+            )
+        suffix = os.path.splitext(filename)[1] or ".bin"
+        with tempfile.NamedTemporaryFile(suffix=suffix) as source:
+            source.write(data)
+            source.flush()
+            proc = await asyncio.create_subprocess_exec(
+                ffmpeg, "-hide_banner", "-loglevel", "error", "-i", source.name,
+                "-vn", "-ac", "1", "-ar", "16000", "-b:a", "32k", "-f", "mp3", "pipe:1",
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            out, err = await proc.communicate()
+        if proc.returncode != 0 or not out:
+            raise ContentProcessingError(f"Erro ao converter midia com ffmpeg: {err.decode(errors='ignore')[:200]}")
+        return out
+
+    async def _windows(self, data: bytes, filename: str) -> List[Window]:
+        if _is_wav(data):
+            split = split_wav
+        else:
+            if not _is_mp3(data, filename):
+                data, filename = await self._to_mp3(data, filename), "audio.mp3"
+                if len(data) <= WHISPER_MAX_BYTES:
+                    return [(0.0, 0.0, data, filename)]
+            split = split_mp3
+        return await asyncio.to_thread(
+            split, data, TRANSCRIPTION_WINDOW_SECONDS, TRANSCRIPTION_OVERLAP_SECONDS, WHISPER_MAX_BYTES
+        )
+
+    async def transcribe(self, data: bytes, filename: str) -> str:
+        """Transcribe audio/video bytes of any length to Portuguese text"""
+        try:
+            if len(data) <= WHISPER_MAX_BYTES:
+                transcript = await self._request(data, filename, "text")
+                return str(transcript).strip() if transcript else ""
+
+            windows = await self._windows(data, filename)
+            if len(windows) == 1:
+                transcript = await self._request(windows[0][2], windows[0][3], "text")
+                return str(transcript).strip() if transcript else ""
+            results = await asyncio.gather(*[
+                self._request(audio, name, "verbose_json") for _, _, audio, name in windows
+            ])
+            print(f"Transcribed {filename} in {len(windows)} windows")
+            return stitch_windows(windows, results)
+        except ContentProcessingError:
+            raise
+        except Exception as e:
+            raise ContentProcessingError(f"Erro na transcricao do arquivo: {str(e)}")
@@ -0,0 +1,635 @@
+"""
+Resident per-mentor vector index for RAG retrieval.
+Keeps each mentor's chunk embeddings in memory as a contiguous, pre-normalized
+float32 matrix so /chat no longer reloads content_chunks on every question.
+With VECTOR_INDEX_SNAPSHOT_DIR the matrix is memory-mapped from a snapshot
+file shared by all workers, and newer chunks live in a small private delta.
+"""
+
+import asyncio
+import functools
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from pymongo import ReturnDocument
+
+from ann_index import ExactSearch, IVFSearch, QuantizedSearch, normalize_rows, wants_ivf, wants_quantization
+from embedding_codec import decode_embedding
+from index_snapshot import (
+    SNAPSHOT_CATCHUP_SLACK_SECONDS,
+    SNAPSHOT_RESAVE_ROWS,
+    VECTOR_INDEX_SNAPSHOT_DIR,
+    load_snapshot,
+    save_snapshot,
+)
+from lexical_index import (
+    HYBRID_CANDIDATE_FACTOR,
+    HYBRID_RETRIEVAL,
+    LEXICAL_ONLY_MIN_COVERAGE,
+    LexicalIndex,
+    fused_relevance,
+    reciprocal_rank_fusion,
+)
+
+# Fields needed to rebuild an index from content_chunks
+CHUNK_PROJECTION = {"embedding": 1, "text": 1, "content_id": 1, "title": 1, "embedded_at": 1}
+
+# Number of chunk documents converted to float32 at a time while loading
+LOAD_BATCH_SIZE = 1000
+
+# Rows appended to a snapshot-mapped matrix before it is copied into private memory
+VECTOR_INDEX_DELTA_MAX_ROWS = int(os.getenv("VECTOR_INDEX_DELTA_MAX_ROWS", "5000"))
+
+# Mentor indexes loaded from MongoDB at once when cross-mentor search warms all of them
+VECTOR_INDEX_LOAD_CONCURRENCY = int(os.getenv("VECTOR_INDEX_LOAD_CONCURRENCY", "4"))
+
+# Threads scoring mentor shards in parallel for cross-mentor search (NumPy releases the GIL)
+VECTOR_SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Below this many rows in total, shards are scored inline (thread hand-off would cost more)
+VECTOR_SEARCH_PARALLEL_MIN_ROWS = int(os.getenv("VECTOR_SEARCH_PARALLEL_MIN_ROWS", "20000"))
+
+# (score, mentor_id, chunk_metadata)
+ShardHit = Tuple[float, str, Dict]
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_WORKERS, thread_name_prefix="vector-search")
+    return _search_executor
+
+
+def _balanced_groups(indexes: List["MentorVectorIndex"], n_groups: int) -> List[List["MentorVectorIndex"]]:
+    """Split shards into n_groups with similar total row counts (largest first, into the lightest group)"""
+    heap = [(0, g) for g in range(n_groups)]
+    groups: List[List[MentorVectorIndex]] = [[] for _ in range(n_groups)]
+    for index in sorted(indexes, key=len, reverse=True):
+        rows, g = heapq.heappop(heap)
+        groups[g].append(index)
+        heapq.heappush(heap, (rows + len(index), g))
+    return [group for group in groups if group]
+
+
+def _score_shards(
+    indexes: List["MentorVectorIndex"],
+    queries: Optional[List[List[float]]],
+    query_texts: Optional[List[str]],
+    top_k: int,
+    min_similarity: float,
+) -> List[List[ShardHit]]:
+    """Best top_k hits per query over a group of shards (hybrid when query_texts is given)"""
+    per_query: List[List[ShardHit]] = [[] for _ in (query_texts if query_texts is not None else queries)]
+    for index in indexes:
+        if query_texts is not None:
+            matches_per_query = index.hybrid_search_many(query_texts, queries, top_k, min_similarity)
+        else:
+            matches_per_query = index.search_many(queries, top_k, min_similarity)
+        for hits, matches in zip(per_query, matches_per_query):
+            hits.extend((score, index.mentor_id, chunk) for chunk, score in matches)
+    return [heapq.nlargest(top_k, hits, key=lambda h: h[0]) for hits in per_query]
+
+
+_exact_search = ExactSearch()
+
+
+def _merge_top(base: Tuple[np.ndarray, np.ndarray], delta: Tuple[np.ndarray, np.ndarray],
+               offset: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge two best-first (rows, scores) results; delta rows are numbered after the base"""
+    rows = np.concatenate([base[0], delta[0] + offset])
+    scores = np.concatenate([base[1], delta[1]])
+    order = np.argsort(scores)[::-1][:k]
+    return rows[order], scores[order]
+
+
+def _locked(method):
+    """Serialize with searches running on the shard thread pool"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MentorVectorIndex:
+    """Pre-normalized float32 embedding matrix plus chunk metadata for one mentor"""
+
+    def __init__(self, mentor_id: str, version: int = 0):
+        self.mentor_id = mentor_id
+        # Mirrors mentors.content_version at the time the index was last synced
+        self.version = version
+        self.matrix: Optional[np.ndarray] = None
+        self.chunks: List[Dict] = []
+        # chunk_id -> chunk metadata
+        self._chunk_ids: Dict[str, Dict] = {}
+        # BM25 postings over the same chunks (HYBRID_RETRIEVAL)
+        self.lexical: Optional[LexicalIndex] = LexicalIndex() if HYBRID_RETRIEVAL else None
+        # Optional ANN structure; row ids stay valid until a removal bumps generation
+        self._ann: Optional[IVFSearch] = None
+        self.generation = 0
+        self.ann_building = False
+        # Optional quantized first pass for brute-force search (VECTOR_QUANTIZATION)
+        self._quant: Optional[QuantizedSearch] = None
+        # Rows added on top of a memory-mapped snapshot matrix (scored exactly)
+        self._delta: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self.matrix is None else self.matrix.shape[1]
+
+    @property
+    def mapped(self) -> bool:
+        """Whether the matrix is a read-only mapping of a snapshot file"""
+        return isinstance(self.matrix, np.memmap)
+
+    @property
+    def _base_rows(self) -> int:
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    def _to_block(self, chunk_docs: List[Dict], dim: Optional[int]) -> Tuple[Optional[np.ndarray], List[Dict]]:
+        """Convert chunk documents into a normalized float32 block and metadata"""
+        vectors, metas = [], []
+        for doc in chunk_docs:
+            embedding = decode_embedding(doc.get("embedding"))
+            chunk_id = str(doc.get("_id"))
+            if embedding is None or chunk_id in self._chunk_ids:
+                continue
+            if dim is None:
+                dim = len(embedding)
+            elif len(embedding) != dim:
+                # Embeddings from a different model are not comparable
+                print(f"Skipping chunk {chunk_id}: embedding dim {len(embedding)} != index dim {dim}")
+                continue
+            vectors.append(embedding)
+            meta = {
+                "chunk_id": chunk_id,
+                "content_id": doc.get("content_id", ""),
+                "title": doc.get("title", ""),
+                "text": doc.get("text", ""),
+            }
+            metas.append(meta)
+            self._chunk_ids[chunk_id] = meta
+        if not vectors:
+            return None, []
+        if self.lexical is not None:
+            self.lexical.add(metas)
+        return normalize_rows(np.stack(vectors)), metas
+
+    @_locked
+    def add_chunks(self, chunk_docs: List[Dict]) -> int:
+        """Append chunk documents to the index. Returns the number of rows added."""
+        block, metas = self._to_block(chunk_docs, self.dim)
+        if block is None:
+            return 0
+        if self.mapped:
+            # Keep sharing the mapped pages; new rows go to the private delta
+            self.chunks.extend(metas)
+            self._delta = block if self._delta is None else np.concatenate([self._delta, block])
+            if self._delta.shape[0] > VECTOR_INDEX_DELTA_MAX_ROWS:
+                self._materialize()
+            return len(metas)
+        if self.matrix is None:
+            self.matrix = block
+        else:
+            self.matrix = np.concatenate([self.matrix, block])
+        self.chunks.extend(metas)
+        if self._ann is not None:
+            self._ann.add_rows(self.matrix, self._ann.n_rows)
+        self._sync_quantized()
+        return len(metas)
+
+    @_locked
+    def load_chunks(self, chunk_batches: List[List[Dict]]) -> int:
+        """Bulk-load several batches with a single final concatenation"""
+        if self.mapped:
+            return sum(self.add_chunks(batch) for batch in chunk_batches)
+        blocks = [self.matrix] if self.matrix is not None else []
+        dim = self.dim
+        added = 0
+        for batch in chunk_batches:
+            block, metas = self._to_block(batch, dim)
+            if block is None:
+                continue
+            dim = block.shape[1]
+            blocks.append(block)
+            self.chunks.extend(metas)
+            added += len(metas)
+        if blocks:
+            self.matrix = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        if self._ann is not None and added:
+            self._ann.add_rows(self.matrix, self._ann.n_rows)
+        self._sync_quantized()
+        return added
+
+    @_locked
+    def load_mapped(self, matrix: np.ndarray, chunks: List[Dict]) -> None:
+        """Serve a (read-only, memory-mapped) snapshot matrix with its chunk metadata"""
+        self.matrix = matrix
+        self.chunks = list(chunks)
+        self._chunk_ids = {c["chunk_id"]: c for c in self.chunks}
+        if self.lexical is not None:
+            self.lexical.add(self.chunks)
+        self._sync_quantized()
+
+    def _materialize(self) -> None:
+        """Copy a mapped matrix plus its delta into one private in-memory matrix"""
+        if not self.mapped and self._delta is None:
+            return
+        base_rows = self._base_rows
+        parts = [self.matrix] + ([self._delta] if self._delta is not None else [])
+        self.matrix = np.concatenate(parts) if len(parts) > 1 else np.array(self.matrix)
+        self._delta = None
+        if self._ann is not None and self.matrix.shape[0] > base_rows:
+            self._ann.add_rows(self.matrix, base_rows)
+        self._sync_quantized()
+
+    @_locked
+    def snapshot_state(self) -> Tuple[Optional[np.ndarray], List[Dict]]:
+        """(full matrix, chunk metadata) for writing a snapshot"""
+        if self._delta is None:
+            return self.matrix, list(self.chunks)
+        return np.concatenate([self.matrix, self._delta]), list(self.chunks)
+
+    @_locked
+    def remove_content(self, content_id: str) -> int:
+        """Drop every chunk belonging to content_id. Returns the number of rows removed."""
+        keep = [i for i, c in enumerate(self.chunks) if c["content_id"] != content_id]
+        removed = len(self.chunks) - len(keep)
+        if not removed:
+            return 0
+        self._materialize()
+        dropped = [c for c in self.chunks if c["content_id"] == content_id]
+        for c in dropped:
+            self._chunk_ids.pop(c["chunk_id"], None)
+        if self.lexical is not None:
+            self.lexical.remove(dropped)
+        self.chunks = [self.chunks[i] for i in keep]
+        self.matrix = np.ascontiguousarray(self.matrix[keep]) if keep else None
+        # Row ids shifted, so the ANN lists and quantized codes are no longer valid
+        self._ann = None
+        self._quant = None
+        self.generation += 1
+        self._sync_quantized()
+        return removed
+
+    def _sync_quantized(self) -> None:
+        """Build, extend or drop the quantized codes to match the matrix"""
+        if not wants_quantization(self._base_rows):
+            self._quant = None
+        elif self._quant is None:
+            self._quant = QuantizedSearch(self.matrix)
+        elif self._quant.n_rows < self._base_rows:
+            self._quant.add_rows(self.matrix, self._quant.n_rows)
+
+    def _search_backend(self):
+        if self._ann is not None:
+            return self._ann
+        return self._quant if self._quant is not None else _exact_search
+
+    @property
+    def backend(self) -> str:
+        return self._search_backend().name
+
+    def needs_ann_rebuild(self) -> bool:
+        """True when the index is large enough for IVF and has none (or an outgrown one)"""
+        if self.ann_building or not wants_ivf(len(self)):
+            return False
+        return self._ann is None or len(self) > 2 * self._ann.trained_rows
+
+    @_locked
+    def attach_ann(self, ann: IVFSearch, generation: int) -> bool:
+        """Install an IVF index trained on an earlier snapshot of this matrix"""
+        if generation != self.generation or self.matrix is None:
+            return False
+        if ann.n_rows < self._base_rows:
+            ann.add_rows(self.matrix, ann.n_rows)
+        self._ann = ann
+        return True
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        min_similarity: float = 0.45
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Cosine similarity search against the resident matrix
+        Returns: [(chunk_metadata, similarity_score), ...] best first
+        """
+        return self.search_many([query_embedding], top_k, min_similarity)[0]
+
+    @_locked
+    def search_many(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        min_similarity: float = 0.45
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Score several queries in one pass (a matrix-matrix product on the exact path)
+        Returns one search() result per query, in order
+        """
+        results: List[List[Tuple[Dict, float]]] = [[] for _ in query_embeddings]
+        if self.matrix is None or not query_embeddings:
+            return results
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        if queries.shape[1] != self.dim:
+            print(f"Query dim {queries.shape[1]} does not match index dim {self.dim} for mentor {self.mentor_id}")
+            return results
+        norms = np.linalg.norm(queries, axis=1)
+        valid = np.flatnonzero(norms)
+        if not valid.size:
+            return results
+        queries = queries[valid] / norms[valid, None]
+        matches = self._search_backend().search_many(self.matrix, queries, top_k)
+        if self._delta is not None:
+            delta_matches = _exact_search.search_many(self._delta, queries, top_k)
+            matches = [
+                _merge_top(base, delta, self._base_rows, top_k)
+                for base, delta in zip(matches, delta_matches)
+            ]
+        for slot, (top_indices, top_scores) in zip(valid, matches):
+            results[slot] = [
+                (self.chunks[i], float(score))
+                for i, score in zip(top_indices, top_scores)
+                if score >= min_similarity
+            ]
+        return results
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: Optional[List[float]],
+        top_k: int = 5,
+        min_similarity: float = 0.45
+    ) -> List[Tuple[Dict, float]]:
+        """Vector + BM25 search fused by reciprocal rank; lexical only when query_embedding is None"""
+        embeddings = None if query_embedding is None else [query_embedding]
+        return self.hybrid_search_many([query_text], embeddings, top_k, min_similarity)[0]
+
+    @_locked
+    def hybrid_search_many(
+        self,
+        query_texts: List[str],
+        query_embeddings: Optional[List[List[float]]],
+        top_k: int = 5,
+        min_similarity: float = 0.45
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Fuse the vector ranking (hits above min_similarity) with the BM25 ranking
+        (hits covering enough of the query terms) by reciprocal rank; a chunk
+        without a vector match needs LEXICAL_ONLY_MIN_COVERAGE to be kept
+        Returns per query: [(chunk_metadata, relevance), ...] in fused order, where
+        relevance is the RRF score scaled to [0, 1]; cosine and BM25 values are
+        never mixed, so hits from different shards can be merged on it
+        """
+        n_candidates = top_k * HYBRID_CANDIDATE_FACTOR
+        if query_embeddings is None:
+            vector_hits = [[] for _ in query_texts]
+        else:
+            vector_hits = self.search_many(query_embeddings, n_candidates, min_similarity)
+        if self.lexical is None:
+            return [hits[:top_k] for hits in vector_hits]
+
+        results = []
+        for text, hits in zip(query_texts, vector_hits):
+            vector_ids = {chunk["chunk_id"] for chunk, _ in hits}
+            lexical_hits = [
+                hit for hit in self.lexical.search(text, n_candidates)
+                if hit[0] in vector_ids or hit[2] >= LEXICAL_ONLY_MIN_COVERAGE
+            ]
+            fused = reciprocal_rank_fusion([
+                [chunk["chunk_id"] for chunk, _ in hits],
+                [chunk_id for chunk_id, _, _ in lexical_hits],
+            ])
+            best = heapq.nlargest(top_k, fused, key=fused.get)
+            results.append([(self._chunk_ids[chunk_id], fused_relevance(fused[chunk_id])) for chunk_id in best])
+        return results
+
+
+class VectorIndexService:
+    """
+    Process-wide registry of MentorVectorIndex instances.
+
+    Indexes are built lazily from MongoDB on first use and kept warm. Every
+    write to a mentor's chunks bumps mentors.content_version, so indexes held
+    by other worker processes notice they are stale and rebuild.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, MentorVectorIndex] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Strong references to background IVF builds (the loop only keeps weak ones)
+        self._builds: Set[asyncio.Task] = set()
+
+    async def get_index(self, db, mentor_id: str, version: int = 0) -> MentorVectorIndex:
+        """Return a warm index for mentor_id at least as new as version"""
+        index = self._indexes.get(mentor_id)
+        if index is not None and index.version >= version:
+            self._maybe_build_ann(index)
+            return index
+        lock = self._locks.setdefault(mentor_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(mentor_id)
+            if index is None or index.version < version:
+                index = await self._load(db, mentor_id, version)
+                self._indexes[mentor_id] = index
+        self._maybe_build_ann(index)
+        return index
+
+    async def get_all_indexes(self, db) -> List[MentorVectorIndex]:
+        """Warm indexes for every mentor, used by cross-mentor search"""
+        mentors = await db.mentors.find({}, {"_id": 1, "content_version": 1}).to_list(None)
+        semaphore = asyncio.Semaphore(VECTOR_INDEX_LOAD_CONCURRENCY)
+
+        async def load(mentor: Dict) -> MentorVectorIndex:
+            async with semaphore:
+                return await self.get_index(db, mentor["_id"], mentor.get("content_version", 0))
+
+        return list(await asyncio.gather(*[load(m) for m in mentors]))
+
+    async def search_shards(
+        self,
+        indexes: List[MentorVectorIndex],
+        query_embeddings: Optional[List[List[float]]],
+        top_k: int = 5,
+        min_similarity: float = 0.45,
+        query_texts: Optional[List[str]] = None
+    ) -> List[List[ShardHit]]:
+        """
+        Search several mentor indexes (shards) and merge the results
+        With query_texts the search is hybrid (and query_embeddings may be None)
+        Large searches are split into row-balanced groups scored on a thread pool
+        Returns per query: [(score, mentor_id, chunk_metadata), ...] best first, where
+        score is the cosine similarity, or the scaled RRF score when hybrid
+        """
+        n_queries = len(query_texts if query_texts is not None else query_embeddings)
+        indexes = [index for index in indexes if len(index)]
+        total_rows = sum(len(index) for index in indexes)
+        n_groups = min(VECTOR_SEARCH_WORKERS, len(indexes))
+        if n_groups <= 1 or total_rows < VECTOR_SEARCH_PARALLEL_MIN_ROWS:
+            return _score_shards(indexes, query_embeddings, query_texts, top_k, min_similarity)
+
+        loop = asyncio.get_running_loop()
+        partials = await asyncio.gather(*[
+            loop.run_in_executor(
+                _get_search_executor(), _score_shards, group, query_embeddings, query_texts, top_k, min_similarity
+            )
+            for group in _balanced_groups(indexes, n_groups)
+        ])
+        return [
+            heapq.nlargest(top_k, (hit for partial in partials for hit in partial[q]), key=lambda h: h[0])
+            for q in range(n_queries)
+        ]
+
+    def _maybe_build_ann(self, index: MentorVectorIndex) -> None:
+        if not index.needs_ann_rebuild():
+            return
+        index.ann_building = True
+        task = asyncio.create_task(self._build_ann(index))
+        self._builds.add(task)
+        task.add_done_callback(self._builds.discard)
+
+    async def _build_ann(self, index: MentorVectorIndex) -> None:
+        """Train IVF off the event loop; exact search keeps serving meanwhile"""
+        generation, matrix = index.generation, index.matrix
+        try:
+            ann = await asyncio.to_thread(IVFSearch.train, matrix)
+            if index.attach_ann(ann, generation):
+                print(f"IVF index ready for mentor {index.mentor_id}: {ann.n_lists} lists, {len(index)} chunks")
+        except Exception as e:
+            print(f"IVF build failed for mentor {index.mentor_id}: {e}")
+        finally:
+            index.ann_building = False
+
+    async def _load(self, db, mentor_id: str, version: int) -> MentorVectorIndex:
+        if VECTOR_INDEX_SNAPSHOT_DIR:
+            index = await self._load_snapshot(db, mentor_id, version)
+            if index is not None:
+                return index
+        started = datetime.utcnow()
+        index = MentorVectorIndex(mentor_id, version)
+        batches, batch = [], []
+        cursor = db.content_chunks.find({"mentor_id": mentor_id}, CHUNK_PROJECTION).batch_size(LOAD_BATCH_SIZE)
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= LOAD_BATCH_SIZE:
+                batches.append(batch)
+                batch = []
+        if batch:
+            batches.append(batch)
+        index.load_chunks(batches)
+        print(f"Vector index loaded for mentor {mentor_id}: {len(index)} chunks (version {version})")
+        if VECTOR_INDEX_SNAPSHOT_DIR and len(index):
+            await self._save_snapshot(index, started)
+        return index
+
+    async def _load_snapshot(self, db, mentor_id: str, version: int) -> Optional[MentorVectorIndex]:
+        """
+        Map the mentor's snapshot and catch up on chunk writes since its watermark
+        Returns None when there is no usable snapshot or it cannot be patched safely
+        """
+        snapshot = await asyncio.to_thread(load_snapshot, VECTOR_INDEX_SNAPSHOT_DIR, mentor_id)
+        if snapshot is None:
+            return None
+        index = MentorVectorIndex(mentor_id, version)
+        index.load_mapped(snapshot["matrix"], snapshot["chunks"])
+        if snapshot["version"] == version:
+            print(f"Vector index mapped for mentor {mentor_id}: {len(index)} chunks (version {version})")
+            return index
+
+        started = datetime.utcnow()
+        # Chunks deleted since the snapshot: drop their whole content (chunks are
+        # only ever deleted per content) and re-read whatever that content has now
+        live_ids = {
+            str(doc["_id"])
+            for doc in await db.content_chunks.find({"mentor_id": mentor_id}, {"_id": 1}).to_list(None)
+        }
+        stale_contents = {c["content_id"] for c in index.chunks if c["chunk_id"] not in live_ids}
+        removed = sum(index.remove_content(content_id) for content_id in stale_contents)
+
+        since = snapshot["watermark"] - timedelta(seconds=SNAPSHOT_CATCHUP_SLACK_SECONDS)
+        changed = [{"created_at": {"$gte": since}}, {"embedded_at": {"$gte": since}}]
+        if stale_contents:
+            changed.append({"content_id": {"$in": list(stale_contents)}})
+        docs = await db.content_chunks.find(
+            {"mentor_id": mentor_id, "$or": changed}, CHUNK_PROJECTION
+        ).to_list(None)
+        if any(
+            str(doc["_id"]) in index._chunk_ids and doc.get("embedded_at") and doc["embedded_at"] >= since
+            for doc in docs
+        ):
+            # Re-embedded in place; the mapped rows are stale
+            print(f"Vector index snapshot for mentor {mentor_id} predates a re-embed; rebuilding")
+            return None
+        added = index.add_chunks(docs)
+        print(
+            f"Vector index mapped for mentor {mentor_id}: {len(index)} chunks "
+            f"(snapshot version {snapshot['version']} -> {version}, +{added}/-{removed})"
+        )
+        if added >= SNAPSHOT_RESAVE_ROWS or removed:
+            await self._save_snapshot(index, started)
+        return index
+
+    async def _save_snapshot(self, index: MentorVectorIndex, watermark: datetime) -> None:
+        """Write the index to VECTOR_INDEX_SNAPSHOT_DIR; watermark = when its Mongo read began"""
+        matrix, chunks = index.snapshot_state()
+        try:
+            await asyncio.to_thread(
+                save_snapshot, VECTOR_INDEX_SNAPSHOT_DIR, index.mentor_id, index.version, watermark, matrix, chunks
+            )
+        except OSError as e:
+            print(f"Could not save vector index snapshot for mentor {index.mentor_id}: {e}")
+
+    async def _bump_version(self, db, mentor_id: str) -> int:
+        mentor = await db.mentors.find_one_and_update(
+            {"_id": mentor_id},
+            {"$inc": {"content_version": 1}},
+            projection={"content_version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return mentor.get("content_version", 0) if mentor else 0
+
+    async def on_chunks_added(self, db, mentor_id: str, chunk_docs: List[Dict]) -> None:
+        """Call after inserting chunks into content_chunks"""
+        new_version = await self._bump_version(db, mentor_id)
+        index = self._indexes.get(mentor_id)
+        if index is None:
+            return
+        if index.version == new_version - 1:
+            index.add_chunks(chunk_docs)
+            index.version = new_version
+            self._maybe_build_ann(index)
+        else:
+            # Another worker changed this mentor's chunks too; rebuild on next use
+            self._indexes.pop(mentor_id, None)
+
+    async def on_content_removed(self, db, mentor_id: str, content_id: str) -> None:
+        """Call after deleting a content's chunks from content_chunks"""
+        new_version = await self._bump_version(db, mentor_id)
+        index = self._indexes.get(mentor_id)
+        if index is None:
+            return
+        if index.version == new_version - 1:
+            index.remove_content(content_id)
+            index.version = new_version
+            self._maybe_build_ann(index)
+        else:
+            self._indexes.pop(mentor_id, None)
+
+    def invalidate(self, mentor_id: Optional[str] = None) -> None:
+        """Drop one mentor's index (or all of them) so it is rebuilt on next use"""
+        if mentor_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(mentor_id, None)